@@ -0,0 +1,172 @@
+# answer_cache.py
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from typing import Generator, List, Optional
+
+import numpy as np
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable via environment variables
+USE_ANSWER_CACHE = os.getenv("USE_ANSWER_CACHE", "false").lower() in ("1", "true", "yes")
+ANSWER_CACHE_MODEL = os.getenv("ANSWER_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+try:
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.92)) # Minimum cosine similarity for a hit
+    ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 24 * 3600)) # Seconds an answer stays valid
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+except ValueError:
+    logger.warning("🤖🗃️⚠️ Invalid ANSWER_CACHE_THRESHOLD / ANSWER_CACHE_TTL / ANSWER_CACHE_MAX_ENTRIES env var. Using defaults: 0.92, 86400, 1000")
+    ANSWER_CACHE_THRESHOLD = 0.92
+    ANSWER_CACHE_TTL = 24 * 3600.0
+    ANSWER_CACHE_MAX_ENTRIES = 1000
+
+
+def load_embedder(model_name: str = ANSWER_CACHE_MODEL):
+    """
+    Loads a local sentence embedding model.
+
+    Args:
+        model_name: sentence-transformers model id or local path.
+
+    Returns:
+        A callable mapping a text to a unit-length float32 vector, or None if
+        sentence-transformers or the model is unavailable.
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name, device="cpu")
+    except Exception as e:
+        logger.warning(f"🤖🗃️⚠️ Could not load embedding model '{model_name}' ({e}). Answer cache disabled.")
+        return None
+    logger.info(f"🤖🗃️ Loaded embedding model '{model_name}' for the answer cache.")
+    return lambda text: model.encode(text, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+class SemanticAnswerCache:
+    """
+    Cache of past answers, looked up by the meaning of the user's utterance.
+
+    Utterances are embedded with a small local model; the unit vectors live in
+    one NumPy matrix, so a lookup is a single matrix-vector product (cosine
+    similarity). An answer is only served for an utterance at least `threshold`
+    similar to a cached one and only within the same system prompt. Entries
+    expire after `ttl` seconds; when full, the least recently used entry is
+    replaced. Served answers go through TTS like LLM output, so their audio
+    usually comes from the TTS cache as well.
+    """
+    def __init__(
+            self,
+            system_prompt: str,
+            embed=None,
+            threshold: float = ANSWER_CACHE_THRESHOLD,
+            ttl: float = ANSWER_CACHE_TTL,
+            max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ):
+        """
+        Initializes the SemanticAnswerCache.
+
+        Args:
+            system_prompt: The system prompt answers were produced with; scopes the cache.
+            embed: Callable returning a unit-length vector for a text. Defaults to `load_embedder()`.
+            threshold: Minimum cosine similarity for a hit.
+            ttl: Seconds after which an answer is no longer served.
+            max_entries: Maximum number of cached answers.
+        """
+        self.scope = hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:12]
+        self.embed = embed if embed is not None else load_embedder()
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None # (max_entries, dim), allocated on first insert
+        self._valid = np.zeros(self.max_entries, dtype=bool)
+        self._created = np.zeros(self.max_entries, dtype=np.float64)
+        self._last_used = np.zeros(self.max_entries, dtype=np.float64)
+        self._utterances: List[str] = [""] * self.max_entries
+        self._answers: List[str] = [""] * self.max_entries
+
+    @property
+    def enabled(self) -> bool:
+        return self.embed is not None
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return re.sub(r"\s+", " ", text).strip()
+
+    def lookup(self, utterance: str) -> Optional[str]:
+        """
+        Returns the cached answer for an utterance with the same meaning, if any.
+
+        Args:
+            utterance: The user's utterance.
+
+        Returns:
+            The cached answer text, or None on a miss.
+        """
+        utterance = self._normalize(utterance)
+        if not self.enabled or not utterance:
+            return None
+        query = self.embed(utterance)
+        now = time.time()
+        with self._lock:
+            self._valid &= self._created > now - self.ttl # Expire
+            if self._vectors is None or not self._valid.any():
+                best, similarity = -1, 0.0
+            else:
+                similarities = np.where(self._valid, self._vectors @ query, -1.0)
+                best = int(np.argmax(similarities))
+                similarity = float(similarities[best])
+            hit = best >= 0 and similarity >= self.threshold
+            if hit:
+                self._last_used[best] = now
+                answer, cached_utterance = self._answers[best], self._utterances[best]
+        metrics.ANSWER_CACHE_LOOKUPS.labels(result="hit" if hit else "miss").inc()
+        if not hit:
+            return None
+        logger.info(f"🤖🗃️✅ Answer cache hit ({similarity:.3f}): '{utterance[:40]}' ~ '{cached_utterance[:40]}'.")
+        return answer
+
+    def store(self, utterance: str, answer: str) -> None:
+        """
+        Caches `answer` for `utterance`, replacing a near-identical entry, else an expired or least recently used one.
+
+        Args:
+            utterance: The user's utterance.
+            answer: The complete assistant answer.
+        """
+        utterance, answer = self._normalize(utterance), self._normalize(answer)
+        if not self.enabled or not utterance or not answer:
+            return
+        vector = self.embed(utterance)
+        now = time.time()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            self._valid &= self._created > now - self.ttl
+            similarities = np.where(self._valid, self._vectors @ vector, -1.0)
+            if similarities.max() >= self.threshold:
+                slot = int(np.argmax(similarities)) # Refresh the existing answer
+            elif not self._valid.all():
+                slot = int(np.argmin(self._valid))
+            else:
+                slot = int(np.argmin(self._last_used))
+                metrics.ANSWER_CACHE_EVICTIONS.inc()
+            self._vectors[slot] = vector
+            self._valid[slot] = True
+            self._created[slot] = self._last_used[slot] = now
+            self._utterances[slot] = utterance
+            self._answers[slot] = answer
+            size = int(self._valid.sum())
+        logger.debug(f"🤖🗃️ Cached answer for '{utterance[:40]}' ({size}/{self.max_entries} entries, scope {self.scope}).")
+
+
+def stream_cached_answer(answer: str) -> Generator[str, None, None]:
+    """Yields a cached answer word by word, like an LLM token stream."""
+    for match in re.finditer(r"\S+\s*", answer):
+        yield match.group(0)
@@ -1,9 +1,11 @@
 import asyncio
 import logging
+import time
 from typing import Optional, Callable
 import numpy as np
-from scipy.signal import resample_poly
+from decimator import StreamingDecimator
 from transcribe import TranscriptionProcessor
+import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -12,14 +14,12 @@ class AudioInputProcessor:
     """
     Manages audio input, processes it for transcription, and handles related callbacks.
 
-    This class receives raw audio chunks, resamples them to the required format (16kHz),
-    feeds them to an underlying `TranscriptionProcessor`, and manages callbacks for
+    This class receives raw audio chunks, resamples them to the required format (16kHz)
+    with a streaming decimator, feeds them to an underlying `TranscriptionProcessor`, and manages callbacks for
     real-time transcription updates, recording start events, and silence detection.
     It also runs the transcription process in a background task.
     """
 
-    _RESAMPLE_RATIO = 3  # Resample ratio from 48kHz (assumed input) to 16kHz.
-
     def __init__(
             self,
             language: str = "en",
@@ -38,6 +38,7 @@ class AudioInputProcessor:
             pipeline_latency: Estimated latency of the processing pipeline in seconds.
         """
         self.last_partial_text: Optional[str] = None
+        self.decimator = StreamingDecimator() # 48kHz client audio -> 16kHz for the transcriber
         self.transcriber = TranscriptionProcessor(
             language,
             on_recording_start_callback=self._on_recording_start,
@@ -54,6 +55,7 @@ class AudioInputProcessor:
         self.recording_start_callback: Optional[Callable[[None], None]] = None # Type adjusted
         self.silence_active_callback: Optional[Callable[[bool], None]] = silence_active_callback
         self.interrupted = False # TODO: Consider renaming or clarifying usage (interrupted by user speech?)
+        self.last_speech_frame_time: float = 0.0 # Server receive time (s) of the last chunk fed while not in silence
 
         self._setup_callbacks()
         logger.info("👂🚀 AudioInputProcessor initialized.")
@@ -73,12 +75,17 @@ class AudioInputProcessor:
         logger.info("👂🛑 Aborting generation requested.")
         self.transcriber.abort_generation()
 
+    def set_pipeline_latency(self, pipeline_latency: float) -> None:
+        """Updates the estimated processing pipeline latency (seconds) used for turn timing."""
+        self.transcriber.set_pipeline_latency(pipeline_latency)
+
     def _setup_callbacks(self) -> None:
         """Sets up internal callbacks for the TranscriptionProcessor instance."""
         def partial_transcript_callback(text: str) -> None:
             """Handles partial transcription results from the transcriber."""
             if text != self.last_partial_text:
                 self.last_partial_text = text
+                metrics.STT_PARTIALS.inc()
                 if self.realtime_callback:
                     self.realtime_callback(text)
 
@@ -119,35 +126,19 @@ class AudioInputProcessor:
 
     def process_audio_chunk(self, raw_bytes: bytes) -> np.ndarray:
         """
-        Converts raw audio bytes (int16) to a 16kHz 16-bit PCM numpy array.
+        Converts raw audio bytes (int16, 48kHz) to 16kHz 16-bit PCM.
 
-        The audio is converted to float32 for accurate resampling and then
-        converted back to int16, clipping values outside the valid range.
+        Runs the packet through this processor's `StreamingDecimator`, which carries
+        its filter state across packets so consecutive chunks form one continuous
+        signal for the transcriber.
 
         Args:
             raw_bytes: Raw audio data assumed to be in int16 format.
 
         Returns:
             A numpy array containing the resampled audio in int16 format at 16kHz.
-            Returns an array of zeros if the input is silent.
         """
-        raw_audio = np.frombuffer(raw_bytes, dtype=np.int16)
-
-        if np.max(np.abs(raw_audio)) == 0:
-            # Calculate expected length after resampling for silence
-            expected_len = int(np.ceil(len(raw_audio) / self._RESAMPLE_RATIO))
-            return np.zeros(expected_len, dtype=np.int16)
-
-        # Convert to float32 for resampling precision
-        audio_float32 = raw_audio.astype(np.float32)
-
-        # Resample using float32 data
-        resampled_float = resample_poly(audio_float32, 1, self._RESAMPLE_RATIO)
-
-        # Convert back to int16, clipping to ensure validity
-        resampled_int16 = np.clip(resampled_float, -32768, 32767).astype(np.int16)
-
-        return resampled_int16
+        return self.decimator.process(np.frombuffer(raw_bytes, dtype=np.int16))
 
 
     async def process_chunk_queue(self, audio_queue: asyncio.Queue) -> None:
@@ -203,6 +194,8 @@ class AudioInputProcessor:
                      if not self._transcription_failed:
                         # Feed audio to the underlying processor
                         self.transcriber.feed_audio(processed.tobytes(), audio_data)
+                        if not self.transcriber.silence_active:
+                            self.last_speech_frame_time = audio_data.get("server_received", time.time_ns()) / 1_000_000_000
                      # No 'else' needed here because the checks at the start of the loop handle termination
 
             except asyncio.CancelledError:
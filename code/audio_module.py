@@ -10,6 +10,8 @@ from queue import Queue
 from typing import Callable, Generator, Optional
 
 import numpy as np
+import metrics
+from tts_cache import TTSCache
 from huggingface_hub import hf_hub_download
 # Assuming RealtimeTTS is installed and available
 from RealtimeTTS import (CoquiEngine, KokoroEngine, OrpheusEngine,
@@ -29,6 +31,7 @@ ENGINE_SILENCES = {
     "coqui":   Silence(comma=0.3, sentence=0.6, default=0.3),
     "kokoro":  Silence(comma=0.3, sentence=0.6, default=0.3),
     "orpheus": Silence(comma=0.3, sentence=0.6, default=0.3),
+    "mock":    Silence(comma=0.3, sentence=0.6, default=0.3),
 }
 
 # Platform-specific stream chunk sizes
@@ -84,7 +87,7 @@ class AudioProcessor:
     """
     Manages Text-to-Speech (TTS) synthesis using various engines via RealtimeTTS.
 
-    This class initializes a chosen TTS engine (Coqui, Kokoro, or Orpheus),
+    This class initializes a chosen TTS engine (Coqui, Kokoro, Orpheus, or the mock engine),
     configures it for streaming output, measures initial latency (TTFT),
     and provides methods to synthesize audio from text strings or generators,
     placing the resulting audio chunks into a queue. It handles dynamic
@@ -95,6 +98,8 @@ class AudioProcessor:
             self,
             engine: str = START_ENGINE,
             orpheus_model: str = "orpheus-3b-0.1-ft-Q8_0-GGUF/orpheus-3b-0.1-ft-q8_0.gguf",
+            stream_chunk_size: Optional[int] = None,
+            cache: Optional[TTSCache] = None,
         ) -> None:
         """
         Initializes the AudioProcessor with a specific TTS engine.
@@ -104,17 +109,24 @@ class AudioProcessor:
         synthesis to measure Time To First Audio chunk (TTFA).
 
         Args:
-            engine: The name of the TTS engine to use ("coqui", "kokoro", "orpheus").
+            engine: The name of the TTS engine to use ("coqui", "kokoro", "orpheus", "mock").
             orpheus_model: The path or identifier for the Orpheus model file (used only if engine is "orpheus").
+            stream_chunk_size: Fixed Coqui stream chunk size for an instance dedicated to one
+                               stage. If None, the chunk size is switched per call (quick/final).
+            cache: The `TTSCache` shared by all processors of the process. If None, this
+                   instance indexes the cache directory on its own.
         """
         self.engine_name = engine
         self.stop_event = threading.Event()
+        # Serializes access to the single TextToAudioStream when several sessions share this processor
+        self.synthesis_lock = threading.Lock()
         self.finished_event = threading.Event()
         self.audio_chunks = asyncio.Queue() # Queue for synthesized audio output
         self.orpheus_model = orpheus_model
 
         self.silence = ENGINE_SILENCES.get(engine, ENGINE_SILENCES[self.engine_name])
-        self.current_stream_chunk_size = QUICK_ANSWER_STREAM_CHUNK_SIZE # Initial chunk size
+        self.fixed_stream_chunk_size = stream_chunk_size
+        self.current_stream_chunk_size = stream_chunk_size or QUICK_ANSWER_STREAM_CHUNK_SIZE # Initial chunk size
 
         # Dynamically load and configure the selected TTS engine
         if engine == "coqui":
@@ -130,11 +142,12 @@ class AudioProcessor:
                 use_deepspeed = True
                 thread_count = 6
                 
+            self.voice, self.speed = "reference_audio3.wav", 1.1
             self.engine = CoquiEngine(
                 specific_model="Lasinya",
                 local_models_path="./models",
-                voice="reference_audio3.wav",
-                speed=1.1,
+                voice=self.voice,
+                speed=self.speed,
                 use_deepspeed=use_deepspeed,
                 thread_count=thread_count,
                 stream_chunk_size=self.current_stream_chunk_size,
@@ -145,9 +158,10 @@ class AudioProcessor:
                 add_sentence_filter=True,
             )
         elif engine == "kokoro":
+            self.voice, self.speed = "af_heart", 1.26
             self.engine = KokoroEngine(
-                voice="af_heart",
-                default_speed=1.26,
+                voice=self.voice,
+                default_speed=self.speed,
                 trim_silence=True,
                 silence_threshold=0.01,
                 extra_start_ms=25,
@@ -163,12 +177,20 @@ class AudioProcessor:
                 repetition_penalty=1.1,
                 max_tokens=1200,
             )
-            voice = OrpheusVoice("tara")
-            self.engine.set_voice(voice)
+            self.voice, self.speed = "tara", 1.0
+            self.engine.set_voice(OrpheusVoice(self.voice))
+        elif engine == "mock":
+            # GPU-free synthetic engine for load and latency testing (see mock_tts.py)
+            from mock_tts import MockEngine
+            self.engine = MockEngine()
+            self.voice, self.speed = "mock", 1.0
         else:
             raise ValueError(f"Unsupported engine: {engine}")
 
 
+        # Synthesized sentences, reused across turns and restarts
+        self.cache = cache if cache is not None else TTSCache()
+
         # Initialize the RealtimeTTS stream
         self.stream = TextToAudioStream(
             self.engine,
@@ -178,7 +200,7 @@ class AudioProcessor:
         )
 
         # Ensure Coqui engine starts with the quick chunk size
-        if self.engine_name == "coqui" and hasattr(self.engine, 'set_stream_chunk_size') and self.current_stream_chunk_size != QUICK_ANSWER_STREAM_CHUNK_SIZE:
+        if self.fixed_stream_chunk_size is None and self.engine_name == "coqui" and hasattr(self.engine, 'set_stream_chunk_size') and self.current_stream_chunk_size != QUICK_ANSWER_STREAM_CHUNK_SIZE:
             logger.info(f"👄⚙️ Setting Coqui stream chunk size to {QUICK_ANSWER_STREAM_CHUNK_SIZE} for initial setup.")
             self.engine.set_stream_chunk_size(QUICK_ANSWER_STREAM_CHUNK_SIZE)
             self.current_stream_chunk_size = QUICK_ANSWER_STREAM_CHUNK_SIZE
@@ -258,6 +280,8 @@ class AudioProcessor:
             audio_chunks: Queue, 
             stop_event: threading.Event,
             generation_string: str = "",
+            on_first_chunk: Optional[Callable[[], None]] = None,
+            stage: str = "quick",
         ) -> bool:
         """
         Synthesizes audio from a complete text string and puts chunks into a queue.
@@ -275,14 +299,98 @@ class AudioProcessor:
             stop_event: A threading.Event to signal interruption of the synthesis.
                         This should typically be the instance's `self.stop_event`.
             generation_string: An optional identifier string for logging purposes.
+            on_first_chunk: Optional callback fired when the first audio chunk is queued.
+                            Overrides `on_first_audio_chunk_synthesize` for this call, which
+                            lets several sessions share one processor.
+            stage: "quick" or "final"; selects the Coqui stream chunk size (unless this
+                   instance has a fixed one) and labels the metrics.
 
         Returns:
             True if synthesis completed fully, False if interrupted by stop_event.
         """
-        if self.engine_name == "coqui" and hasattr(self.engine, 'set_stream_chunk_size') and self.current_stream_chunk_size != QUICK_ANSWER_STREAM_CHUNK_SIZE:
-            logger.info(f"👄⚙️ {generation_string} Setting Coqui stream chunk size to {QUICK_ANSWER_STREAM_CHUNK_SIZE} for quick synthesis.")
-            self.engine.set_stream_chunk_size(QUICK_ANSWER_STREAM_CHUNK_SIZE)
-            self.current_stream_chunk_size = QUICK_ANSWER_STREAM_CHUNK_SIZE
+        cached = self.cache.get(text, self.engine_name, self.voice, self.speed)
+        if cached is not None:
+            return self._play_cached(cached, text, audio_chunks, stop_event, generation_string, on_first_chunk, stage)
+
+        if not self._acquire_synthesis_lock(stop_event, generation_string):
+            return False
+        recorded: list[bytes] = []
+        try:
+            completed = self._synthesize_locked(text, audio_chunks, stop_event, generation_string, on_first_chunk, recorded, stage)
+        finally:
+            self.synthesis_lock.release()
+        if completed:
+            self.cache.put(text, b"".join(recorded), self.engine_name, self.voice, self.speed)
+        return completed
+
+    def _play_cached(
+            self,
+            cached: Generator[bytes, None, None],
+            text: str,
+            audio_chunks: Queue,
+            stop_event: threading.Event,
+            generation_string: str,
+            on_first_chunk: Optional[Callable[[], None]],
+            stage: str,
+        ) -> bool:
+        """Streams cached audio into `audio_chunks` like `_synthesize_locked` does with synthesized audio."""
+        first_chunk_callback = on_first_chunk or self.on_first_audio_chunk_synthesize
+        logger.info(f"👄🗃️ {generation_string} {stage.capitalize()} answer audio from cache. Text: {text[:50]}...")
+        first = True
+        for chunk in cached:
+            if stop_event.is_set():
+                cached.close()
+                logger.info(f"👄🛑 {generation_string} Cached audio playback interrupted by stop_event. Text: {text[:50]}...")
+                return False
+            audio_chunks.put_nowait(chunk)
+            if first:
+                first = False
+                if first_chunk_callback:
+                    try:
+                        first_chunk_callback()
+                    except Exception as e:
+                        logger.error(f"👄💥 {generation_string} Cache Error in on_first_audio_chunk_synthesize callback: {e}", exc_info=True)
+        return True
+
+    def _acquire_synthesis_lock(self, stop_event: threading.Event, generation_string: str = "") -> bool:
+        """
+        Waits for exclusive use of the TTS stream, giving up if `stop_event` is set.
+
+        Args:
+            stop_event: The event signalling that the caller no longer needs synthesis.
+            generation_string: An optional identifier string for logging purposes.
+
+        Returns:
+            True if the lock was acquired, False if the wait was aborted.
+        """
+        while not self.synthesis_lock.acquire(timeout=0.05):
+            if stop_event.is_set():
+                logger.info(f"👄🛑 {generation_string} Stop requested while waiting for the TTS stream.")
+                return False
+        return True
+
+    def _synthesize_locked(
+            self,
+            text: str,
+            audio_chunks: Queue,
+            stop_event: threading.Event,
+            generation_string: str,
+            on_first_chunk: Optional[Callable[[], None]],
+            recorded: Optional[list] = None,
+            stage: str = "quick",
+        ) -> bool:
+        """
+        Body of `synthesize`; must be called while holding `synthesis_lock`.
+
+        Every chunk passed on to `audio_chunks` is also appended to `recorded`, if given.
+        """
+        first_chunk_callback = on_first_chunk or self.on_first_audio_chunk_synthesize
+
+        chunk_size = QUICK_ANSWER_STREAM_CHUNK_SIZE if stage == "quick" else FINAL_ANSWER_STREAM_CHUNK_SIZE
+        if self.fixed_stream_chunk_size is None and self.engine_name == "coqui" and hasattr(self.engine, 'set_stream_chunk_size') and self.current_stream_chunk_size != chunk_size:
+            logger.info(f"👄⚙️ {generation_string} Setting Coqui stream chunk size to {chunk_size} for {stage} synthesis.")
+            self.engine.set_stream_chunk_size(chunk_size)
+            self.current_stream_chunk_size = chunk_size
 
         self.stream.feed(text)
         self.finished_event.clear() # Reset finished event before starting
@@ -307,6 +415,7 @@ class AudioProcessor:
             now = time.time()
             samples = len(chunk) // BPS
             play_duration = samples / SR # Duration of the current chunk
+            on_audio_chunk.audio_duration += play_duration
 
             # --- Orpheus specific: Skip initial silence ---
             if on_audio_chunk.first_call and self.engine_name == "orpheus":
@@ -341,6 +450,7 @@ class AudioProcessor:
                 self._quick_prev_chunk_time = now
                 ttfa_actual = now - start
                 logger.info(f"👄🚀 {generation_string} Quick audio start. TTFA: {ttfa_actual:.2f}s. Text: {text[:50]}...")
+                metrics.TTS_TTFA.labels(engine=self.engine_name, stage=stage).observe(ttfa_actual)
             else:
                 gap = now - self._quick_prev_chunk_time
                 self._quick_prev_chunk_time = now
@@ -356,6 +466,8 @@ class AudioProcessor:
             # --- Buffering Logic ---
             buffer.append(chunk) # Always append the received chunk first
             buf_dur += play_duration # Update buffer duration
+            if recorded is not None:
+                recorded.append(chunk)
 
             if buffering:
                 # Check conditions to flush buffer and stop buffering
@@ -380,10 +492,10 @@ class AudioProcessor:
 
             # --- First Chunk Callback ---
             if put_occurred_this_call and not on_audio_chunk.callback_fired:
-                if self.on_first_audio_chunk_synthesize:
+                if first_chunk_callback:
                     try:
                         logger.info(f"👄🚀 {generation_string} Quick Firing on_first_audio_chunk_synthesize.")
-                        self.on_first_audio_chunk_synthesize()
+                        first_chunk_callback()
                     except Exception as e:
                         logger.error(f"👄💥 {generation_string} Quick Error in on_first_audio_chunk_synthesize callback: {e}", exc_info=True)
                 # Ensure callback fires only once per synthesize call
@@ -392,6 +504,7 @@ class AudioProcessor:
         # Initialize callback state for this run
         on_audio_chunk.first_call = True
         on_audio_chunk.callback_fired = False
+        on_audio_chunk.audio_duration = 0.0
 
         play_kwargs = dict(
             log_synthesized_text=True, # Log the text being synthesized
@@ -430,6 +543,8 @@ class AudioProcessor:
             buffer.clear()
 
         logger.info(f"👄✅ {generation_string} Quick answer synthesis complete. Text: {text[:50]}...")
+        if on_audio_chunk.audio_duration > 0:
+            metrics.TTS_REAL_TIME_FACTOR.labels(engine=self.engine_name, stage=stage).observe((time.time() - start) / on_audio_chunk.audio_duration)
         return True # Indicate successful completion
 
     def synthesize_generator(
@@ -438,6 +553,7 @@ class AudioProcessor:
             audio_chunks: Queue, # Should match self.audio_chunks type
             stop_event: threading.Event,
             generation_string: str = "",
+            on_first_chunk: Optional[Callable[[], None]] = None,
         ) -> bool:
         """
         Synthesizes audio from a generator yielding text chunks and puts audio into a queue.
@@ -457,11 +573,31 @@ class AudioProcessor:
             stop_event: A threading.Event to signal interruption of the synthesis.
                         This should typically be the instance's `self.stop_event`.
             generation_string: An optional identifier string for logging purposes.
+            on_first_chunk: Optional callback fired when the first audio chunk is queued.
+                            Overrides `on_first_audio_chunk_synthesize` for this call.
 
         Returns:
             True if synthesis completed fully, False if interrupted by stop_event.
         """
-        if self.engine_name == "coqui" and hasattr(self.engine, 'set_stream_chunk_size') and self.current_stream_chunk_size != FINAL_ANSWER_STREAM_CHUNK_SIZE:
+        if not self._acquire_synthesis_lock(stop_event, generation_string):
+            return False
+        try:
+            return self._synthesize_generator_locked(generator, audio_chunks, stop_event, generation_string, on_first_chunk)
+        finally:
+            self.synthesis_lock.release()
+
+    def _synthesize_generator_locked(
+            self,
+            generator: Generator[str, None, None],
+            audio_chunks: Queue,
+            stop_event: threading.Event,
+            generation_string: str,
+            on_first_chunk: Optional[Callable[[], None]],
+        ) -> bool:
+        """Body of `synthesize_generator`; must be called while holding `synthesis_lock`."""
+        first_chunk_callback = on_first_chunk or self.on_first_audio_chunk_synthesize
+
+        if self.fixed_stream_chunk_size is None and self.engine_name == "coqui" and hasattr(self.engine, 'set_stream_chunk_size') and self.current_stream_chunk_size != FINAL_ANSWER_STREAM_CHUNK_SIZE:
             logger.info(f"👄⚙️ {generation_string} Setting Coqui stream chunk size to {FINAL_ANSWER_STREAM_CHUNK_SIZE} for generator synthesis.")
             self.engine.set_stream_chunk_size(FINAL_ANSWER_STREAM_CHUNK_SIZE)
             self.current_stream_chunk_size = FINAL_ANSWER_STREAM_CHUNK_SIZE
@@ -488,6 +624,7 @@ class AudioProcessor:
             now = time.time()
             samples = len(chunk) // BPS
             play_duration = samples / SR
+            on_audio_chunk.audio_duration += play_duration
 
             # --- Orpheus specific: Skip initial silence ---
             if on_audio_chunk.first_call and self.engine_name == "orpheus":
@@ -518,6 +655,7 @@ class AudioProcessor:
                 self._final_prev_chunk_time = now
                 ttfa_actual = now-start
                 logger.info(f"👄🚀 {generation_string} Final audio start. TTFA: {ttfa_actual:.2f}s.")
+                metrics.TTS_TTFA.labels(engine=self.engine_name, stage="final").observe(ttfa_actual)
             else:
                 gap = now - self._final_prev_chunk_time
                 self._final_prev_chunk_time = now
@@ -555,10 +693,10 @@ class AudioProcessor:
 
             # --- First Chunk Callback --- (Using the same callback as synthesize)
             if put_occurred_this_call and not on_audio_chunk.callback_fired:
-                if self.on_first_audio_chunk_synthesize:
+                if first_chunk_callback:
                     try:
                         logger.info(f"👄🚀 {generation_string} Final Firing on_first_audio_chunk_synthesize.")
-                        self.on_first_audio_chunk_synthesize()
+                        first_chunk_callback()
                     except Exception as e:
                         logger.error(f"👄💥 {generation_string} Final Error in on_first_audio_chunk_synthesize callback: {e}", exc_info=True)
                 on_audio_chunk.callback_fired = True
@@ -566,6 +704,7 @@ class AudioProcessor:
         # Initialize callback state
         on_audio_chunk.first_call = True
         on_audio_chunk.callback_fired = False
+        on_audio_chunk.audio_duration = 0.0
 
         play_kwargs = dict(
             log_synthesized_text=True, # Log text from generator
@@ -608,4 +747,7 @@ class AudioProcessor:
             buffer.clear()
 
         logger.info(f"👄✅ {generation_string} Final answer synthesis complete.")
+        if on_audio_chunk.audio_duration > 0:
+            # Includes time spent waiting for LLM tokens, so only an upper bound for the engine itself
+            metrics.TTS_REAL_TIME_FACTOR.labels(engine=self.engine_name, stage="final").observe((time.time() - start) / on_audio_chunk.audio_duration)
         return True # Indicate successful completion
\ No newline at end of file
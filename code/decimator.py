@@ -0,0 +1,103 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import firwin
+
+
+class StreamingDecimator:
+    """
+    Streaming 3x decimator (48kHz -> 16kHz) for int16 microphone packets, carrying filter state between calls.
+
+    Uses the same anti-aliasing filter as `scipy.signal.resample_poly(x, 1, 3)`
+    (Kaiser-windowed sinc, beta 5.0, 61 taps) but keeps the last input samples as
+    history and tracks the decimation phase, so packets of any length (the browser
+    sends 2048 samples, not a multiple of 3) produce one seamless output stream
+    without per-packet edge artifacts. Only every third output is computed, and
+    all float work happens in preallocated buffers. Fully silent packets are
+    skipped without filtering once the filter history has decayed to zero.
+
+    Not thread-safe; use one instance per input stream.
+    """
+    DOWN = 3
+    _HALF_LEN = 10 * DOWN # Same filter half length as resample_poly
+    _TAPS_REVERSED = np.ascontiguousarray(firwin(2 * _HALF_LEN + 1, 1.0 / DOWN, window=("kaiser", 5.0))[::-1].astype(np.float32))
+    _HISTORY = 2 * _HALF_LEN # Previous input samples each output depends on
+    _DELAY = _HALF_LEN // DOWN # Group delay in output samples
+
+    def __init__(self, max_chunk_samples: int = 2048):
+        """
+        Initializes the StreamingDecimator.
+
+        Args:
+            max_chunk_samples: Expected maximum packet size; buffers grow if a larger packet arrives.
+        """
+        self._allocate(max_chunk_samples)
+        self.reset()
+
+    def _allocate(self, max_chunk_samples: int) -> None:
+        self._capacity = max_chunk_samples
+        self._buffer = np.zeros(self._HISTORY + max_chunk_samples, dtype=np.float32) # History followed by the current packet
+        self._out = np.empty(max_chunk_samples // self.DOWN + 1, dtype=np.float32)
+
+    def reset(self) -> None:
+        """Clears the filter history, e.g. when the input slot is handed to a new connection."""
+        self._buffer[:self._HISTORY] = 0.0
+        self._history_silent = True
+        self._phase = 0 # Offset of the next output's input sample within the next packet
+        self._pending_delay = self._DELAY # Leading outputs still to drop (filter warm-up)
+
+    def process(self, raw_audio: np.ndarray) -> np.ndarray:
+        """
+        Decimates one packet of 48kHz int16 samples.
+
+        Args:
+            raw_audio: int16 samples at 48kHz.
+
+        Returns:
+            The 16kHz int16 samples that became available with this packet
+            (about a third of the input length).
+        """
+        length = len(raw_audio)
+        if length > self._capacity:
+            history = self._buffer[:self._HISTORY].copy()
+            self._allocate(length)
+            self._buffer[:self._HISTORY] = history
+
+        num_out = (length - self._phase + self.DOWN - 1) // self.DOWN if length > self._phase else 0
+        first = self._phase
+        self._phase = (self._phase - length) % self.DOWN
+
+        # Silence fast path: zeros in, zero history -> zeros out, no filtering needed
+        if self._history_silent and not raw_audio.any():
+            result = np.zeros(num_out, dtype=np.int16)
+        else:
+            buffer = self._buffer[:self._HISTORY + length]
+            np.multiply(raw_audio, 1.0 / 32768.0, out=buffer[self._HISTORY:], casting="unsafe")
+            windows = sliding_window_view(buffer, self._HISTORY + 1)[first::self.DOWN]
+            out = self._out[:num_out]
+            np.matmul(windows, self._TAPS_REVERSED, out=out)
+            np.multiply(out, 32768.0, out=out)
+            np.clip(out, -32768, 32767, out=out)
+            result = out.astype(np.int16)
+
+            # Keep the last input samples as history for the next packet
+            if length >= self._HISTORY:
+                self._buffer[:self._HISTORY] = buffer[length:]
+            else:
+                self._buffer[:self._HISTORY] = buffer[length:length + self._HISTORY]
+            self._history_silent = not self._buffer[:self._HISTORY].any()
+            return self._drop_warmup(result)
+
+        if length >= self._HISTORY:
+            self._buffer[:self._HISTORY] = 0.0
+        else:
+            self._buffer[:self._HISTORY - length] = self._buffer[length:self._HISTORY]
+            self._buffer[self._HISTORY - length:self._HISTORY] = 0.0
+        return self._drop_warmup(result)
+
+    def _drop_warmup(self, result: np.ndarray) -> np.ndarray:
+        """Drops the first outputs of the stream to compensate the filter's group delay."""
+        if self._pending_delay:
+            dropped = min(self._pending_delay, len(result))
+            self._pending_delay -= dropped
+            return result[dropped:]
+        return result
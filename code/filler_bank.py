@@ -0,0 +1,121 @@
+# filler_bank.py
+import logging
+import os
+import random
+import threading
+from queue import Empty, Queue
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable via environment variables
+FILLER_PHRASES = [p.strip() for p in os.getenv("FILLER_PHRASES", "Sure,|Hmm, let me think,|Right,").split("|") if p.strip()]
+try:
+    FILLER_LATENCY_THRESHOLD_MS = float(os.getenv("FILLER_LATENCY_THRESHOLD_MS", 800)) # Expected wait for the answer audio that triggers a filler
+except ValueError:
+    logger.warning("👄💬⚠️ Invalid FILLER_LATENCY_THRESHOLD_MS env var. Using default: 800")
+    FILLER_LATENCY_THRESHOLD_MS = 800.0
+
+SAMPLE_RATE = 24000 # TTS engine output (PCM16 mono)
+CHUNK_BYTES = 4096 # Same size as the TTS stream's playout chunks
+SILENCE_THRESHOLD = 300 # Int16 amplitude below which leading/trailing samples count as silence
+KEEP_TRAILING_MS = 60 # Silence kept after a filler, so it doesn't run into the answer
+FADE_MS = 8 # Fade-in/out applied after trimming to avoid clicks
+
+
+class FillerClip:
+    """A pre-synthesized filler phrase as 24kHz PCM16 audio."""
+    def __init__(self, text: str, pcm: bytes):
+        """
+        Initializes the FillerClip.
+
+        Args:
+            text: The phrase.
+            pcm: The trimmed audio (PCM16 mono at `SAMPLE_RATE`).
+        """
+        self.text = text
+        self.pcm = pcm
+        self.duration_ms = len(pcm) / 2 / SAMPLE_RATE * 1000
+        self.chunks: List[bytes] = [pcm[i:i + CHUNK_BYTES] for i in range(0, len(pcm), CHUNK_BYTES)]
+
+
+class FillerBank:
+    """
+    Short filler phrases ("Sure,", "Hmm, let me think,") synthesized once at startup.
+
+    The clips are synthesized with the shared `AudioProcessor`, so they have the
+    engine and voice of the real answers, and are kept in memory. When the answer
+    audio of a turn is expected to take long, the pipeline plays a clip first
+    (see `SpeechPipelineManager.inject_filler`), at no model cost per turn.
+    """
+    def __init__(self, audio, phrases: Optional[List[str]] = None, threshold_ms: float = FILLER_LATENCY_THRESHOLD_MS):
+        """
+        Synthesizes the filler phrases.
+
+        Args:
+            audio: The shared `AudioProcessor`.
+            phrases: The phrases to synthesize. Defaults to `FILLER_PHRASES`.
+            threshold_ms: Expected wait for the answer audio (ms) above which a filler is played.
+        """
+        self.threshold_ms = threshold_ms
+        self.clips: List[FillerClip] = []
+        self._last: Optional[FillerClip] = None
+        self._lock = threading.Lock()
+
+        for text in FILLER_PHRASES if phrases is None else phrases:
+            try:
+                pcm = self._synthesize(audio, text)
+            except Exception as e:
+                logger.warning(f"👄💬⚠️ Could not synthesize filler '{text}': {e}")
+                continue
+            if pcm:
+                self.clips.append(FillerClip(text, pcm))
+            else:
+                logger.warning(f"👄💬⚠️ Filler '{text}' produced no audio; skipping it.")
+        if self.clips:
+            logger.info(f"👄💬 Filler bank ready: {', '.join(f'{c.text!r} ({c.duration_ms:.0f}ms)' for c in self.clips)}; threshold {self.threshold_ms:.0f}ms.")
+
+    @staticmethod
+    def _synthesize(audio, text: str) -> bytes:
+        """Synthesizes `text` with `audio` and returns the trimmed PCM."""
+        chunks: Queue = Queue()
+        if not audio.synthesize(text, chunks, threading.Event(), generation_string="[Filler]", on_first_chunk=lambda: None):
+            return b""
+        parts = []
+        while True:
+            try:
+                parts.append(chunks.get_nowait())
+            except Empty:
+                break
+        return FillerBank._trim(b"".join(parts))
+
+    @staticmethod
+    def _trim(pcm: bytes) -> bytes:
+        """Cuts leading and trailing silence (keeping a short pause at the end) and fades the edges."""
+        samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype=np.int16)
+        loud = np.flatnonzero(np.abs(samples.astype(np.int32)) >= SILENCE_THRESHOLD)
+        if loud.size == 0:
+            return b""
+        end = min(len(samples), loud[-1] + 1 + SAMPLE_RATE * KEEP_TRAILING_MS // 1000)
+        clip = samples[loud[0]:end].astype(np.float32)
+        fade = min(len(clip) // 2, SAMPLE_RATE * FADE_MS // 1000)
+        if fade:
+            ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+            clip[:fade] *= ramp
+            clip[-fade:] *= ramp[::-1]
+        return clip.astype(np.int16).tobytes()
+
+    def should_inject(self, expected_wait_ms: float) -> bool:
+        """Returns True if a filler should cover an expected wait of `expected_wait_ms` for the answer audio."""
+        return bool(self.clips) and expected_wait_ms >= self.threshold_ms
+
+    def pick(self) -> Optional[FillerClip]:
+        """Returns a random clip, avoiding the one returned last if there is a choice."""
+        with self._lock:
+            if not self.clips:
+                return None
+            choices = [c for c in self.clips if c is not self._last] or self.clips
+            self._last = random.choice(choices)
+            return self._last
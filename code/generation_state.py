@@ -0,0 +1,112 @@
+# generation_state.py
+import logging
+import threading
+import time
+from enum import Enum
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationState(Enum):
+    """Lifecycle states of one speech generation."""
+    CREATED = "created"
+    LLM_STREAMING = "llm_streaming" # First LLM token received
+    QUICK_ANSWER = "quick_answer" # First sentence boundary found
+    QUICK_TTS = "quick_tts" # Quick answer synthesizing
+    FINAL_TTS = "final_tts" # Rest of the answer synthesizing
+    SYNTHESIZED = "synthesized" # All audio queued
+    CANCELLING = "cancelling"
+    CANCELLED = "cancelled"
+
+
+TRANSITIONS: Dict[GenerationState, Set[GenerationState]] = {
+    GenerationState.CREATED: {GenerationState.LLM_STREAMING, GenerationState.CANCELLING},
+    GenerationState.LLM_STREAMING: {GenerationState.QUICK_ANSWER, GenerationState.CANCELLING},
+    GenerationState.QUICK_ANSWER: {GenerationState.QUICK_TTS, GenerationState.CANCELLING},
+    # Final synthesis starts while the quick answer is still synthesizing, or right after it
+    GenerationState.QUICK_TTS: {GenerationState.FINAL_TTS, GenerationState.SYNTHESIZED, GenerationState.CANCELLING},
+    GenerationState.FINAL_TTS: {GenerationState.SYNTHESIZED, GenerationState.CANCELLING},
+    GenerationState.SYNTHESIZED: {GenerationState.CANCELLING}, # Audio may still be queued for sending
+    GenerationState.CANCELLING: {GenerationState.CANCELLED},
+    GenerationState.CANCELLED: set(),
+}
+
+
+class CancellationToken(threading.Event):
+    """
+    One-shot cancellation signal shared by every stage of a generation.
+
+    It is a `threading.Event`, so stages can poll `is_set()` or `wait()` on it,
+    and it can be passed wherever a stop event is expected. `cancel()` records
+    why and when cancellation was requested.
+    """
+    def __init__(self):
+        super().__init__()
+        self.reason: Optional[str] = None
+        self.cancelled_at: Optional[float] = None
+        self._cancel_lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.is_set()
+
+    def cancel(self, reason: str = "") -> bool:
+        """
+        Requests cancellation.
+
+        Args:
+            reason: Why the generation is cancelled (for logging).
+
+        Returns:
+            True if this call cancelled the token, False if it was already cancelled.
+        """
+        with self._cancel_lock:
+            if self.is_set():
+                return False
+            self.reason = reason
+            self.cancelled_at = time.time()
+            self.set()
+        return True
+
+
+class GenerationStateMachine:
+    """
+    Explicit, timestamped state of one generation.
+
+    Stages report progress with `transition`. Moves not allowed by `TRANSITIONS`
+    are ignored (e.g., a late worker reporting progress of a generation already
+    being cancelled), so the state can only move forward.
+    """
+    def __init__(self, generation_id: int):
+        """
+        Initializes the state machine in `GenerationState.CREATED`.
+
+        Args:
+            generation_id: The generation's id, for logging.
+        """
+        self.generation_id = generation_id
+        self._lock = threading.Lock()
+        self.state = GenerationState.CREATED
+        self.history: List[Tuple[GenerationState, float]] = [(GenerationState.CREATED, time.time())]
+
+    def transition(self, new_state: GenerationState) -> bool:
+        """
+        Moves to `new_state` if allowed from the current state.
+
+        Returns:
+            True if the state changed.
+        """
+        with self._lock:
+            if new_state not in TRANSITIONS[self.state]:
+                logger.debug(f"🗣️🔀 [Gen {self.generation_id}] Ignoring transition {self.state.value} -> {new_state.value}.")
+                return False
+            self.state = new_state
+            self.history.append((new_state, time.time()))
+        return True
+
+    def timeline(self) -> str:
+        """Returns the transitions as 'state +ms' steps relative to creation, for logging."""
+        with self._lock:
+            start = self.history[0][1]
+            return " → ".join(f"{s.value} +{(t - start) * 1000:.0f}ms" for s, t in self.history)
@@ -0,0 +1,231 @@
+# history_manager.py
+import logging
+import os
+import threading
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable via environment variables
+try:
+    HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 2048)) # Prompt tokens: system prompt + summary + history
+    HISTORY_KEEP_MESSAGES = int(os.getenv("HISTORY_KEEP_MESSAGES", 6)) # Most recent messages never summarized
+except ValueError:
+    logger.warning("🗣️📜⚠️ Invalid HISTORY_TOKEN_BUDGET / HISTORY_KEEP_MESSAGES env var. Using defaults: 2048, 6")
+    HISTORY_TOKEN_BUDGET = 2048
+    HISTORY_KEEP_MESSAGES = 6
+HISTORY_TOKENIZER = os.getenv("HISTORY_TOKENIZER", "gpt2") # Hugging Face tokenizer used for counting
+
+# Start summarizing once the prompt reaches this fraction of the budget, so the
+# summary is ready before the budget is actually exceeded
+COMPACTION_THRESHOLD = 0.75
+
+SUMMARY_INSTRUCTIONS = (
+    "You compress conversations. Summarize the conversation below between a user and a voice assistant "
+    "in at most 120 words. Keep names, facts, numbers, decisions and open questions. "
+    "Write plain sentences without any preamble."
+)
+
+_tokenizer_cache: Dict[str, Optional[Callable[[str], int]]] = {}
+_tokenizer_cache_lock = threading.Lock()
+
+
+def load_token_counter(tokenizer_name: str = HISTORY_TOKENIZER) -> Callable[[str], int]:
+    """
+    Returns a function counting the tokens of a text (loaded once per process).
+
+    Uses a local Hugging Face tokenizer. If it cannot be loaded (e.g., offline
+    without a cached copy), falls back to an estimate of 4 characters per token.
+
+    Args:
+        tokenizer_name: Hugging Face tokenizer id or local path.
+
+    Returns:
+        A callable mapping text to its token count.
+    """
+    with _tokenizer_cache_lock:
+        if tokenizer_name not in _tokenizer_cache:
+            try:
+                import transformers
+                tokenizer = transformers.AutoTokenizer.from_pretrained(tokenizer_name)
+                _tokenizer_cache[tokenizer_name] = lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+                logger.info(f"🗣️📜 Loaded tokenizer '{tokenizer_name}' for history token counting.")
+            except Exception as e:
+                logger.warning(f"🗣️📜⚠️ Could not load tokenizer '{tokenizer_name}' ({e}). Estimating 4 characters per token.")
+                _tokenizer_cache[tokenizer_name] = None
+        counter = _tokenizer_cache[tokenizer_name]
+    return counter if counter is not None else (lambda text: (len(text) + 3) // 4)
+
+
+class ConversationHistory:
+    """
+    Token-budgeted conversation history with background summarization.
+
+    Stores the user/assistant messages of one session. `messages()` returns what
+    is sent to the LLM: a summary of older turns (as a system message) followed by
+    the recent messages verbatim, never exceeding the token budget together with
+    the system prompt. Once the prompt grows past `COMPACTION_THRESHOLD` of the
+    budget, the oldest messages (all but the last `keep_messages`) are folded into
+    the summary by the LLM on a background thread. Compaction starts when an
+    assistant answer is appended, so it runs while the user speaks the next turn.
+    Until a summary is ready, the oldest messages are simply left out of the prompt.
+
+    Supports `append`, `clear`, `len()` and iteration like the plain list it replaces.
+    """
+    def __init__(
+            self,
+            llm,
+            system_prompt: str = "",
+            token_budget: int = HISTORY_TOKEN_BUDGET,
+            keep_messages: int = HISTORY_KEEP_MESSAGES,
+            count_tokens: Optional[Callable[[str], int]] = None,
+            request_prefix: str = "summary",
+        ):
+        """
+        Initializes the ConversationHistory.
+
+        Args:
+            llm: The `LLM` instance used to produce summaries.
+            system_prompt: The system prompt the LLM prepends; counted against the budget.
+            token_budget: Maximum prompt tokens (system prompt, summary and messages).
+            keep_messages: Number of most recent messages that are never summarized.
+            count_tokens: Token counting function. Defaults to `load_token_counter()`.
+            request_prefix: Prefix for summary LLM request ids (to keep them distinguishable).
+        """
+        self.llm = llm
+        self.token_budget = token_budget
+        self.keep_messages = keep_messages
+        self.count_tokens = count_tokens or load_token_counter()
+        self.request_prefix = request_prefix
+        self.system_prompt_tokens = self.count_tokens(system_prompt) if system_prompt else 0
+
+        self._lock = threading.Lock()
+        self._messages: List[Dict[str, str]] = []
+        self._message_tokens: List[int] = []
+        self.summary: str = ""
+        self._summary_tokens = 0
+        self._epoch = 0 # Incremented by clear() so stale summaries are discarded
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._summary_count = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._messages)
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        with self._lock:
+            return iter(list(self._messages))
+
+    def append(self, message: Dict[str, str]) -> None:
+        """
+        Adds a message and starts background compaction if the prompt grows too large.
+
+        Args:
+            message: A dict with "role" and "content".
+        """
+        tokens = self.count_tokens(message.get("content", ""))
+        with self._lock:
+            self._messages.append(message)
+            self._message_tokens.append(tokens)
+        if message.get("role") == "assistant":
+            self.compact_async()
+
+    def clear(self) -> None:
+        """Removes all messages and the summary. A running compaction's result is discarded."""
+        with self._lock:
+            self._messages.clear()
+            self._message_tokens.clear()
+            self.summary = ""
+            self._summary_tokens = 0
+            self._epoch += 1
+
+    def prompt_tokens(self) -> int:
+        """Returns the token count of the full (uncompacted) prompt: system prompt, summary and all messages."""
+        with self._lock:
+            return self.system_prompt_tokens + self._summary_tokens + sum(self._message_tokens)
+
+    def messages(self) -> List[Dict[str, str]]:
+        """
+        Returns the history to send to the LLM, bounded by the token budget.
+
+        Returns:
+            A new list: the summary as a system message (if any), then as many of the
+            most recent messages as fit the budget. The last message is always included.
+        """
+        with self._lock:
+            remaining = self.token_budget - self.system_prompt_tokens - self._summary_tokens
+            start = len(self._messages)
+            while start > 0 and (remaining >= self._message_tokens[start - 1] or start == len(self._messages)):
+                remaining -= self._message_tokens[start - 1]
+                start -= 1
+            selected = list(self._messages[start:])
+            summary = self.summary
+        if start > 0:
+            logger.info(f"🗣️📜✂️ Prompt over budget, leaving out {start} old messages until their summary is ready.")
+        if summary:
+            selected.insert(0, {"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+        return selected
+
+    def compact_async(self) -> bool:
+        """
+        Starts summarizing the oldest messages on a background thread if the prompt needs it.
+
+        Returns:
+            True if a compaction was started, False if not needed or one is already running.
+        """
+        with self._lock:
+            if self._compaction_thread and self._compaction_thread.is_alive():
+                return False
+            total = self.system_prompt_tokens + self._summary_tokens + sum(self._message_tokens)
+            foldable = len(self._messages) - self.keep_messages
+            if total < self.token_budget * COMPACTION_THRESHOLD or foldable <= 0:
+                return False
+            to_fold = list(self._messages[:foldable])
+            previous_summary = self.summary
+            epoch = self._epoch
+            self._summary_count += 1
+            request_id = f"{self.request_prefix}-{self._summary_count}"
+            self._compaction_thread = threading.Thread(
+                target=self._compact,
+                args=(to_fold, previous_summary, epoch, request_id),
+                name="HistoryCompactionThread",
+                daemon=True,
+            )
+            self._compaction_thread.start()
+        logger.info(f"🗣️📜🔄 Summarizing {len(to_fold)} old messages in the background ({total}/{self.token_budget} tokens).")
+        return True
+
+    def _compact(self, to_fold: List[Dict[str, str]], previous_summary: str, epoch: int, request_id: str) -> None:
+        """Summarizes `to_fold` (plus the previous summary) and replaces those messages with the summary."""
+        lines = []
+        if previous_summary:
+            lines.append(f"Earlier summary: {previous_summary}")
+        lines.extend(f"{m['role'].capitalize()}: {m['content']}" for m in to_fold)
+        try:
+            summary = "".join(self.llm.generate(
+                text="\n".join(lines),
+                history=[{"role": "system", "content": SUMMARY_INSTRUCTIONS}],
+                use_system_prompt=False,
+                request_id=request_id,
+            )).strip()
+        except Exception as e:
+            logger.error(f"🗣️📜💥 History summarization failed: {e}")
+            return
+        if not summary:
+            logger.warning("🗣️📜⚠️ History summarization returned an empty summary; keeping messages.")
+            return
+
+        summary_tokens = self.count_tokens(summary)
+        with self._lock:
+            # Only appends happen meanwhile, so the folded messages are still at the front
+            if epoch != self._epoch or self._messages[:len(to_fold)] != to_fold:
+                logger.info("🗣️📜🗑️ History changed during summarization; discarding summary.")
+                return
+            del self._messages[:len(to_fold)]
+            del self._message_tokens[:len(to_fold)]
+            self.summary = summary
+            self._summary_tokens = summary_tokens
+            total = self.system_prompt_tokens + self._summary_tokens + sum(self._message_tokens)
+            self._compaction_thread = None
+        logger.info(f"🗣️📜✅ Folded {len(to_fold)} messages into a {summary_tokens}-token summary (prompt now {total}/{self.token_budget} tokens).")
+        self.compact_async() # Messages appended meanwhile may already need the next round
@@ -0,0 +1,118 @@
+# latency_calibration.py
+import logging
+import os
+import threading
+from collections import deque
+from typing import Callable, Deque, List
+
+import numpy as np
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable via environment variables
+USE_LATENCY_CALIBRATION = os.getenv("USE_LATENCY_CALIBRATION", "true").lower() in ("1", "true", "yes")
+try:
+    LATENCY_CALIBRATION_ALPHA = float(os.getenv("LATENCY_CALIBRATION_ALPHA", 0.2)) # EWMA weight of the newest turn
+    LATENCY_CALIBRATION_PERCENTILE = float(os.getenv("LATENCY_CALIBRATION_PERCENTILE", 75)) # Floor of the estimate over recent turns
+    LATENCY_CALIBRATION_WINDOW = int(os.getenv("LATENCY_CALIBRATION_WINDOW", 50)) # Recent turns the percentile is taken over
+    LATENCY_CALIBRATION_MAX_MS = float(os.getenv("LATENCY_CALIBRATION_MAX_MS", 3000)) # Upper bound of the estimate
+except ValueError:
+    logger.warning("⏱️⚠️ Invalid LATENCY_CALIBRATION_ALPHA / _PERCENTILE / _WINDOW / _MAX_MS env var. Using defaults: 0.2, 75, 50, 3000")
+    LATENCY_CALIBRATION_ALPHA = 0.2
+    LATENCY_CALIBRATION_PERCENTILE = 75.0
+    LATENCY_CALIBRATION_WINDOW = 50
+    LATENCY_CALIBRATION_MAX_MS = 3000.0
+
+MIN_PERCENTILE_SAMPLES = 5 # Below this, only the EWMA is used
+MIN_PUBLISHED_CHANGE_MS = 10.0 # Smaller changes are not pushed to subscribers
+
+
+class PipelineLatencyCalibrator:
+    """
+    Rolling estimate of the output pipeline latency (LLM request to first audio chunk).
+
+    Starts from the latency measured at startup and is fed by real turns. The
+    estimate is the EWMA of the observed latencies, so it follows drift from load,
+    model residency and growing history, but never below the given percentile of
+    the recent turns, so speculative generation starts early enough for most
+    turns rather than just the average one. Subscribers (silence monitor, turn
+    detection) are called with the new estimate in seconds when it changes.
+    Thread-safe.
+    """
+    def __init__(
+            self,
+            initial_ms: float,
+            alpha: float = LATENCY_CALIBRATION_ALPHA,
+            percentile: float = LATENCY_CALIBRATION_PERCENTILE,
+            window: int = LATENCY_CALIBRATION_WINDOW,
+            max_ms: float = LATENCY_CALIBRATION_MAX_MS,
+        ):
+        """
+        Initializes the PipelineLatencyCalibrator.
+
+        Args:
+            initial_ms: Latency measured at startup, used until turns are observed.
+            alpha: EWMA weight of each new observation (0..1).
+            percentile: Percentile of the recent observations the estimate does not go below.
+            window: Number of recent observations the percentile is taken over.
+            max_ms: Upper bound of the estimate, guarding against outliers (e.g., a model reload).
+        """
+        self.alpha = min(max(alpha, 0.0), 1.0)
+        self.percentile = percentile
+        self.max_ms = max_ms
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = deque(maxlen=max(1, window))
+        self._ewma = initial_ms
+        self._estimate = min(initial_ms, max_ms)
+        self._published = self._estimate
+        self._subscribers: List[Callable[[float], None]] = []
+        metrics.PIPELINE_LATENCY_ESTIMATE.set(self._estimate / 1000)
+
+    @property
+    def estimate_ms(self) -> float:
+        """The current latency estimate in milliseconds."""
+        return self._estimate
+
+    def subscribe(self, callback: Callable[[float], None]) -> None:
+        """
+        Registers a callback receiving the estimate in seconds whenever it changes noticeably.
+
+        The callback is called right away with the current estimate. It runs on
+        the thread that reported the turn, so it must be quick.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        callback(self._estimate / 1000)
+
+    def observe(self, latency_ms: float) -> None:
+        """
+        Records the pipeline latency of one real turn and updates the estimate.
+
+        Args:
+            latency_ms: Milliseconds from LLM request to the first synthesized audio chunk.
+        """
+        if latency_ms <= 0:
+            return
+        with self._lock:
+            self._samples.append(latency_ms)
+            self._ewma += self.alpha * (latency_ms - self._ewma)
+            estimate = self._ewma
+            if len(self._samples) >= MIN_PERCENTILE_SAMPLES:
+                estimate = max(estimate, float(np.percentile(self._samples, self.percentile)))
+            self._estimate = min(estimate, self.max_ms)
+            publish = abs(self._estimate - self._published) >= MIN_PUBLISHED_CHANGE_MS
+            if publish:
+                self._published = self._estimate
+            subscribers = list(self._subscribers)
+        metrics.PIPELINE_LATENCY_ESTIMATE.set(self._estimate / 1000)
+        logger.debug(f"⏱️ Pipeline latency observed: {latency_ms:.0f}ms, estimate: {self._estimate:.0f}ms.")
+        if not publish:
+            return
+        logger.info(f"⏱️🔧 Pipeline latency estimate updated to {self._estimate:.0f}ms.")
+        for callback in subscribers:
+            try:
+                callback(self._estimate / 1000)
+            except Exception as e:
+                logger.warning(f"⏱️💥 Error in pipeline latency subscriber: {e}")
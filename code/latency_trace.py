@@ -0,0 +1,215 @@
+# latency_trace.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Stages of one user turn, in pipeline order. All timestamps are server-side `time.time()` seconds.
+TRACE_STAGES = (
+    "last_speech_frame",   # Server receive time of the last audio chunk fed before silence was detected
+    "silence_start",       # Speech end silence start reported by the STT recorder
+    "potential_sentence",  # on_potential_sentence fired for the text that got answered
+    "prepare_generation",  # SpeechPipelineManager created the RunningGeneration
+    "llm_first_token",     # First token received from the LLM stream
+    "quick_answer_ready",  # Quick answer text complete, handed to quick TTS
+    "tts_first_chunk",     # First synthesized audio chunk queued by the TTS engine
+    "first_chunk_sent",    # First TTS audio frame queued to the WebSocket
+    "client_tts_start",    # Client reported playback start (tts_start message received)
+)
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Optional JSON-lines file to append finished turn traces to
+LATENCY_TRACE_FILE = os.getenv("LATENCY_TRACE_FILE", "")
+
+try:
+    LATENCY_STATS_WINDOW = int(os.getenv("LATENCY_STATS_WINDOW", 500))
+except ValueError:
+    logger.warning("⏱️⚠️ Invalid LATENCY_STATS_WINDOW env var. Using default: 500")
+    LATENCY_STATS_WINDOW = 500
+
+
+class TurnTrace:
+    """
+    Collects the timestamps of a single user turn, from last speech frame to client playback.
+
+    Stages are the names in `TRACE_STAGES`. Marks are plain `time.time()` seconds
+    recorded on the server, so offsets between stages are comparable even though
+    the client clock is not synchronized.
+    """
+    def __init__(self, session_id: str, turn_id: int):
+        """
+        Initializes an empty TurnTrace.
+
+        Args:
+            session_id: Identifier of the session the turn belongs to.
+            turn_id: Sequential number of the turn within the session.
+        """
+        self.session_id = session_id
+        self.turn_id = turn_id
+        self.marks: Dict[str, float] = {}
+        self.attributes: Dict[str, Any] = {}
+        self.potential_sentences: Dict[str, float] = {} # Text -> first time it was reported
+        self.finished = False
+
+    def mark(self, stage: str, timestamp: Optional[float] = None, overwrite: bool = True) -> None:
+        """
+        Records the time a stage was reached.
+
+        Args:
+            stage: One of `TRACE_STAGES`.
+            timestamp: `time.time()` seconds. Defaults to now.
+            overwrite: If False, keeps an already recorded timestamp for this stage.
+        """
+        if stage not in TRACE_STAGES:
+            logger.warning(f"⏱️⚠️ Unknown trace stage '{stage}' ignored.")
+            return
+        if not overwrite and stage in self.marks:
+            return
+        self.marks[stage] = timestamp if timestamp is not None else time.time()
+
+    def clear(self, stage: str) -> None:
+        """Removes a recorded stage (e.g., when speech resumed after a silence start)."""
+        self.marks.pop(stage, None)
+
+    def add_potential_sentence(self, text: str, timestamp: Optional[float] = None) -> None:
+        """Remembers when a potential sentence was first reported, to match it to the answered generation later."""
+        self.potential_sentences.setdefault(text, timestamp if timestamp is not None else time.time())
+
+    def is_empty(self) -> bool:
+        """Returns True if no stage has been recorded."""
+        return not self.marks
+
+    def offsets_ms(self) -> Dict[str, float]:
+        """
+        Returns each recorded stage as milliseconds since the turn's reference point.
+
+        The reference point is `last_speech_frame` if recorded, otherwise the
+        earliest recorded stage.
+        """
+        if not self.marks:
+            return {}
+        origin = self.marks.get("last_speech_frame", min(self.marks.values()))
+        return {
+            stage: (self.marks[stage] - origin) * 1000
+            for stage in TRACE_STAGES if stage in self.marks
+        }
+
+    def deltas_ms(self) -> Dict[str, float]:
+        """Returns milliseconds spent between each recorded stage and the previous recorded stage."""
+        deltas: Dict[str, float] = {}
+        prev_stage: Optional[str] = None
+        for stage in TRACE_STAGES:
+            if stage not in self.marks:
+                continue
+            if prev_stage is not None:
+                deltas[f"{prev_stage}->{stage}"] = (self.marks[stage] - self.marks[prev_stage]) * 1000
+            prev_stage = stage
+        return deltas
+
+    def to_event(self) -> Dict[str, Any]:
+        """
+        Builds the structured event describing this turn.
+
+        Returns:
+            A JSON-serializable dictionary with raw marks, per-stage offsets,
+            stage-to-stage deltas and any extra attributes.
+        """
+        return {
+            "event": "turn_latency",
+            "session": self.session_id,
+            "turn": self.turn_id,
+            "complete": all(stage in self.marks for stage in TRACE_STAGES),
+            "marks": {stage: self.marks[stage] for stage in TRACE_STAGES if stage in self.marks},
+            "offsets_ms": {k: round(v, 1) for k, v in self.offsets_ms().items()},
+            "deltas_ms": {k: round(v, 1) for k, v in self.deltas_ms().items()},
+            **({"attributes": self.attributes} if self.attributes else {}),
+        }
+
+
+class LatencyStats:
+    """
+    Aggregates finished TurnTraces and reports latency percentiles.
+
+    Keeps a sliding window of the most recent turns per stage offset and
+    stage-to-stage delta. Every recorded trace is also exported as a structured
+    JSON log line and, if `LATENCY_TRACE_FILE` is set, appended to that file.
+    Thread-safe.
+    """
+    def __init__(self, window: int = LATENCY_STATS_WINDOW, trace_file: str = LATENCY_TRACE_FILE):
+        """
+        Initializes the LatencyStats aggregator.
+
+        Args:
+            window: Number of most recent samples kept per series.
+            trace_file: Optional path of a JSON-lines file to append turn events to.
+        """
+        self.window = window
+        self.trace_file = trace_file
+        self._lock = threading.Lock()
+        self._offsets: Dict[str, Deque[float]] = {}
+        self._deltas: Dict[str, Deque[float]] = {}
+        self.turns_recorded = 0
+
+    def record(self, trace: TurnTrace) -> None:
+        """
+        Exports a finished trace and adds its offsets and deltas to the window.
+
+        Args:
+            trace: The finished TurnTrace. Empty traces are ignored.
+        """
+        if trace.is_empty():
+            return
+        event = trace.to_event()
+        line = json.dumps(event)
+        logger.info(f"⏱️📊 {line}")
+
+        if self.trace_file:
+            try:
+                with open(self.trace_file, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                logger.warning(f"⏱️⚠️ Could not write latency trace to {self.trace_file}: {e}")
+
+        with self._lock:
+            self.turns_recorded += 1
+            for series, values in ((self._offsets, event["offsets_ms"]), (self._deltas, event["deltas_ms"])):
+                for name, value in values.items():
+                    series.setdefault(name, deque(maxlen=self.window)).append(value)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Computes percentile summaries over the current window.
+
+        Returns:
+            A dictionary with the number of recorded turns and, for every stage
+            offset and stage-to-stage delta, the sample count and p50/p90/p95/p99
+            in milliseconds.
+        """
+        def describe(series: Dict[str, Deque[float]]) -> Dict[str, Dict[str, float]]:
+            result = {}
+            for name, values in series.items():
+                if not values:
+                    continue
+                data = np.fromiter(values, dtype=np.float64)
+                result[name] = {"count": int(data.size)}
+                for q, value in zip(PERCENTILES, np.percentile(data, PERCENTILES)):
+                    result[name][f"p{q}"] = round(float(value), 1)
+            return result
+
+        with self._lock:
+            offsets = {stage: self._offsets[stage] for stage in TRACE_STAGES if stage in self._offsets}
+            deltas = dict(self._deltas)
+            return {
+                "turns": self.turns_recorded,
+                "window": self.window,
+                "offsets_ms": describe(offsets),
+                "deltas_ms": describe(deltas),
+            }
@@ -10,6 +10,8 @@ import subprocess # <-- Restored usage
 from typing import Generator, List, Dict, Optional, Any
 from threading import Lock
 
+import metrics
+
 # --- Library Dependencies ---
 try:
     import requests
@@ -634,6 +636,7 @@ class LLM:
 
         req_id = request_id if request_id else f"{self.backend}-{uuid.uuid4()}"
         logger.info(f"🤖💬 Starting generation (Request ID: {req_id})")
+        request_start_time = time.time()
 
         messages = []
         if use_system_prompt and self.system_prompt_message:
@@ -657,6 +660,9 @@ class LLM:
             if self.backend == "openai":
                 if self.client is None:
                     raise RuntimeError("OpenAI client not initialized (should have been caught by lazy_init).")
+                if self.effective_openai_base_url:
+                    # Custom OpenAI-compatible server (e.g., llama.cpp): reuse the evaluated prompt prefix
+                    kwargs.setdefault("extra_body", {"cache_prompt": True})
                 payload = { "model": self.model, "messages": messages, "stream": True, **kwargs }
                 logger.info(f"🤖💬 [{req_id}] Sending OpenAI request with payload:")
                 logger.info(f"{json.dumps(payload, indent=2)}")
@@ -665,13 +671,14 @@ class LLM:
                 )
                 stream_object_to_register = stream_iterator # The Stream object itself
                 self._register_request(req_id, "openai", stream_object_to_register)
-                yield from self._yield_openai_chunks(stream_iterator, req_id)
+                yield from self._measure_stream(self._yield_openai_chunks(stream_iterator, req_id), request_start_time)
 
             elif self.backend == "lmstudio":
                 if self.client is None:
                     raise RuntimeError("LM Studio client not initialized (should have been caught by lazy_init).")
                 if 'temperature' not in kwargs:
                     kwargs['temperature'] = 0.7
+                kwargs.setdefault("extra_body", {"cache_prompt": True}) # llama.cpp-based servers reuse the evaluated prompt prefix
                 payload = { "model": self.model, "messages": messages, "stream": True, **kwargs }
                 logger.info(f"🤖💬 [{req_id}] Sending LM Studio request with payload:")
                 logger.info(f"{json.dumps(payload, indent=2)}")
@@ -680,7 +687,7 @@ class LLM:
                 )
                 stream_object_to_register = stream_iterator # The Stream object itself
                 self._register_request(req_id, "lmstudio", stream_object_to_register)
-                yield from self._yield_openai_chunks(stream_iterator, req_id)
+                yield from self._measure_stream(self._yield_openai_chunks(stream_iterator, req_id), request_start_time)
 
             elif self.backend == "ollama":
                 if self.ollama_session is None:
@@ -689,6 +696,7 @@ class LLM:
                     raise ValueError("Ollama base URL not configured.")
                 # Connection check (and potential ps fallback) happened in lazy_init
 
+                # Ollama's runner reuses the KV cache for the prompt prefix shared with the previous request on its own
                 ollama_api_url = f"{self.effective_ollama_url}/api/chat"
                 valid_options = {"temperature", "top_k", "top_p", "num_predict", "stop"}
                 options = {k: v for k, v in kwargs.items() if k in valid_options}
@@ -710,7 +718,7 @@ class LLM:
                 response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
                 stream_object_to_register = response # The requests.Response object
                 self._register_request(req_id, "ollama", stream_object_to_register)
-                yield from self._yield_ollama_chunks(response, req_id)
+                yield from self._measure_stream(self._yield_ollama_chunks(response, req_id), request_start_time)
 
             else:
                 # This case should technically be caught by __init__
@@ -745,6 +753,33 @@ class LLM:
             logger.debug(f"🤖ℹ️ [{req_id}] Exiting finally block. Active requests: {len(self._active_requests)}")
 
 
+    def _measure_stream(self, chunks: Generator[str, None, None], request_start_time: float) -> Generator[str, None, None]:
+        """
+        Passes through a token stream while recording TTFT and throughput metrics.
+
+        Args:
+            chunks: The backend-specific token generator.
+            request_start_time: `time.time()` when the generation request was started.
+
+        Yields:
+            str: The tokens from `chunks`, unchanged.
+        """
+        first_token_time = None
+        token_count = 0
+        try:
+            for chunk in chunks:
+                if first_token_time is None:
+                    first_token_time = time.time()
+                    metrics.LLM_TTFT.labels(backend=self.backend).observe(first_token_time - request_start_time)
+                token_count += 1
+                yield chunk
+        finally:
+            if token_count:
+                metrics.LLM_TOKENS.labels(backend=self.backend).inc(token_count)
+                stream_duration = time.time() - first_token_time
+                if token_count > 1 and stream_duration > 0:
+                    metrics.LLM_TOKENS_PER_SECOND.labels(backend=self.backend).observe((token_count - 1) / stream_duration)
+
     # --- Backend-Specific Chunk Yielding Helpers ---
     def _yield_openai_chunks(self, stream, request_id: str) -> Generator[str, None, None]:
         """
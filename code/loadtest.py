@@ -0,0 +1,400 @@
+# loadtest.py
+"""
+Multi-session WebSocket load generator for the voice chat server.
+
+Opens N concurrent `/ws` sessions, streams a recorded utterance as 48kHz PCM using
+the same 8-byte header framing as `static/app.js`, plays back the returned TTS
+audio in simulated real time (sending `tts_start` / `tts_stop` like the browser),
+and reports voice-to-voice latency, dropped frames and event-loop lag with
+p50/p95/p99. Intended to run against the mock backends (`USE_MOCK_BACKENDS=1`).
+
+Example:
+    USE_MOCK_BACKENDS=1 MAX_SESSIONS=8 python server.py
+    python loadtest.py --wav utterance.wav --sessions 8 --turns 5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import struct
+import time
+import urllib.request
+import wave
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy.signal import resample_poly
+
+try:
+    import websockets
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Must match static/app.js and server.py
+MIC_SAMPLE_RATE = 48000
+BATCH_SAMPLES = 2048
+MIC_HEADER = struct.Struct("!II") # uint32 timestamp ms, uint32 flags (bit 0: TTS playing)
+TTS_FRAME_HEADER = struct.Struct("!III") # uint32 generation id, uint32 sequence, uint32 sample rate
+PACKET_INTERVAL = BATCH_SAMPLES / MIC_SAMPLE_RATE
+
+PERCENTILES = (50, 95, 99)
+
+
+def load_wav_48k(path: str) -> np.ndarray:
+    """
+    Loads a PCM16 WAV file as mono 48kHz int16 samples.
+
+    Args:
+        path: Path to a 16-bit PCM WAV file (any sample rate, mono or stereo).
+
+    Returns:
+        The audio as a mono int16 numpy array at 48kHz.
+    """
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported.")
+        channels = wf.getnchannels()
+        rate = wf.getframerate()
+        audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if rate != MIC_SAMPLE_RATE:
+        gcd = np.gcd(rate, MIC_SAMPLE_RATE)
+        resampled = resample_poly(audio.astype(np.float32), MIC_SAMPLE_RATE // gcd, rate // gcd)
+        audio = np.clip(resampled, -32768, 32767).astype(np.int16)
+    return audio
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Returns count, mean, max and p50/p95/p99 of `values` (empty dict if there are none)."""
+    if not values:
+        return {}
+    data = np.asarray(values, dtype=np.float64)
+    result = {"count": int(data.size), "mean": round(float(data.mean()), 1), "max": round(float(data.max()), 1)}
+    for q, value in zip(PERCENTILES, np.percentile(data, PERCENTILES)):
+        result[f"p{q}"] = round(float(value), 1)
+    return result
+
+
+class SessionResult:
+    """Measurements collected by one simulated client session."""
+    def __init__(self, index: int):
+        self.index = index
+        self.connected = False
+        self.rejected = False
+        self.error: Optional[str] = None
+        self.voice_to_voice_ms: List[float] = []
+        self.final_request_ms: List[float] = [] # Speech end -> final_user_request received
+        self.turns_completed = 0
+        self.turns_timed_out = 0
+        self.tts_frames = 0
+        self.tts_seq_gaps = 0 # TTS frames missing within a generation (by sequence number)
+        self.mic_packets_sent = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+class SimulatedClient:
+    """
+    One browser-like client: streams microphone packets and simulates TTS playback.
+
+    Mirrors `static/app.js`: sends 2048-sample packets with the 8-byte header in real
+    time (silence between utterances), reports `tts_start` when the first TTS frame
+    arrives and `tts_stop` once the received audio has finished "playing".
+    """
+    def __init__(self, index: int, url: str, utterance: np.ndarray, turns: int, pause: float, turn_timeout: float):
+        self.result = SessionResult(index)
+        self.url = url
+        self.utterance = utterance
+        self.turns = turns
+        self.pause = pause
+        self.turn_timeout = turn_timeout
+
+        self.ws = None
+        self.tts_playing = False
+        self.playback_end = 0.0
+        self.speech_end_time: Optional[float] = None
+        self.awaiting_audio = False
+        self.awaiting_request = False
+        self.turn_done = asyncio.Event()
+        self.current_gen: Optional[int] = None
+        self.expected_seq = 0
+
+    async def run(self, start_delay: float) -> SessionResult:
+        """Connects, runs all turns and returns the collected measurements."""
+        await asyncio.sleep(start_delay)
+        try:
+            async with websockets.connect(self.url, max_size=None) as ws:
+                self.ws = ws
+                self.result.connected = True
+                receiver = asyncio.create_task(self._receive())
+                try:
+                    await self._send_turns()
+                finally:
+                    receiver.cancel()
+                    await asyncio.gather(receiver, return_exceptions=True)
+        except websockets.exceptions.ConnectionClosed as e:
+            code = getattr(getattr(e, "rcvd", None), "code", None) or getattr(e, "code", None)
+            if code == 1013:
+                self.result.rejected = True
+            else:
+                self.result.error = repr(e)
+        except Exception as e:
+            self.result.error = repr(e)
+        return self.result
+
+    async def _send_packet(self, samples: np.ndarray) -> None:
+        if len(samples) < BATCH_SAMPLES:
+            samples = np.pad(samples, (0, BATCH_SAMPLES - len(samples)))
+        header = MIC_HEADER.pack(int(time.time() * 1000) & 0xFFFFFFFF, 1 if self.tts_playing else 0)
+        await self.ws.send(header + samples.astype(np.int16).tobytes())
+        self.result.mic_packets_sent += 1
+
+        # Simulated playback finished -> report like the browser's ttsPlaybackStopped
+        if self.tts_playing and time.time() >= self.playback_end:
+            self.tts_playing = False
+            await self.ws.send(json.dumps({"type": "tts_stop"}))
+
+    async def _stream(self, audio: Optional[np.ndarray], duration: float = 0.0, until: Optional[asyncio.Event] = None) -> bool:
+        """
+        Sends packets in real time: the given audio, or silence for `duration` / until `until` is set.
+
+        Returns:
+            False if streaming silence timed out before `until` was set, True otherwise.
+        """
+        next_send = time.perf_counter()
+        silence = np.zeros(BATCH_SAMPLES, dtype=np.int16)
+        deadline = time.perf_counter() + duration
+        offset = 0
+        while True:
+            if audio is not None:
+                if offset >= len(audio):
+                    return True
+                packet = audio[offset:offset + BATCH_SAMPLES]
+                offset += BATCH_SAMPLES
+            else:
+                if until is not None and until.is_set() and not self.tts_playing:
+                    return True
+                if time.perf_counter() >= deadline:
+                    return until is None
+                packet = silence
+            await self._send_packet(packet)
+            next_send += PACKET_INTERVAL
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+
+    async def _send_turns(self) -> None:
+        await self._stream(None, duration=0.5) # Let the server settle on silence first
+        for _ in range(self.turns):
+            self.turn_done.clear()
+            await self._stream(self.utterance)
+            self.speech_end_time = time.time()
+            self.awaiting_audio = True
+            self.awaiting_request = True
+            if await self._stream(None, duration=self.turn_timeout, until=self.turn_done):
+                self.result.turns_completed += 1
+            else:
+                self.result.turns_timed_out += 1
+                self.awaiting_audio = False
+            await self._stream(None, duration=self.pause * random.uniform(0.75, 1.25))
+
+    async def _receive(self) -> None:
+        async for message in self.ws:
+            now = time.time()
+            if isinstance(message, bytes):
+                self._on_tts_frame(message, now)
+                if not self.tts_playing:
+                    self.tts_playing = True
+                    await self.ws.send(json.dumps({"type": "tts_start"}))
+                continue
+
+            data = json.loads(message)
+            msg_type = data.get("type")
+            if msg_type == "final_user_request" and self.awaiting_request and self.speech_end_time:
+                self.awaiting_request = False
+                self.result.final_request_ms.append((now - self.speech_end_time) * 1000)
+            elif msg_type == "final_assistant_answer":
+                self.turn_done.set()
+            elif msg_type in ("stop_tts", "tts_interruption"):
+                self.playback_end = now
+                if self.tts_playing:
+                    self.tts_playing = False
+                    await self.ws.send(json.dumps({"type": "tts_stop"}))
+
+    def _on_tts_frame(self, frame: bytes, now: float) -> None:
+        if len(frame) < TTS_FRAME_HEADER.size:
+            return
+        gen_id, seq, sample_rate = TTS_FRAME_HEADER.unpack_from(frame)
+        self.result.tts_frames += 1
+        if gen_id != self.current_gen:
+            self.current_gen = gen_id
+            self.expected_seq = 0
+        if seq > self.expected_seq:
+            self.result.tts_seq_gaps += seq - self.expected_seq
+        self.expected_seq = seq + 1
+
+        if self.awaiting_audio and self.speech_end_time:
+            self.awaiting_audio = False
+            self.result.voice_to_voice_ms.append((now - self.speech_end_time) * 1000)
+
+        duration = (len(frame) - TTS_FRAME_HEADER.size) / 2 / sample_rate
+        self.playback_end = max(now, self.playback_end) + duration
+
+
+async def monitor_loop_lag(samples: List[float], interval: float = 0.05) -> None:
+    """Records how late this process's event loop wakes up (ms), to validate the load generator itself."""
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - scheduled) * 1000)
+
+
+def scrape_metrics(metrics_url: str) -> Dict[str, float]:
+    """
+    Fetches the server's /metrics page and returns label-less sample values by name.
+
+    Returns an empty dict if the endpoint is unreachable.
+    """
+    try:
+        with urllib.request.urlopen(metrics_url, timeout=5.0) as response:
+            text = response.read().decode("utf-8")
+    except Exception as e:
+        logger.warning(f"📊⚠️ Could not scrape {metrics_url}: {e}")
+        return {}
+    values: Dict[str, float] = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = re.match(r'^([a-zA-Z_:][\w:]*(?:\{[^}]*\})?) (\S+)$', line)
+        if match:
+            values[match.group(1)] = float(match.group(2))
+    return values
+
+
+def histogram_quantile(q: float, before: Dict[str, float], after: Dict[str, float], name: str) -> Optional[float]:
+    """
+    Estimates quantile `q` (0-1) of a label-less histogram between two scrapes, like PromQL's histogram_quantile.
+
+    Returns:
+        The estimated value, or None if no observations happened in between.
+    """
+    pattern = re.compile(rf'^{name}_bucket\{{le="([^"]+)"\}}$')
+    buckets = []
+    for key, value in after.items():
+        match = pattern.match(key)
+        if match:
+            buckets.append((float(match.group(1)), value - before.get(key, 0.0)))
+    buckets.sort()
+    if not buckets or buckets[-1][1] <= 0:
+        return None
+    rank = q * buckets[-1][1]
+    prev_bound, prev_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float("inf"):
+                return prev_bound
+            fraction = (rank - prev_count) / (count - prev_count) if count > prev_count else 0.0
+            return prev_bound + (bound - prev_bound) * fraction
+        prev_bound, prev_count = bound, count
+    return prev_bound
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    """Runs all simulated sessions and returns the aggregated report."""
+    utterance = load_wav_48k(args.wav)
+    metrics_url = args.url.replace("ws://", "http://").replace("wss://", "https://").rsplit("/ws", 1)[0] + "/metrics"
+    metrics_before = await asyncio.to_thread(scrape_metrics, metrics_url)
+
+    loop_lag_ms: List[float] = []
+    lag_task = asyncio.create_task(monitor_loop_lag(loop_lag_ms))
+    clients = [SimulatedClient(i, args.url, utterance, args.turns, args.pause, args.turn_timeout) for i in range(args.sessions)]
+    started = time.time()
+    results = await asyncio.gather(*(c.run(start_delay=i * args.ramp) for i, c in enumerate(clients)))
+    elapsed = time.time() - started
+    lag_task.cancel()
+
+    metrics_after = await asyncio.to_thread(scrape_metrics, metrics_url)
+    server: Dict[str, Any] = {}
+    if metrics_before and metrics_after:
+        for name in ("rvc_audio_chunks_received_total", "rvc_audio_chunks_dropped_total", "rvc_generation_aborts_total", "rvc_sessions_rejected_total"):
+            server[name] = metrics_after.get(name, 0.0) - metrics_before.get(name, 0.0)
+        for q in (0.5, 0.95, 0.99):
+            value = histogram_quantile(q, metrics_before, metrics_after, "rvc_event_loop_lag_seconds")
+            server[f"event_loop_lag_p{int(q * 100)}_ms"] = round(value * 1000, 2) if value is not None else None
+
+    all_v2v = [v for r in results for v in r.voice_to_voice_ms]
+    all_request = [v for r in results for v in r.final_request_ms]
+    return {
+        "sessions": args.sessions,
+        "duration_s": round(elapsed, 1),
+        "connected": sum(r.connected for r in results),
+        "rejected": sum(r.rejected for r in results),
+        "errors": [r.error for r in results if r.error],
+        "turns_completed": sum(r.turns_completed for r in results),
+        "turns_timed_out": sum(r.turns_timed_out for r in results),
+        "voice_to_voice_ms": percentiles(all_v2v),
+        "speech_end_to_final_request_ms": percentiles(all_request),
+        "tts_frames": sum(r.tts_frames for r in results),
+        "tts_frames_missing": sum(r.tts_seq_gaps for r in results),
+        "client_loop_lag_ms": percentiles(loop_lag_ms),
+        "server": server,
+        "per_session": [
+            {"index": r.index, "turns_completed": r.turns_completed, "turns_timed_out": r.turns_timed_out,
+             "voice_to_voice_ms": percentiles(r.voice_to_voice_ms), "tts_frames_missing": r.tts_seq_gaps,
+             "rejected": r.rejected, "error": r.error}
+            for r in results
+        ],
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Prints a human-readable summary of a load test report."""
+    def fmt(stats: Dict[str, float]) -> str:
+        if not stats:
+            return "n/a"
+        return f"p50 {stats['p50']:.0f}  p95 {stats['p95']:.0f}  p99 {stats['p99']:.0f}  max {stats['max']:.0f}  (n={stats['count']})"
+
+    print(f"\n📊 Load test: {report['sessions']} sessions, {report['duration_s']}s")
+    print(f"   connected {report['connected']}, rejected {report['rejected']}, errors {len(report['errors'])}")
+    print(f"   turns completed {report['turns_completed']}, timed out {report['turns_timed_out']}")
+    print(f"   voice-to-voice ms:            {fmt(report['voice_to_voice_ms'])}")
+    print(f"   speech end -> final request:  {fmt(report['speech_end_to_final_request_ms'])}")
+    print(f"   TTS frames {report['tts_frames']}, missing {report['tts_frames_missing']}")
+    print(f"   client loop lag ms:           {fmt(report['client_loop_lag_ms'])}")
+    if report["server"]:
+        server = report["server"]
+        print(f"   server mic chunks received {server['rvc_audio_chunks_received_total']:.0f}, dropped {server['rvc_audio_chunks_dropped_total']:.0f}")
+        print(f"   server aborts {server['rvc_generation_aborts_total']:.0f}, rejected sessions {server['rvc_sessions_rejected_total']:.0f}")
+        print(f"   server loop lag ms: p50 {server['event_loop_lag_p50_ms']}  p95 {server['event_loop_lag_p95_ms']}  p99 {server['event_loop_lag_p99_ms']}")
+    for error in report["errors"]:
+        print(f"   ⚠️ {error}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Multi-session WebSocket load generator for the voice chat server.")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/ws", help="WebSocket endpoint.")
+    parser.add_argument("--wav", required=True, help="16-bit PCM WAV file with one user utterance.")
+    parser.add_argument("--sessions", type=int, default=4, help="Number of concurrent sessions.")
+    parser.add_argument("--turns", type=int, default=3, help="Utterances per session.")
+    parser.add_argument("--pause", type=float, default=2.0, help="Mean silence between turns in seconds.")
+    parser.add_argument("--ramp", type=float, default=0.5, help="Delay between session starts in seconds.")
+    parser.add_argument("--turn-timeout", type=float, default=30.0, help="Seconds to wait for an answer per turn.")
+    parser.add_argument("--json", help="Write the full report to this JSON file.")
+    args = parser.parse_args()
+
+    if not WEBSOCKETS_AVAILABLE:
+        raise SystemExit("The 'websockets' package is required: pip install websockets")
+
+    report = asyncio.run(run_load_test(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Full report written to {args.json}")
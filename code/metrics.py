@@ -0,0 +1,87 @@
+# metrics.py
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+
+disable_created_metrics() # No *_created series; they double the output without adding anything the dashboards use
+
+PROMETHEUS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Own registry, so /metrics exposes the voice pipeline metrics only (no process or platform collectors)
+REGISTRY = CollectorRegistry()
+
+
+def render() -> bytes:
+    """Returns all voice pipeline metrics in the Prometheus text exposition format."""
+    return generate_latest(REGISTRY)
+
+
+# --- Voice pipeline metrics ---
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+AUDIO_CHUNKS_RECEIVED = Counter(
+    "rvc_audio_chunks_received_total", "Microphone audio chunks received from clients.", registry=REGISTRY)
+AUDIO_CHUNKS_DROPPED = Counter(
+    "rvc_audio_chunks_dropped_total", "Microphone audio chunks dropped because the incoming audio queue was full.", registry=REGISTRY)
+AUDIO_QUEUE_DEPTH = Histogram(
+    "rvc_audio_queue_depth", "Incoming audio queue depth observed when a chunk arrives.",
+    buckets=(0, 1, 2, 5, 10, 20, 30, 40, 50, 100), registry=REGISTRY)
+
+STT_PARTIALS = Counter(
+    "rvc_stt_partial_transcriptions_total", "Partial (realtime) transcription updates produced by STT.", registry=REGISTRY)
+
+LLM_TTFT = Histogram(
+    "rvc_llm_time_to_first_token_seconds", "Time from LLM request to first streamed token.",
+    ("backend",), buckets=LATENCY_BUCKETS, registry=REGISTRY)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "rvc_llm_tokens_per_second", "LLM streaming throughput per generation, after the first token.",
+    ("backend",), buckets=(5, 10, 20, 30, 50, 75, 100, 150, 200, 300), registry=REGISTRY)
+LLM_TOKENS = Counter(
+    "rvc_llm_tokens_total", "Tokens streamed from the LLM.", ("backend",), registry=REGISTRY)
+LLM_SPECULATIONS = Counter(
+    "rvc_llm_speculations_total", "Speculative LLM candidate generations by outcome (started, reused, promoted, superseded, cancelled, evicted, aborted).",
+    ("outcome", "backend"), registry=REGISTRY)
+LLM_PREFIX_EXTENSIONS = Counter(
+    "rvc_llm_prefix_extensions_total", "Generations replaced without a full abort because the new transcript extended the old one.", registry=REGISTRY)
+LLM_SPECULATIVE_TOKENS_WASTED = Counter(
+    "rvc_llm_speculative_tokens_wasted_total", "Tokens generated by speculative candidates that were discarded unused.", ("backend",), registry=REGISTRY)
+ANSWER_CACHE_LOOKUPS = Counter(
+    "rvc_answer_cache_lookups_total", "Semantic answer cache lookups by result (hit, miss).", ("result",), registry=REGISTRY)
+ANSWER_CACHE_EVICTIONS = Counter(
+    "rvc_answer_cache_evictions_total", "Cached answers replaced because the answer cache was full.", registry=REGISTRY)
+
+TTS_TTFA = Histogram(
+    "rvc_tts_time_to_first_audio_seconds", "Time from TTS synthesis start to first audio chunk.",
+    ("engine", "stage"), buckets=LATENCY_BUCKETS, registry=REGISTRY)
+TTS_REAL_TIME_FACTOR = Histogram(
+    "rvc_tts_real_time_factor", "TTS synthesis wall time divided by duration of the produced audio.",
+    ("engine", "stage"), buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0), registry=REGISTRY)
+TTS_CACHE_LOOKUPS = Counter(
+    "rvc_tts_cache_lookups_total", "Sentence audio cache lookups by result (hit, miss).", ("result", "engine"), registry=REGISTRY)
+TTS_CACHE_EVICTIONS = Counter(
+    "rvc_tts_cache_evictions_total", "Sentence audio cache entries evicted to stay within the size limit.", ("engine",), registry=REGISTRY)
+TTS_BACKPRESSURE_SECONDS = Counter(
+    "rvc_tts_backpressure_seconds_total", "Time answer synthesis was paused because enough audio was buffered ahead of playback.", registry=REGISTRY)
+TTS_FILLERS = Counter(
+    "rvc_tts_fillers_total", "Pre-synthesized filler clips played ahead of a slow answer.", ("engine",), registry=REGISTRY)
+
+ABORTS = Counter(
+    "rvc_generation_aborts_total", "Speech generations aborted.", registry=REGISTRY)
+ABORT_DURATION = Histogram(
+    "rvc_generation_abort_duration_seconds", "Time taken to abort a running speech generation.",
+    buckets=LATENCY_BUCKETS, registry=REGISTRY)
+ABORT_STAGE_DURATION = Histogram(
+    "rvc_generation_abort_stage_duration_seconds", "Time from abort request until a pipeline stage (llm, tts_quick, tts_final) confirmed it stopped.",
+    ("stage",), buckets=LATENCY_BUCKETS, registry=REGISTRY)
+ABORT_SLO_VIOLATIONS = Counter(
+    "rvc_generation_abort_slo_violations_total", "Aborts that took longer than ABORT_SLO_MS.", registry=REGISTRY)
+
+PIPELINE_LATENCY_ESTIMATE = Gauge(
+    "rvc_pipeline_latency_estimate_seconds", "Calibrated output pipeline latency (LLM request to first audio) used for turn timing.", registry=REGISTRY)
+
+EVENT_LOOP_LAG = Histogram(
+    "rvc_event_loop_lag_seconds", "Delay of the server's asyncio event loop beyond a scheduled wake-up.",
+    buckets=(0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0), registry=REGISTRY)
+
+ACTIVE_SESSIONS = Gauge(
+    "rvc_active_sessions", "Currently connected voice sessions.", registry=REGISTRY)
+SESSIONS_REJECTED = Counter(
+    "rvc_sessions_rejected_total", "WebSocket connections rejected because all session slots were busy.", registry=REGISTRY)
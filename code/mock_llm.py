@@ -0,0 +1,202 @@
+# mock_llm.py
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable via environment variables
+try:
+    MOCK_LLM_TTFT = float(os.getenv("MOCK_LLM_TTFT", 0.15)) # Seconds until the first token
+    MOCK_LLM_TOKENS_PER_SECOND = float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND", 60.0))
+except ValueError:
+    logger.warning("🤖⚠️ Invalid MOCK_LLM_TTFT / MOCK_LLM_TOKENS_PER_SECOND env var. Using defaults: 0.15s, 60 tok/s")
+    MOCK_LLM_TTFT = 0.15
+    MOCK_LLM_TOKENS_PER_SECOND = 60.0
+
+DEFAULT_RESPONSES = (
+    "Sure, I can help with that. Let me walk you through it step by step, starting with the basics.",
+    "That's a great question. The short answer is yes, but there are a few details worth mentioning.",
+    "Hmm, let me think. I would start by checking the settings, then try restarting the application.",
+    "Absolutely! Here is what I would suggest. First, take a deep breath. Then we tackle it together.",
+)
+
+
+def tokenize_response(text: str) -> List[str]:
+    """
+    Splits a canned response into token-like pieces the way LLM streams arrive.
+
+    Words keep their leading space, punctuation stays attached, so joining the
+    pieces yields the original text.
+
+    Args:
+        text: The response text.
+
+    Returns:
+        A list of text pieces.
+    """
+    words = text.split(" ")
+    return [words[0]] + [f" {w}" for w in words[1:]] if words else []
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    """
+    A GPU-free HTTP server speaking the Ollama `/api/chat` streaming protocol.
+
+    Streams newline-delimited JSON chunks (`{"message": {"role": "assistant",
+    "content": ...}, "done": false}`) followed by a final `"done": true` chunk,
+    with a configurable time to first token and token rate. Also answers the
+    `GET /` health check and `GET /api/tags` used by clients to probe the server.
+    Lets `LLM(backend="ollama")` run unchanged against it.
+    """
+    daemon_threads = True
+
+    def __init__(
+            self,
+            address: Tuple[str, int] = ("127.0.0.1", 0),
+            ttft: float = MOCK_LLM_TTFT,
+            tokens_per_second: float = MOCK_LLM_TOKENS_PER_SECOND,
+            responses: Sequence[str] = DEFAULT_RESPONSES,
+            model: str = "mock",
+        ):
+        """
+        Initializes and binds the MockOllamaServer.
+
+        Args:
+            address: (host, port) to bind. Port 0 picks a free port.
+            ttft: Seconds to wait before streaming the first token.
+            tokens_per_second: Rate at which subsequent tokens are streamed.
+            responses: Canned responses; one is picked at random per request.
+            model: Model name reported in responses and `/api/tags`.
+        """
+        super().__init__(address, _MockOllamaHandler)
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.responses = list(responses)
+        self.model = model
+        self.requests_served = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass as the Ollama URL (e.g., "http://127.0.0.1:54321")."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        """Starts serving in a background daemon thread and returns self."""
+        self._thread = threading.Thread(target=self.serve_forever, name="MockOllamaServer", daemon=True)
+        self._thread.start()
+        logger.info(f"🤖🧪 Mock Ollama server listening on {self.base_url} (TTFT {self.ttft:.3f}s, {self.tokens_per_second:.1f} tok/s)")
+        return self
+
+    def stop(self) -> None:
+        """Stops serving and closes the socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        logger.info("🤖🧪 Mock Ollama server stopped.")
+
+
+class _MockOllamaHandler(BaseHTTPRequestHandler):
+    """Request handler for `MockOllamaServer`."""
+    server: MockOllamaServer
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"🤖🧪 {self.address_string()} {format % args}")
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "":
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": self.server.model, "model": self.server.model}]})
+        else:
+            self._send_json({"error": f"unknown path {self.path}"}, status=404)
+
+    def do_POST(self) -> None:
+        if self.path != "/api/chat":
+            self._send_json({"error": f"unknown path {self.path}"}, status=404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON body"}, status=400)
+            return
+
+        server = self.server
+        server.requests_served += 1
+        model = request.get("model", server.model)
+        tokens = tokenize_response(random.choice(server.responses))
+        num_predict = request.get("options", {}).get("num_predict")
+        if isinstance(num_predict, int) and num_predict > 0:
+            tokens = tokens[:num_predict]
+
+        if not request.get("stream", True):
+            time.sleep(server.ttft + len(tokens) / server.tokens_per_second)
+            self._send_json({"model": model, "message": {"role": "assistant", "content": "".join(tokens)}, "done": True})
+            return
+
+        # Close-delimited NDJSON stream, like Ollama's chunked response
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        start = time.time()
+        interval = 1.0 / server.tokens_per_second if server.tokens_per_second > 0 else 0.0
+        try:
+            for i, token in enumerate(tokens):
+                # Schedule against the start time so the rate does not drift
+                delay = start + server.ttft + i * interval - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                chunk = {"model": model, "message": {"role": "assistant", "content": token}, "done": False}
+                self.wfile.write(json.dumps(chunk).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            final = {"model": model, "message": {"role": "assistant", "content": ""}, "done": True, "eval_count": len(tokens)}
+            self.wfile.write(json.dumps(final).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("🤖🧪 Client closed the mock stream early (cancelled).")
+        self.close_connection = True
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="GPU-free mock Ollama /api/chat server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft", type=float, default=MOCK_LLM_TTFT, help="Seconds until the first token.")
+    parser.add_argument("--tps", type=float, default=MOCK_LLM_TOKENS_PER_SECOND, help="Tokens per second after the first token.")
+    args = parser.parse_args()
+
+    mock_server = MockOllamaServer((args.host, args.port), ttft=args.ttft, tokens_per_second=args.tps)
+    logger.info(f"🤖🧪 Serving mock Ollama API on {mock_server.base_url} (set OLLAMA_BASE_URL to use it)")
+    try:
+        mock_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock_server.server_close()
@@ -0,0 +1,116 @@
+# mock_tts.py
+import logging
+import os
+import time
+
+import numpy as np
+import pyaudio
+from RealtimeTTS import BaseEngine
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable via environment variables
+try:
+    MOCK_TTS_RTF = float(os.getenv("MOCK_TTS_RTF", 0.2)) # Synthesis time / audio duration
+    MOCK_TTS_TTFA = float(os.getenv("MOCK_TTS_TTFA", 0.08)) # Seconds until the first chunk of each sentence
+except ValueError:
+    logger.warning("👄⚠️ Invalid MOCK_TTS_RTF / MOCK_TTS_TTFA env var. Using defaults: 0.2, 0.08s")
+    MOCK_TTS_RTF = 0.2
+    MOCK_TTS_TTFA = 0.08
+
+
+class MockEngine(BaseEngine):
+    """
+    A GPU-free RealtimeTTS engine that emits a synthetic tone instead of speech.
+
+    Produces 24kHz mono PCM16 whose duration follows the text length (at a typical
+    speaking rate), paced so synthesis runs at a configurable real-time factor after
+    a configurable time to first audio. Used with `AudioProcessor(engine="mock")` to
+    exercise the pipeline on CPU-only machines.
+    """
+    SAMPLE_RATE = 24000
+
+    def __init__(
+            self,
+            real_time_factor: float = MOCK_TTS_RTF,
+            time_to_first_audio: float = MOCK_TTS_TTFA,
+            chars_per_second: float = 15.0,
+            chunk_duration: float = 0.05,
+            frequency: float = 220.0,
+            amplitude: int = 3000,
+        ):
+        """
+        Initializes the MockEngine.
+
+        Args:
+            real_time_factor: Synthesis wall time per second of produced audio (0.2 = 5x faster than real time).
+            time_to_first_audio: Delay in seconds before the first chunk of each synthesized text.
+            chars_per_second: Speaking rate used to derive the audio duration from the text length.
+            chunk_duration: Duration in seconds of each emitted audio chunk.
+            frequency: Frequency of the emitted tone in Hz.
+            amplitude: Peak amplitude of the tone (PCM16 units).
+        """
+        self.real_time_factor = real_time_factor
+        self.time_to_first_audio = time_to_first_audio
+        self.chars_per_second = chars_per_second
+        self.chunk_duration = chunk_duration
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self._phase = 0 # Sample offset, keeps the tone continuous across chunks
+
+    def post_init(self):
+        self.engine_name = "mock"
+
+    def get_stream_info(self):
+        """
+        Returns the audio stream configuration.
+
+        Returns:
+            tuple: (format, channels, sample_rate) of the produced audio.
+        """
+        return pyaudio.paInt16, 1, self.SAMPLE_RATE
+
+    def synthesize(self, text: str) -> bool:
+        """
+        Emits synthetic audio for `text` into the engine queue at the configured pace.
+
+        Args:
+            text: The text to "synthesize".
+
+        Returns:
+            True if synthesis completed, False if it was stopped.
+        """
+        super().synthesize(text)
+        duration = max(0.3, len(text.strip()) / self.chars_per_second)
+        chunk_samples = int(self.SAMPLE_RATE * self.chunk_duration)
+        total_chunks = max(1, int(np.ceil(duration / self.chunk_duration)))
+
+        start = time.time()
+        for i in range(total_chunks):
+            # Chunk i is ready once its audio has been "synthesized" at the target real-time factor
+            due = start + self.time_to_first_audio + i * self.chunk_duration * self.real_time_factor
+            while True:
+                if self.stop_synthesis_event.is_set():
+                    logger.info("👄🧪 Mock synthesis stopped.")
+                    return False
+                remaining = due - time.time()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, 0.01))
+
+            t = (np.arange(chunk_samples) + self._phase) / self.SAMPLE_RATE
+            self._phase += chunk_samples
+            chunk = (self.amplitude * np.sin(2 * np.pi * self.frequency * t)).astype(np.int16).tobytes()
+            self.queue.put(chunk)
+            self.audio_duration += self.chunk_duration
+
+        return True
+
+    def get_voices(self):
+        return []
+
+    def set_voice(self, voice):
+        pass
+
+    def set_voice_parameters(self, **voice_parameters):
+        pass
@@ -0,0 +1,46 @@
+# playback_tracker.py
+import threading
+import time
+
+
+class PlaybackTracker:
+    """
+    Estimates how much TTS audio the client has buffered but not yet played.
+
+    Audio sent to the client adds to the estimate and real time drains it, as the
+    client plays at a constant rate. Buffer level reports from the client
+    (`tts_buffer` messages) replace the estimate, correcting drift from network
+    delay or a suspended audio context. Thread-safe: updated on the event loop,
+    read by TTS worker threads.
+    """
+    def __init__(self):
+        """Initializes the PlaybackTracker with an empty client buffer."""
+        self._lock = threading.Lock()
+        self._level = 0.0 # Seconds buffered on the client at `_level_time`
+        self._level_time = time.monotonic()
+
+    def _drain(self, now: float) -> None:
+        self._level = max(0.0, self._level - (now - self._level_time))
+        self._level_time = now
+
+    def on_sent(self, seconds: float) -> None:
+        """Adds `seconds` of audio just sent to the client."""
+        with self._lock:
+            self._drain(time.monotonic())
+            self._level += seconds
+
+    def on_client_report(self, buffered_seconds: float) -> None:
+        """Sets the estimate to the buffer level reported by the client."""
+        with self._lock:
+            self._level = max(0.0, buffered_seconds)
+            self._level_time = time.monotonic()
+
+    def reset(self) -> None:
+        """Empties the estimate, e.g. when the client clears its playback buffer."""
+        self.on_client_report(0.0)
+
+    def buffered_seconds(self) -> float:
+        """Returns the estimated seconds of audio buffered on the client."""
+        with self._lock:
+            self._drain(time.monotonic())
+            return self._level
@@ -0,0 +1,333 @@
+# replay.py
+"""
+Offline replay harness for turn-taking latency regressions.
+
+Feeds WAV conversations straight into `AudioInputProcessor.process_chunk_queue`
+(which resamples to 16kHz and calls `TranscriptionProcessor.feed_audio`). No
+browser or WebSocket is involved. Packets are paced like the browser client:
+2048 samples at 48kHz, at 1x or an accelerated speed. For every utterance
+(a speech region found by a simple energy detector), the harness records when
+`potential_sentence_end`, `before_final_sentence` and `full_transcription_callback`
+fired relative to the end of that utterance.
+
+Times are reported on the replay's audio clock: wall time since replay start,
+multiplied by `speed`. The silence timers inside the transcriber and RealtimeSTT
+use the wall clock, so at speed > 1 a pause in the recording looks longer to them
+in audio time. Use 1x for latency numbers you compare against a baseline; use
+accelerated replay for quick transcript and event-order checks over a large corpus.
+
+Example:
+    python replay.py corpus/ --json results.json
+    python replay.py corpus/ --baseline results.json --tolerance-ms 100
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio_in import AudioInputProcessor
+from loadtest import BATCH_SAMPLES, MIC_SAMPLE_RATE, load_wav_48k, percentiles
+
+logger = logging.getLogger(__name__)
+
+REPLAY_EVENTS = ("potential_sentence_end", "before_final_sentence", "full_transcription")
+
+
+def find_utterances(
+        audio: np.ndarray,
+        sample_rate: int = MIC_SAMPLE_RATE,
+        threshold_dbfs: float = -40.0,
+        min_silence: float = 0.5,
+        min_speech: float = 0.2,
+    ) -> List[Tuple[float, float]]:
+    """
+    Splits a recording into speech regions with a frame energy threshold.
+
+    Args:
+        audio: Mono int16 samples.
+        sample_rate: Sample rate of `audio` in Hz.
+        threshold_dbfs: 20ms frames with an RMS level above this count as speech.
+        min_silence: Pauses shorter than this (seconds) do not split an utterance.
+        min_speech: Speech regions shorter than this (seconds) are ignored as noise.
+
+    Returns:
+        A list of (start, end) times in seconds, in order.
+    """
+    frame = int(sample_rate * 0.02)
+    num_frames = len(audio) // frame
+    if num_frames == 0:
+        return []
+    frames = audio[:num_frames * frame].astype(np.float32).reshape(num_frames, frame) / 32768.0
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    is_speech = 20 * np.log10(np.maximum(rms, 1e-10)) > threshold_dbfs
+
+    regions: List[Tuple[float, float]] = []
+    start: Optional[int] = None
+    last_speech = 0
+    for i, speech in enumerate(is_speech):
+        if speech:
+            if start is None:
+                start = i
+            last_speech = i
+        elif start is not None and (i - last_speech) * 0.02 >= min_silence:
+            regions.append((start * 0.02, (last_speech + 1) * 0.02))
+            start = None
+    if start is not None:
+        regions.append((start * 0.02, (last_speech + 1) * 0.02))
+    return [(s, e) for s, e in regions if e - s >= min_speech]
+
+
+class ReplayHarness:
+    """
+    Drives an `AudioInputProcessor` from WAV files and records when transcriber callbacks fire.
+
+    Owns the audio queue and the `process_chunk_queue` task, and hooks the transcriber's
+    `potential_sentence_end`, `before_final_sentence` and `full_transcription_callback`.
+    Must be created inside a running asyncio event loop.
+    """
+    def __init__(self, audio_input: AudioInputProcessor, speed: float = 1.0, tail_silence: float = 3.0, final_timeout: float = 10.0):
+        """
+        Initializes the ReplayHarness.
+
+        Args:
+            audio_input: The processor to drive. Its transcriber callbacks are replaced.
+            speed: Replay speed; 1.0 is real time, 4.0 feeds audio four times faster.
+            tail_silence: Seconds of silence (audio time) fed after each file.
+            final_timeout: Extra seconds (audio time) of silence to feed while waiting for the last final transcription.
+        """
+        if speed <= 0:
+            raise ValueError("Replay speed must be positive.")
+        self.audio_input = audio_input
+        self.speed = speed
+        self.tail_silence = tail_silence
+        self.final_timeout = final_timeout
+        self.audio_queue: asyncio.Queue = asyncio.Queue()
+        self._events: List[Tuple[str, float, Optional[str]]] = [] # (event, wall perf_counter time, text)
+        self._events_lock = threading.Lock()
+        self._start_wall = 0.0
+
+        transcriber = audio_input.transcriber
+        transcriber.potential_sentence_end = lambda text: self._record("potential_sentence_end", text)
+        transcriber.before_final_sentence = self._on_before_final
+        transcriber.full_transcription_callback = lambda text: self._record("full_transcription", text)
+        self._processing_task = asyncio.create_task(audio_input.process_chunk_queue(self.audio_queue))
+
+    def _record(self, event: str, text: Optional[str]) -> None:
+        """Records a callback firing (called from transcriber threads)."""
+        with self._events_lock:
+            self._events.append((event, time.perf_counter(), text))
+
+    def _on_before_final(self, audio: Optional[np.ndarray], text: Optional[str]) -> bool:
+        self._record("before_final_sentence", text)
+        return False
+
+    def _audio_time(self, wall: float) -> float:
+        """Converts a perf_counter time to seconds of replayed audio."""
+        return (wall - self._start_wall) * self.speed
+
+    def _count(self, event: str) -> int:
+        with self._events_lock:
+            return sum(1 for e in self._events if e[0] == event)
+
+    async def _feed(self, packet: np.ndarray, audio_offset: float) -> None:
+        """Queues one packet once its (scaled) send time has come."""
+        delay = self._start_wall + audio_offset / self.speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        now_ns = time.time_ns()
+        await self.audio_queue.put({
+            "pcm": packet.tobytes(),
+            "client_sent": now_ns // 1_000_000,
+            "isTTSPlaying": False,
+            "server_received": now_ns,
+        })
+
+    async def replay_file(self, path: str) -> List[Dict[str, Any]]:
+        """
+        Replays one WAV conversation and returns per-utterance event timings.
+
+        Args:
+            path: Path to a 16-bit PCM WAV file.
+
+        Returns:
+            One dict per detected utterance with its start/end (seconds, audio time),
+            the latency in ms from utterance end to the first firing of each event
+            (None if it did not fire), how often each event fired, and the final text.
+        """
+        audio = load_wav_48k(path)
+        utterances = find_utterances(audio)
+        logger.info(f"🔁 Replaying {os.path.basename(path)}: {len(audio) / MIC_SAMPLE_RATE:.1f}s, {len(utterances)} utterances, {self.speed:g}x")
+
+        with self._events_lock:
+            self._events.clear()
+        self._start_wall = time.perf_counter()
+
+        offset = 0
+        while offset < len(audio):
+            packet = audio[offset:offset + BATCH_SAMPLES]
+            if len(packet) < BATCH_SAMPLES:
+                packet = np.pad(packet, (0, BATCH_SAMPLES - len(packet)))
+            await self._feed(packet, offset / MIC_SAMPLE_RATE)
+            offset += BATCH_SAMPLES
+
+        # Keep feeding silence: end-of-turn detection only advances while audio arrives
+        silence = np.zeros(BATCH_SAMPLES, dtype=np.int16)
+        audio_end = offset / MIC_SAMPLE_RATE
+        while True:
+            elapsed = offset / MIC_SAMPLE_RATE - audio_end
+            if elapsed >= self.tail_silence and self._count("full_transcription") >= len(utterances):
+                break
+            if elapsed >= self.tail_silence + self.final_timeout:
+                logger.warning(f"🔁⚠️ {os.path.basename(path)}: timed out waiting for final transcriptions.")
+                break
+            await self._feed(silence, offset / MIC_SAMPLE_RATE)
+            offset += BATCH_SAMPLES
+
+        return self._collect(path, utterances)
+
+    def _collect(self, path: str, utterances: List[Tuple[float, float]]) -> List[Dict[str, Any]]:
+        """Assigns recorded events to the utterance that was last to start before them."""
+        with self._events_lock:
+            events = [(name, self._audio_time(wall), text) for name, wall, text in self._events]
+
+        results = []
+        for i, (start, end) in enumerate(utterances):
+            window_end = utterances[i + 1][0] if i + 1 < len(utterances) else float("inf")
+            in_window = [e for e in events if start <= e[1] < window_end]
+            row: Dict[str, Any] = {
+                "file": os.path.basename(path),
+                "utterance": i,
+                "start_s": round(start, 3),
+                "end_s": round(end, 3),
+                "final_text": None,
+            }
+            for event in REPLAY_EVENTS:
+                fired = [e for e in in_window if e[0] == event]
+                # Negative values mean the event fired during a pause inside the utterance
+                row[f"{event}_ms"] = round((fired[0][1] - end) * 1000, 1) if fired else None
+                row[f"{event}_count"] = len(fired)
+                if event == "full_transcription" and fired:
+                    row["final_text"] = fired[-1][2]
+            results.append(row)
+        return results
+
+    async def close(self) -> None:
+        """Stops the chunk processing task."""
+        await self.audio_queue.put(None)
+        await asyncio.gather(self._processing_task, return_exceptions=True)
+
+
+def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Returns latency percentiles and miss counts per event over all utterances."""
+    summary: Dict[str, Any] = {"utterances": len(rows)}
+    for event in REPLAY_EVENTS:
+        values = [r[f"{event}_ms"] for r in rows if r[f"{event}_ms"] is not None]
+        summary[event] = percentiles(values)
+        summary[event]["missed"] = len(rows) - len(values)
+    return summary
+
+
+def compare_to_baseline(summary: Dict[str, Any], baseline: Dict[str, Any], tolerance_ms: float) -> List[str]:
+    """
+    Compares p50/p95 per event against a previous run.
+
+    Args:
+        summary: Summary of the current run (see `summarize`).
+        baseline: Summary of the baseline run.
+        tolerance_ms: Allowed increase in milliseconds before a value counts as a regression.
+
+    Returns:
+        Human-readable descriptions of all regressions (empty if none).
+    """
+    regressions = []
+    for event in REPLAY_EVENTS:
+        current, previous = summary.get(event, {}), baseline.get(event, {})
+        for key in ("p50", "p95"):
+            if key in current and key in previous and current[key] > previous[key] + tolerance_ms:
+                regressions.append(f"{event} {key}: {current[key]:.0f}ms vs baseline {previous[key]:.0f}ms")
+        if current.get("missed", 0) > previous.get("missed", 0):
+            regressions.append(f"{event} missed: {current['missed']} vs baseline {previous['missed']}")
+    return regressions
+
+
+def expand_paths(paths: List[str]) -> List[str]:
+    """Expands directories to the WAV files they contain, in sorted order."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.wav"))))
+        else:
+            files.append(path)
+    return files
+
+
+async def run_replay(args: argparse.Namespace) -> Dict[str, Any]:
+    """Replays all files and returns the report."""
+    audio_input = AudioInputProcessor(args.language, pipeline_latency=args.pipeline_latency)
+    harness = ReplayHarness(audio_input, speed=args.speed, tail_silence=args.tail_silence, final_timeout=args.timeout)
+    rows: List[Dict[str, Any]] = []
+    try:
+        for path in expand_paths(args.paths):
+            rows.extend(await harness.replay_file(path))
+    finally:
+        await harness.close()
+        audio_input.shutdown()
+    return {"speed": args.speed, "summary": summarize(rows), "utterances": rows}
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Prints per-utterance timings and the per-event summary."""
+    for row in report["utterances"]:
+        timings = "  ".join(
+            f"{event} {row[f'{event}_ms']:.0f}ms" if row[f"{event}_ms"] is not None else f"{event} -"
+            for event in REPLAY_EVENTS
+        )
+        print(f"{row['file']} #{row['utterance']} [{row['start_s']:.2f}-{row['end_s']:.2f}s]  {timings}  {row['final_text']!r}")
+
+    summary = report["summary"]
+    print(f"\n🔁 Replay summary: {summary['utterances']} utterances at {report['speed']:g}x (ms after utterance end)")
+    for event in REPLAY_EVENTS:
+        stats = summary[event]
+        if "p50" in stats:
+            print(f"   {event:<24} p50 {stats['p50']:.0f}  p95 {stats['p95']:.0f}  p99 {stats['p99']:.0f}  max {stats['max']:.0f}  missed {stats['missed']}")
+        else:
+            print(f"   {event:<24} never fired (missed {stats['missed']})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Replay WAV conversations through AudioInputProcessor and time turn-taking events.")
+    parser.add_argument("paths", nargs="+", help="WAV files or directories of WAV files.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed (1.0 = real time).")
+    parser.add_argument("--language", default="en", help="Transcription language.")
+    parser.add_argument("--pipeline-latency", type=float, default=0.5, help="Pipeline latency passed to the transcriber (s).")
+    parser.add_argument("--tail-silence", type=float, default=3.0, help="Silence fed after each file (s of audio).")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Extra silence to wait for missing finals (s of audio).")
+    parser.add_argument("--json", help="Write the full report to this JSON file.")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against.")
+    parser.add_argument("--tolerance-ms", type=float, default=100.0, help="Allowed p50/p95 increase over the baseline.")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_replay(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Full report written to {args.json}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline_summary = json.load(f)["summary"]
+        regressions = compare_to_baseline(report["summary"], baseline_summary, args.tolerance_ms)
+        for regression in regressions:
+            print(f"   ❌ Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("   ✅ No regressions against baseline.")
@@ -0,0 +1,296 @@
+# sentence_scheduler.py
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Queue
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from text_context import DEFAULT_ABBREVIATIONS, IncrementalTextContext, is_abbreviation
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable via environment variables
+try:
+    TTS_LOOKAHEAD_SENTENCES = int(os.getenv("TTS_LOOKAHEAD_SENTENCES", 2)) # Sentences synthesizing ahead of the one being emitted
+except ValueError:
+    logger.warning("👄📑⚠️ Invalid TTS_LOOKAHEAD_SENTENCES env var. Using default: 2")
+    TTS_LOOKAHEAD_SENTENCES = 2
+
+try:
+    TTS_ENGINE_POOL_SIZE = int(os.getenv("TTS_ENGINE_POOL_SIZE", 1)) # TTS engine instances sentences are spread over
+except ValueError:
+    logger.warning("👄📑⚠️ Invalid TTS_ENGINE_POOL_SIZE env var. Using default: 1")
+    TTS_ENGINE_POOL_SIZE = 1
+
+MIN_SENTENCE_CHARS = 12 # Shorter sentences are merged with the next one (e.g. "Oh. Great.")
+SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s+")
+_SENTENCE_END_CHARS = ".!?…\"')]" # Characters a sentence end may start with before its whitespace
+
+
+class SentenceSplitter:
+    """
+    Splits streamed text into sentences as soon as their end is known.
+
+    Only text not scanned before (plus a trailing run of end punctuation that may
+    continue) is searched on each call. A period ending a known abbreviation
+    ("Dr.", "e.g.", matched as a whole word) does not end a sentence.
+    """
+    def __init__(self, min_chars: int = MIN_SENTENCE_CHARS, abbreviations: Optional[Iterable[str]] = None):
+        """
+        Initializes the SentenceSplitter.
+
+        Args:
+            min_chars: Minimum length of a sentence; shorter ones are merged with the next.
+            abbreviations: Words whose final period does not end a sentence. Defaults to `DEFAULT_ABBREVIATIONS`.
+        """
+        self.min_chars = min_chars
+        self.abbreviations = {a.lower() for a in (DEFAULT_ABBREVIATIONS if abbreviations is None else abbreviations)}
+        self._buffer = ""
+        self._scan = 0 # Buffer position up to which no sentence end can start anymore
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Adds streamed text and returns the sentences completed by it.
+
+        A sentence is complete once its end punctuation is followed by whitespace.
+
+        Args:
+            text: The next chunk of text (e.g., an LLM token).
+
+        Returns:
+            The completed sentences, possibly none.
+        """
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer, self._scan):
+            if match.end() - start < self.min_chars:
+                continue
+            if self._buffer[match.start()] == "." and self._ends_with_abbreviation(start, match.start() + 1):
+                continue
+            sentences.append(self._buffer[start:match.end()].strip())
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        # The next call rescans only a trailing run of end punctuation and whitespace, which may still become
+        # a (longer) sentence end
+        scan = len(self._buffer.rstrip())
+        while scan > 0 and self._buffer[scan - 1] in _SENTENCE_END_CHARS:
+            scan -= 1
+        self._scan = scan
+        return sentences
+
+    def _ends_with_abbreviation(self, start: int, end: int) -> bool:
+        word_start = max(self._buffer.rfind(" ", start, end), self._buffer.rfind("\n", start, end)) + 1
+        return is_abbreviation(self._buffer[max(start, word_start):end], self.abbreviations)
+
+    def flush(self) -> Optional[str]:
+        """Returns the remaining text as the last sentence, or None if there is none."""
+        rest, self._buffer, self._scan = self._buffer.strip(), "", 0
+        return rest or None
+
+
+def iter_segments(text_stream: Iterable[str], context: Optional[IncrementalTextContext] = None, splitter: Optional[SentenceSplitter] = None) -> Iterator[str]:
+    """
+    Yields the quick answer and then sentence-sized segments of a streamed text.
+
+    The first segment ends at the first context boundary (`IncrementalTextContext`);
+    the rest of the text is split by a `SentenceSplitter`. If no context is found
+    within its maximum length, the whole text is split into sentences instead.
+    Each segment is yielded as soon as its end is known, so the generator can be
+    consumed by one thread up to the quick answer and by another after it.
+
+    Args:
+        text_stream: The streamed text (e.g., LLM tokens).
+        context: Detector of the quick answer. Defaults to a new `IncrementalTextContext`.
+        splitter: Splitter of the remaining text. Defaults to a new `SentenceSplitter`.
+    """
+    context = context or IncrementalTextContext()
+    splitter = splitter or SentenceSplitter()
+    quick_done = False
+    for text in text_stream:
+        if not quick_done:
+            quick_answer, text = context.feed(text)
+            if quick_answer is not None:
+                quick_done = True
+                yield quick_answer.strip()
+            elif context.done:
+                quick_done = True
+                text = context.text # No quick answer within max_len; split everything
+            else:
+                continue
+        yield from splitter.feed(text)
+    rest = splitter.flush() if quick_done else (context.text.strip() or None)
+    if rest:
+        yield rest
+
+
+class _SentenceJob:
+    """Audio of one sentence, filled by a synthesis worker and drained in order by the emitter."""
+    def __init__(self, index: int, text: str):
+        self.index = index
+        self.text = text
+        self.chunks: Queue = Queue()
+        self.done = threading.Event()
+        self.completed = False
+
+
+class SentenceTTSScheduler:
+    """
+    Synthesizes a streamed answer sentence by sentence with a bounded look-ahead.
+
+    Takes the sentences as they stream in (see `iter_segments`) and synthesizes up to
+    `lookahead` sentences concurrently on the given audio processors (round robin,
+    so neighbouring sentences use different engines when there are several). Their
+    audio is emitted strictly in order into the output queue, streaming the
+    sentence currently being emitted as its chunks arrive. With a real-time factor
+    close to 1.0, sentence N+1 is then already synthesized while sentence N
+    plays. Sentences cached by the `AudioProcessor` are emitted at once.
+    """
+    def __init__(self, processors: List, lookahead: int = TTS_LOOKAHEAD_SENTENCES, name: str = "SentenceTTS"):
+        """
+        Initializes the SentenceTTSScheduler.
+
+        Args:
+            processors: The `AudioProcessor` instances sentences are synthesized on.
+            lookahead: Maximum number of sentences synthesized but not yet fully emitted (at least 1).
+            name: Thread name prefix of the synthesis workers.
+        """
+        self.processors = processors
+        self.lookahead = max(1, lookahead)
+        self._executor = ThreadPoolExecutor(max_workers=self.lookahead, thread_name_prefix=name)
+
+    def run(
+            self,
+            sentences: Iterable[str],
+            audio_chunks: Queue,
+            stop_event: threading.Event,
+            generation_string: str = "",
+            on_first_chunk: Optional[Callable[[], None]] = None,
+            release: Optional[threading.Event] = None,
+            wait_for_room: Optional[Callable[[], bool]] = None,
+        ) -> bool:
+        """
+        Synthesizes `sentences` and puts the audio into `audio_chunks`, in order.
+
+        Blocks until all audio is emitted or `stop_event` is set. If `release` is
+        given, synthesis starts right away but no audio is emitted before the event
+        is set, so the answer can be synthesized while earlier audio (the quick
+        answer) is still being produced for the same queue.
+
+        Args:
+            sentences: The streamed answer, one sentence per item (e.g., from `iter_segments`).
+            audio_chunks: The queue to put the resulting audio chunks (bytes) into.
+            stop_event: Event signalling interruption.
+            generation_string: An optional identifier string for logging purposes.
+            on_first_chunk: Optional callback fired when the first audio chunk is queued.
+            release: Optional event that must be set before the first chunk is emitted.
+            wait_for_room: Optional callable that blocks while the listener has enough audio
+                           buffered (backpressure); returns False to stop. Called before each
+                           sentence is started and each chunk is emitted.
+
+        Returns:
+            True if every sentence was synthesized and emitted, False if interrupted or failed.
+        """
+        jobs: Queue = Queue() # Submitted jobs in sentence order; None ends the stream
+        slots = threading.Semaphore(self.lookahead)
+        futures = []
+        result = {"ok": True}
+
+        emitter = threading.Thread(
+            target=self._emit,
+            args=(jobs, slots, audio_chunks, stop_event, generation_string, on_first_chunk, release, wait_for_room, result),
+            name="SentenceTTSEmitter",
+            daemon=True,
+        )
+        emitter.start()
+
+        def submit(index: int, text: str) -> bool:
+            if wait_for_room and not wait_for_room():
+                return False
+            while not slots.acquire(timeout=0.05): # Bounded look-ahead
+                if stop_event.is_set():
+                    return False
+            job = _SentenceJob(index, text)
+            jobs.put(job)
+            futures.append(self._executor.submit(self._synthesize, job, stop_event, generation_string))
+            return True
+
+        index = 0
+        try:
+            for sentence in sentences:
+                if stop_event.is_set() or not submit(index, sentence):
+                    break
+                index += 1
+        finally:
+            jobs.put(None)
+            emitter.join()
+            for future in futures:
+                future.result() # Workers return promptly once stopped
+
+        return result["ok"] and not stop_event.is_set()
+
+    def _synthesize(self, job: _SentenceJob, stop_event: threading.Event, generation_string: str) -> None:
+        """Synthesizes one sentence into its job queue."""
+        processor = self.processors[job.index % len(self.processors)]
+        try:
+            job.completed = processor.synthesize(
+                job.text,
+                job.chunks,
+                stop_event,
+                generation_string=f"{generation_string} [Sentence {job.index}]",
+                on_first_chunk=lambda: None, # The emitter reports the first chunk actually queued
+                stage="final",
+            )
+        except Exception as e:
+            logger.exception(f"👄📑💥 {generation_string} Error synthesizing sentence {job.index}: {e}")
+        finally:
+            job.done.set()
+
+    def _emit(
+            self,
+            jobs: Queue,
+            slots: threading.Semaphore,
+            audio_chunks: Queue,
+            stop_event: threading.Event,
+            generation_string: str,
+            on_first_chunk: Optional[Callable[[], None]],
+            release: Optional[threading.Event],
+            wait_for_room: Optional[Callable[[], bool]],
+            result: dict,
+        ) -> None:
+        """Moves the jobs' audio into `audio_chunks` in sentence order, once `release` is set."""
+        while release and not release.wait(timeout=0.01):
+            if stop_event.is_set():
+                break # Jobs still get drained below so `run` can finish
+        first = True
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            while not stop_event.is_set():
+                try:
+                    chunk = job.chunks.get(timeout=0.01)
+                except Empty:
+                    if job.done.is_set() and job.chunks.empty():
+                        break
+                    continue
+                if wait_for_room and not wait_for_room():
+                    break
+                audio_chunks.put_nowait(chunk)
+                if first:
+                    first = False
+                    if on_first_chunk:
+                        try:
+                            on_first_chunk()
+                        except Exception as e:
+                            logger.error(f"👄📑💥 {generation_string} Error in on_first_chunk callback: {e}", exc_info=True)
+            if not job.completed and not stop_event.is_set():
+                logger.warning(f"👄📑⚠️ {generation_string} Sentence {job.index} was not fully synthesized: '{job.text[:40]}'")
+                result["ok"] = False
+            slots.release()
+
+    def shutdown(self) -> None:
+        """Stops the synthesis workers."""
+        self._executor.shutdown(wait=False)
@@ -7,7 +7,6 @@ logger = logging.getLogger(__name__)
 if __name__ == "__main__":
     logger.info("🖥️👋 Welcome to local real-time voice chat")
 
-from upsample_overlap import UpsampleOverlap
 from datetime import datetime
 from colors import Colors
 import uvicorn
@@ -20,7 +19,7 @@ import sys
 import os # Added for environment variable access
 import platform # Added for platform detection
 
-from typing import Any, Dict, Optional, Callable # Added for type hints in docstrings
+from typing import Any, Dict, List, Optional, Callable # Added for type hints in docstrings
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
@@ -56,11 +55,23 @@ LLM_START_MODEL = "gemma2:2b"
 # LLM_START_PROVIDER = "lmstudio"
 # LLM_START_MODEL = "Qwen3-30B-A3B-GGUF/Qwen3-30B-A3B-Q3_K_L.gguf"
 NO_THINK = False
+
+# GPU-free mode: synthetic TTS engine and an in-process mock Ollama server (for load and latency testing)
+USE_MOCK_BACKENDS = os.getenv("USE_MOCK_BACKENDS", "").lower() in ("1", "true", "yes")
+LLM_BASE_URL = None # None = backend default (e.g., OLLAMA_BASE_URL)
+if USE_MOCK_BACKENDS:
+    TTS_START_ENGINE = "mock"
+    LLM_START_PROVIDER = "ollama"
+    LLM_START_MODEL = "mock"
+    LLM_BASE_URL = os.getenv("MOCK_LLM_URL") # Use an external mock server if given, else start one in-process
+
 DIRECT_STREAM = TTS_START_ENGINE=="orpheus"
 
 if __name__ == "__main__":
     logger.info(f"🖥️⚙️ {Colors.apply('[PARAM]').blue} Starting engine: {Colors.apply(TTS_START_ENGINE).blue}")
     logger.info(f"🖥️⚙️ {Colors.apply('[PARAM]').blue} Direct streaming: {Colors.apply('ON' if DIRECT_STREAM else 'OFF').blue}")
+    if USE_MOCK_BACKENDS:
+        logger.info(f"🖥️🧪 {Colors.apply('[PARAM]').blue} Mock LLM and TTS backends: {Colors.apply('ON').yellow}")
 
 # Define the maximum allowed size for the incoming audio queue
 try:
@@ -72,17 +83,32 @@ except ValueError:
         logger.warning("🖥️⚠️ Invalid MAX_AUDIO_QUEUE_SIZE env var. Using default: 50")
     MAX_AUDIO_QUEUE_SIZE = 50
 
+try:
+    ASSISTANT_TEXT_SNAPSHOT_SECONDS = float(os.getenv("ASSISTANT_TEXT_SNAPSHOT_SECONDS", 2.0)) # Full answer resent at most this often, between deltas
+except ValueError:
+    if __name__ == "__main__":
+        logger.warning("🖥️⚠️ Invalid ASSISTANT_TEXT_SNAPSHOT_SECONDS env var. Using default: 2.0")
+    ASSISTANT_TEXT_SNAPSHOT_SECONDS = 2.0
+
 
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 #from handlerequests import LanguageProcessor
 #from audio_out import AudioOutProcessor
-from audio_in import AudioInputProcessor
-from speech_pipeline_manager import SpeechPipelineManager
+from speech_pipeline_manager import SharedPipelineResources
+from session import SessionManager, VoiceSession, MAX_SESSIONS
+from latency_trace import LatencyStats, TurnTrace
+from playback_tracker import PlaybackTracker
+import metrics
 from colors import Colors
 
 LANGUAGE = "en"
+
+# Binary TTS audio frame sent to the client: big-endian uint32 generation id,
+# uint32 sequence number (per generation) and uint32 sample rate, followed by raw PCM16 samples.
+TTS_FRAME_HEADER = struct.Struct("!III")
+TTS_OUTPUT_SAMPLE_RATE = 48000 # StreamingUpsampler output rate
 # TTS_FINAL_TIMEOUT = 0.5 # unsure if 1.0 is needed for stability
 TTS_FINAL_TIMEOUT = 1.0 # unsure if 1.0 is needed for stability
 
@@ -119,39 +145,69 @@ class NoCacheStaticFiles(StaticFiles):
 # --------------------------------------------------------------------
 # Lifespan management
 # --------------------------------------------------------------------
+async def monitor_event_loop_lag(interval: float = 0.1) -> None:
+    """
+    Measures how late the event loop wakes up from a scheduled sleep.
+
+    Records the overshoot of every `interval` sleep into the
+    `rvc_event_loop_lag_seconds` histogram. Lag here delays every WebSocket
+    send and receive, so it is the first sign of an overloaded server.
+
+    Args:
+        interval: Seconds between measurements.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        metrics.EVENT_LOOP_LAG.observe(max(0.0, loop.time() - scheduled))
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Manages the application's lifespan, initializing and shutting down resources.
 
-    Initializes global components like SpeechPipelineManager, Upsampler, and
-    AudioInputProcessor and stores them in `app.state`. Handles cleanup on shutdown.
+    Loads the shared models once (`SharedPipelineResources`) and creates the
+    `SessionManager` that hands out per-connection sessions, storing both in
+    `app.state`. Handles cleanup on shutdown.
 
     Args:
         app: The FastAPI application instance.
     """
     logger.info("🖥️▶️ Server starting up")
-    # Initialize global components, not connection-specific state
-    app.state.SpeechPipelineManager = SpeechPipelineManager(
+    llm_base_url = LLM_BASE_URL
+    app.state.MockLLMServer = None
+    if USE_MOCK_BACKENDS and not llm_base_url:
+        from mock_llm import MockOllamaServer
+        app.state.MockLLMServer = MockOllamaServer().start()
+        llm_base_url = app.state.MockLLMServer.base_url
+
+    # Initialize global components (loaded models), not connection-specific state
+    app.state.PipelineResources = SharedPipelineResources(
         tts_engine=TTS_START_ENGINE,
         llm_provider=LLM_START_PROVIDER,
         llm_model=LLM_START_MODEL,
         no_think=NO_THINK,
         orpheus_model=TTS_ORPHEUS_MODEL,
+        llm_base_url=llm_base_url,
     )
-
-    app.state.Upsampler = UpsampleOverlap()
-    app.state.AudioInputProcessor = AudioInputProcessor(
-        LANGUAGE,
-        is_orpheus=TTS_START_ENGINE=="orpheus",
-        pipeline_latency=app.state.SpeechPipelineManager.full_output_pipeline_latency / 1000, # seconds
+    logger.info(f"🖥️⚙️ {Colors.apply('[PARAM]').blue} Max concurrent sessions: {Colors.apply(str(MAX_SESSIONS)).blue}")
+    app.state.SessionManager = SessionManager(
+        app.state.PipelineResources,
+        language=LANGUAGE,
+        max_sessions=MAX_SESSIONS,
     )
-    app.state.Aborting = False # Keep this? Its usage isn't clear in the provided snippet. Minimizing changes.
+    metrics.ACTIVE_SESSIONS.set_function(lambda: app.state.SessionManager.active_count)
+    app.state.LatencyStats = LatencyStats()
+    lag_monitor_task = asyncio.create_task(monitor_event_loop_lag())
 
     yield
 
+    lag_monitor_task.cancel()
     logger.info("🖥️⏹️ Server shutting down")
-    app.state.AudioInputProcessor.shutdown()
+    app.state.SessionManager.shutdown()
+    if app.state.MockLLMServer:
+        app.state.MockLLMServer.stop()
 
 # --------------------------------------------------------------------
 # FastAPI app instance
@@ -194,6 +250,27 @@ async def get_index() -> HTMLResponse:
         html_content = f.read()
     return HTMLResponse(content=html_content)
 
+@app.get("/metrics")
+async def get_metrics() -> Response:
+    """
+    Exposes pipeline metrics in the Prometheus text exposition format.
+
+    Returns:
+        A plain-text Response with all metrics from `metrics.REGISTRY`.
+    """
+    return Response(content=metrics.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/latency")
+async def get_latency_summary() -> Dict[str, Any]:
+    """
+    Returns per-turn latency percentiles over the recent window of finished turns.
+
+    Returns:
+        A dictionary with p50/p90/p95/p99 (ms) for each traced stage offset and
+        stage-to-stage delta, as computed by `LatencyStats.summary`.
+    """
+    return app.state.LatencyStats.summary()
+
 # --------------------------------------------------------------------
 # Utility functions
 # --------------------------------------------------------------------
@@ -245,7 +322,7 @@ def format_timestamp_ns(timestamp_ns: int) -> str:
 # WebSocket data processing
 # --------------------------------------------------------------------
 
-async def process_incoming_data(ws: WebSocket, app: FastAPI, incoming_chunks: asyncio.Queue, callbacks: 'TranscriptionCallbacks') -> None:
+async def process_incoming_data(ws: WebSocket, session: VoiceSession, incoming_chunks: asyncio.Queue, callbacks: 'TranscriptionCallbacks') -> None:
     """
     Receives messages via WebSocket, processes audio and text messages.
 
@@ -257,7 +334,7 @@ async def process_incoming_data(ws: WebSocket, app: FastAPI, incoming_chunks: as
 
     Args:
         ws: The WebSocket connection instance.
-        app: The FastAPI application instance (for accessing global state if needed).
+        session: The VoiceSession owning this connection's pipeline and audio input.
         incoming_chunks: An asyncio queue to put processed audio metadata dictionaries into.
         callbacks: The TranscriptionCallbacks instance for this connection to manage state.
     """
@@ -294,11 +371,14 @@ async def process_incoming_data(ws: WebSocket, app: FastAPI, incoming_chunks: as
 
                 # Check queue size before putting data
                 current_qsize = incoming_chunks.qsize()
+                metrics.AUDIO_CHUNKS_RECEIVED.inc()
+                metrics.AUDIO_QUEUE_DEPTH.observe(current_qsize)
                 if current_qsize < MAX_AUDIO_QUEUE_SIZE:
                     # Now put only the metadata dict (containing PCM audio) into the processing queue.
                     await incoming_chunks.put(metadata)
                 else:
                     # Queue is full, drop the chunk and log a warning
+                    metrics.AUDIO_CHUNKS_DROPPED.inc()
                     logger.warning(
                         f"🖥️⚠️ Audio queue full ({current_qsize}/{MAX_AUDIO_QUEUE_SIZE}); dropping chunk. Possible lag."
                     )
@@ -307,25 +387,30 @@ async def process_incoming_data(ws: WebSocket, app: FastAPI, incoming_chunks: as
                 # Text-based message: parse JSON
                 data = parse_json_message(msg["text"])
                 msg_type = data.get("type")
-                logger.info(Colors.apply(f"🖥️📥 ←←Client: {data}").orange)
+                if msg_type != "tts_buffer": # Sent ~10x per second during playback
+                    logger.info(Colors.apply(f"🖥️📥 ←←Client: {data}").orange)
 
 
                 if msg_type == "tts_start":
                     logger.info("🖥️ℹ️ Received tts_start from client.")
                     # Update connection-specific state via callbacks
                     callbacks.tts_client_playing = True
+                    callbacks.on_client_tts_start()
                 elif msg_type == "tts_stop":
                     logger.info("🖥️ℹ️ Received tts_stop from client.")
                     # Update connection-specific state via callbacks
                     callbacks.tts_client_playing = False
+                    callbacks.playback.reset()
+                elif msg_type == "tts_buffer":
+                    callbacks.playback.on_client_report(data.get("buffered_ms", 0) / 1000.0)
                 # Add to the handleJSONMessage function in server.py
                 elif msg_type == "clear_history":
                     logger.info("🖥️ℹ️ Received clear_history from client.")
-                    app.state.SpeechPipelineManager.reset()
+                    session.pipeline.reset()
                 elif msg_type == "set_speed":
                     speed_value = data.get("speed", 0)
                     speed_factor = speed_value / 100.0  # Convert 0-100 to 0.0-1.0
-                    turn_detection = app.state.AudioInputProcessor.transcriber.turn_detection
+                    turn_detection = session.audio_input.transcriber.turn_detection
                     if turn_detection:
                         turn_detection.update_settings(speed_factor)
                         logger.info(f"🖥️⚙️ Updated turn detection settings to factor: {speed_factor:.2f}")
@@ -342,21 +427,26 @@ async def process_incoming_data(ws: WebSocket, app: FastAPI, incoming_chunks: as
 
 async def send_text_messages(ws: WebSocket, message_queue: asyncio.Queue) -> None:
     """
-    Continuously sends text messages from a queue to the client via WebSocket.
+    Continuously sends messages from a queue to the client via WebSocket.
 
-    Waits for messages on the `message_queue`, formats them as JSON, and sends
-    them to the connected WebSocket client. Logs non-TTS messages.
+    Waits for messages on the `message_queue`. Bytes objects (binary TTS audio
+    frames) are sent as binary WebSocket frames; dictionaries are formatted as
+    JSON. Both share one queue so audio stays ordered relative to control
+    messages like `stop_tts`. Logs non-TTS messages.
 
     Args:
         ws: The WebSocket connection instance.
-        message_queue: An asyncio queue yielding dictionaries to be sent as JSON.
+        message_queue: An asyncio queue yielding dictionaries to be sent as JSON
+                       or bytes to be sent as binary frames.
     """
     try:
         while True:
-            await asyncio.sleep(0.001) # Yield control
             data = await message_queue.get()
+            if isinstance(data, bytes):
+                await ws.send_bytes(data)
+                continue
             msg_type = data.get("type")
-            if msg_type != "tts_chunk":
+            if msg_type not in ("tts_chunk", "partial_assistant_answer"): # Answer deltas are logged as debug when produced
                 logger.info(Colors.apply(f"🖥️📤 →→Client: {data}").orange)
             await ws.send_json(data)
     except asyncio.CancelledError:
@@ -368,7 +458,7 @@ async def send_text_messages(ws: WebSocket, message_queue: asyncio.Queue) -> Non
     except Exception as e:
         logger.exception(f"🖥️💥 {Colors.apply('EXCEPTION').red} in send_text_messages: {repr(e)}")
 
-async def _reset_interrupt_flag_async(app: FastAPI, callbacks: 'TranscriptionCallbacks'):
+async def _reset_interrupt_flag_async(session: VoiceSession, callbacks: 'TranscriptionCallbacks'):
     """
     Resets the microphone interruption flag after a delay (async version).
 
@@ -377,29 +467,33 @@ async def _reset_interrupt_flag_async(app: FastAPI, callbacks: 'TranscriptionCal
     connection-specific callbacks instance.
 
     Args:
-        app: The FastAPI application instance (to access AudioInputProcessor).
+        session: The VoiceSession whose AudioInputProcessor should be checked.
         callbacks: The TranscriptionCallbacks instance for the connection.
     """
     await asyncio.sleep(1)
     # Check the AudioInputProcessor's own interrupted state
-    if app.state.AudioInputProcessor.interrupted:
+    if session.audio_input.interrupted:
         logger.info(f"{Colors.apply('🖥️🎙️ ▶️ Microphone continued (async reset)').cyan}")
-        app.state.AudioInputProcessor.interrupted = False
+        session.audio_input.interrupted = False
         # Reset connection-specific interruption time via callbacks
         callbacks.interruption_time = 0
         logger.info(Colors.apply("🖥️🎙️ interruption flag reset after TTS chunk (async)").cyan)
 
-async def send_tts_chunks(app: FastAPI, message_queue: asyncio.Queue, callbacks: 'TranscriptionCallbacks') -> None:
+async def send_tts_chunks(session: VoiceSession, message_queue: asyncio.Queue, callbacks: 'TranscriptionCallbacks') -> None:
     """
-    Continuously sends TTS audio chunks from the SpeechPipelineManager to the client.
-
-    Monitors the state of the current speech generation (if any) and the client
-    connection (via `callbacks`). Retrieves audio chunks from the active generation's
-    queue, upsamples/encodes them, and puts them onto the outgoing `message_queue`
+    Continuously sends TTS audio chunks from the session's SpeechPipelineManager to the client.
+
+    Sleeps until woken through `callbacks.tts_sender_wakeup`, which is set whenever
+    the pipeline reports a generation state change (new generation, audio chunk
+    queued, TTS stage finished, abort) or the connection state changes, so idle
+    sessions cost no CPU. Then checks the state of the current speech generation
+    (if any) and the client connection (via `callbacks`), retrieves audio chunks
+    from the active generation's queue, upsamples them, prefixes them with a
+    `TTS_FRAME_HEADER` and puts the binary frames onto the outgoing `message_queue`
     for the client. Handles the end-of-generation logic and state resets.
 
     Args:
-        app: The FastAPI application instance (to access global components).
+        session: The VoiceSession owning the pipeline, audio input and upsampler.
         message_queue: An asyncio queue to put outgoing TTS chunk messages onto.
         callbacks: The TranscriptionCallbacks instance managing this connection's state.
     """
@@ -408,17 +502,28 @@ async def send_tts_chunks(app: FastAPI, message_queue: asyncio.Queue, callbacks:
         last_quick_answer_chunk = 0
         last_chunk_sent = 0
         prev_status = None
+        frame_gen_id = None # Generation the sequence counter belongs to
+        frame_seq = 0
+        wakeup = callbacks.tts_sender_wakeup
 
         while True:
-            await asyncio.sleep(0.001) # Yield control
+            timeout = None
+            if session.audio_input.interrupted and callbacks.interruption_time:
+                # Wake up in time to reset the interruption flag after 2 seconds
+                timeout = max(0.0, callbacks.interruption_time + 2.0 - time.time())
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
 
             # Use connection-specific interruption_time via callbacks
-            if app.state.AudioInputProcessor.interrupted and callbacks.interruption_time and time.time() - callbacks.interruption_time > 2.0:
-                app.state.AudioInputProcessor.interrupted = False
+            if session.audio_input.interrupted and callbacks.interruption_time and time.time() - callbacks.interruption_time > 2.0:
+                session.audio_input.interrupted = False
                 callbacks.interruption_time = 0 # Reset via callbacks
                 logger.info(Colors.apply("🖥️🎙️ interruption flag reset after 2 seconds").cyan)
 
-            is_tts_finished = app.state.SpeechPipelineManager.is_valid_gen() and app.state.SpeechPipelineManager.running_generation.audio_quick_finished
+            is_tts_finished = session.pipeline.is_valid_gen() and session.pipeline.running_generation.audio_quick_finished
 
             def log_status():
                 nonlocal prev_status
@@ -436,10 +541,10 @@ async def send_tts_chunks(app: FastAPI, message_queue: asyncio.Queue, callbacks:
                     1, # Placeholder?
                     int(callbacks.is_hot), # from callbacks
                     int(callbacks.synthesis_started), # from callbacks
-                    int(app.state.SpeechPipelineManager.running_generation is not None), # Global manager state
-                    int(app.state.SpeechPipelineManager.is_valid_gen()), # Global manager state
+                    int(session.pipeline.running_generation is not None), # Session manager state
+                    int(session.pipeline.is_valid_gen()), # Session manager state
                     int(is_tts_finished), # Calculated local variable
-                    int(app.state.AudioInputProcessor.interrupted) # Input processor state
+                    int(session.audio_input.interrupted) # Input processor state
                 )
 
                 if curr_status != prev_status:
@@ -458,65 +563,77 @@ async def send_tts_chunks(app: FastAPI, message_queue: asyncio.Queue, callbacks:
 
             # Use connection-specific state via callbacks
             if not callbacks.tts_to_client:
-                await asyncio.sleep(0.001)
                 log_status()
                 continue
 
-            if not app.state.SpeechPipelineManager.running_generation:
-                await asyncio.sleep(0.001)
+            if not session.pipeline.running_generation:
                 log_status()
                 continue
 
-            if app.state.SpeechPipelineManager.running_generation.abortion_started:
-                await asyncio.sleep(0.001)
+            if session.pipeline.running_generation.cancel_token.is_set(): # Aborting or stopped, send nothing more
                 log_status()
                 continue
 
-            if not app.state.SpeechPipelineManager.running_generation.audio_quick_finished:
-                app.state.SpeechPipelineManager.running_generation.tts_quick_allowed_event.set()
+            if not session.pipeline.running_generation.audio_quick_finished:
+                session.pipeline.running_generation.tts_quick_allowed_event.set()
 
-            if not app.state.SpeechPipelineManager.running_generation.quick_answer_first_chunk_ready:
-                await asyncio.sleep(0.001)
+            if not (session.pipeline.running_generation.quick_answer_first_chunk_ready or session.pipeline.running_generation.filler_text):
                 log_status()
                 continue
 
             chunk = None
             try:
-                chunk = app.state.SpeechPipelineManager.running_generation.audio_chunks.get_nowait()
+                chunk = session.pipeline.running_generation.audio_chunks.get_nowait()
                 if chunk:
                     last_quick_answer_chunk = time.time()
             except Empty:
-                final_expected = app.state.SpeechPipelineManager.running_generation.quick_answer_provided
-                audio_final_finished = app.state.SpeechPipelineManager.running_generation.audio_final_finished
+                if session.pipeline.running_generation.awaiting_answer_audio:
+                    log_status() # Filler played, answer audio not synthesized yet
+                    continue
+
+                final_expected = session.pipeline.running_generation.quick_answer_provided
+                audio_final_finished = session.pipeline.running_generation.audio_final_finished
 
                 if not final_expected or audio_final_finished:
                     logger.info("🖥️🏁 Sending of TTS chunks and 'user request/assistant answer' cycle finished.")
+                    tail = session.upsampler.flush_pcm_chunk() # Samples held back by the filter delay
+                    if tail and frame_gen_id is not None:
+                        message_queue.put_nowait(TTS_FRAME_HEADER.pack(frame_gen_id, frame_seq, TTS_OUTPUT_SAMPLE_RATE) + tail)
+                        callbacks.playback.on_sent(len(tail) / 2 / TTS_OUTPUT_SAMPLE_RATE)
+                        frame_seq += 1
                     callbacks.send_final_assistant_answer() # Callbacks method
 
-                    assistant_answer = app.state.SpeechPipelineManager.running_generation.quick_answer + app.state.SpeechPipelineManager.running_generation.final_answer                    
-                    app.state.SpeechPipelineManager.running_generation = None
+                    assistant_answer = session.pipeline.running_generation.quick_answer + session.pipeline.running_generation.final_answer                    
+                    session.pipeline.running_generation = None
 
                     callbacks.tts_chunk_sent = False # Reset via callbacks
                     callbacks.reset_state() # Reset connection state via callbacks
 
-                await asyncio.sleep(0.001)
                 log_status()
                 continue
 
-            base64_chunk = app.state.Upsampler.get_base64_chunk(chunk)
-            message_queue.put_nowait({
-                "type": "tts_chunk",
-                "content": base64_chunk
-            })
+            gen_id = session.pipeline.running_generation.id
+            if gen_id != frame_gen_id:
+                frame_gen_id = gen_id
+                frame_seq = 0
+                session.upsampler.reset() # Don't filter across generations (e.g. after an abort)
+                callbacks.on_first_tts_chunk_sent(session.pipeline.running_generation)
+            pcm_chunk = session.upsampler.get_pcm_chunk(chunk)
+            message_queue.put_nowait(TTS_FRAME_HEADER.pack(gen_id, frame_seq, TTS_OUTPUT_SAMPLE_RATE) + pcm_chunk)
+            callbacks.playback.on_sent(len(pcm_chunk) / 2 / TTS_OUTPUT_SAMPLE_RATE)
+            frame_seq += 1
             last_chunk_sent = time.time()
 
             # Use connection-specific state via callbacks
             if not callbacks.tts_chunk_sent:
                 # Use the async helper function instead of a thread
-                asyncio.create_task(_reset_interrupt_flag_async(app, callbacks))
+                asyncio.create_task(_reset_interrupt_flag_async(session, callbacks))
 
             callbacks.tts_chunk_sent = True # Set via callbacks
 
+            wakeup.set() # More chunks may be queued, check again without waiting
+            await asyncio.sleep(0) # Yield so queued frames get sent
+
     except asyncio.CancelledError:
         pass # Task cancellation is expected on disconnect
     except WebSocketDisconnect as e:
@@ -540,16 +657,20 @@ class TranscriptionCallbacks:
     `message_queue` and manages interaction logic like interruptions and final answer delivery.
     It also includes a threaded worker to handle abort checks based on partial transcription.
     """
-    def __init__(self, app: FastAPI, message_queue: asyncio.Queue):
+    def __init__(self, session: VoiceSession, message_queue: asyncio.Queue, latency_stats: Optional[LatencyStats] = None):
         """
         Initializes the TranscriptionCallbacks instance for a WebSocket connection.
 
         Args:
-            app: The FastAPI application instance (to access global components).
+            session: The VoiceSession holding this connection's pipeline and audio input.
             message_queue: An asyncio queue for sending messages back to the client.
+            latency_stats: Optional aggregator that finished per-turn latency traces are recorded to.
         """
-        self.app = app
+        self.session = session
         self.message_queue = message_queue
+        self.latency_stats = latency_stats
+        self.turn_count = 1
+        self.turn_trace = TurnTrace(session.id, self.turn_count)
         self.final_transcription = ""
         self.abort_text = ""
         self.last_abort_text = ""
@@ -566,7 +687,10 @@ class TranscriptionCallbacks:
         self.is_hot: bool = False
         self.user_finished_turn: bool = False
         self.synthesis_started: bool = False
-        self.assistant_answer: str = ""
+        self._assistant_answer_parts: List[str] = [] # Partial answer of `assistant_answer_gen_id`, appended per delta
+        self._assistant_answer_length: int = 0
+        self.assistant_answer_gen_id: Optional[int] = None
+        self.last_assistant_snapshot_time: float = 0.0
         self.final_assistant_answer: str = ""
         self.is_processing_potential: bool = False
         self.is_processing_final: bool = False
@@ -577,10 +701,30 @@ class TranscriptionCallbacks:
         self.reset_state() # Call reset to ensure consistency
 
         self.abort_request_event = threading.Event()
+        self.closed_event = threading.Event()
+
+        # Wakes send_tts_chunks; set from worker threads via wake_tts_sender
+        self.loop = asyncio.get_running_loop()
+        self.tts_sender_wakeup = asyncio.Event()
+        self.session.pipeline.on_generation_state_change = self.wake_tts_sender
+        self.playback = PlaybackTracker() # Client-side TTS buffer, for synthesis backpressure
+        self.session.pipeline.client_buffered_seconds = self.playback.buffered_seconds
         self.abort_worker_thread = threading.Thread(target=self._abort_worker, name="AbortWorker", daemon=True)
         self.abort_worker_thread.start()
 
 
+    @property
+    def assistant_answer(self) -> str:
+        """The partial assistant answer received so far."""
+        if len(self._assistant_answer_parts) > 1:
+            self._assistant_answer_parts = ["".join(self._assistant_answer_parts)]
+        return self._assistant_answer_parts[0] if self._assistant_answer_parts else ""
+
+    @assistant_answer.setter
+    def assistant_answer(self, txt: str):
+        self._assistant_answer_parts = [txt] if txt else []
+        self._assistant_answer_length = len(txt)
+
     def reset_state(self):
         """Resets connection-specific state flags and variables to their initial values."""
         # Reset all connection-specific state flags
@@ -604,12 +748,58 @@ class TranscriptionCallbacks:
         self.partial_transcription = ""
 
         # Keep the abort call related to the audio processor/pipeline manager
-        self.app.state.AudioInputProcessor.abort_generation()
+        self.session.audio_input.abort_generation()
+
+        # A cycle that sent audio but never got a client tts_start still gets reported
+        if "first_chunk_sent" in self.turn_trace.marks:
+            self.finish_turn_trace()
+
+    def finish_turn_trace(self):
+        """Records the current turn's latency trace (if audio was sent) and starts a new one."""
+        trace = self.turn_trace
+        if not trace.finished and "first_chunk_sent" in trace.marks and self.latency_stats:
+            trace.finished = True
+            self.latency_stats.record(trace)
+        self.turn_count += 1
+        self.turn_trace = TurnTrace(self.session.id, self.turn_count)
+
+    def on_first_tts_chunk_sent(self, generation):
+        """
+        Completes the pipeline part of the turn trace when a generation's first audio frame is sent.
+
+        Copies the stage timestamps recorded on the `RunningGeneration` and matches the
+        generation's input text to the potential sentence that triggered it.
+
+        Args:
+            generation: The `RunningGeneration` whose first audio chunk was just queued.
+        """
+        trace = self.turn_trace
+        if "first_chunk_sent" in trace.marks:
+            return
+        potential_time = trace.potential_sentences.get(generation.text)
+        if potential_time is not None:
+            trace.mark("potential_sentence", potential_time)
+        trace.mark("prepare_generation", generation.timestamp)
+        for stage, timestamp in (
+            ("llm_first_token", generation.llm_first_token_time),
+            ("quick_answer_ready", generation.quick_answer_time),
+            ("tts_first_chunk", generation.tts_first_chunk_time),
+        ):
+            if timestamp is not None:
+                trace.mark(stage, timestamp)
+        trace.mark("first_chunk_sent")
+        trace.attributes["generation"] = generation.id
+
+    def on_client_tts_start(self):
+        """Marks client playback start and finishes the current turn trace."""
+        if "first_chunk_sent" in self.turn_trace.marks:
+            self.turn_trace.mark("client_tts_start", overwrite=False)
+            self.finish_turn_trace()
 
 
     def _abort_worker(self):
         """Background thread worker to check for abort conditions based on partial text."""
-        while True:
+        while not self.closed_event.is_set():
             was_set = self.abort_request_event.wait(timeout=0.1) # Check every 100ms
             if was_set:
                 self.abort_request_event.clear()
@@ -617,7 +807,28 @@ class TranscriptionCallbacks:
                 if self.last_abort_text != self.abort_text:
                     self.last_abort_text = self.abort_text
                     logger.debug(f"🖥️🧠 Abort check triggered by partial: '{self.abort_text}'")
-                    self.app.state.SpeechPipelineManager.check_abort(self.abort_text, False, "on_partial")
+                    self.session.pipeline.check_abort(self.abort_text, False, "on_partial")
+
+    def wake_tts_sender(self):
+        """
+        Wakes the `send_tts_chunks` task. Safe to call from any thread.
+
+        Invoked by the SpeechPipelineManager on generation state changes and by
+        callbacks that change the connection's TTS state.
+        """
+        if self.closed_event.is_set():
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.tts_sender_wakeup.set)
+        except RuntimeError:
+            pass # Event loop already closed
+
+    def close(self):
+        """Stops the abort worker thread once the connection has ended."""
+        self.closed_event.set()
+        self.session.pipeline.on_generation_state_change = None
+        self.session.pipeline.client_buffered_seconds = None
+        self.abort_worker_thread.join(timeout=1.0)
 
     def on_partial(self, txt: str):
         """
@@ -643,10 +854,10 @@ class TranscriptionCallbacks:
 
     def on_tts_allowed_to_synthesize(self):
         """Callback invoked when the system determines TTS synthesis can proceed."""
-        # Access global manager state
-        if self.app.state.SpeechPipelineManager.running_generation and not self.app.state.SpeechPipelineManager.running_generation.abortion_started:
+        # Access session manager state
+        if self.session.pipeline.running_generation and not self.session.pipeline.running_generation.abortion_started:
             logger.info(f"{Colors.apply('🖥️🔊 TTS ALLOWED').blue}")
-            self.app.state.SpeechPipelineManager.running_generation.tts_quick_allowed_event.set()
+            self.session.pipeline.running_generation.tts_quick_allowed_event.set()
 
     def on_potential_sentence(self, txt: str):
         """
@@ -658,8 +869,9 @@ class TranscriptionCallbacks:
             txt: The potential sentence text.
         """
         logger.debug(f"🖥️🧠 Potential sentence: '{txt}'")
-        # Access global manager state
-        self.app.state.SpeechPipelineManager.prepare_generation(txt)
+        self.turn_trace.add_potential_sentence(txt)
+        # Access session manager state
+        self.session.pipeline.prepare_generation(txt)
 
     def on_potential_final(self, txt: str):
         """
@@ -692,19 +904,21 @@ class TranscriptionCallbacks:
         logger.info(Colors.apply('🖥️🏁 =================== USER TURN END ===================').light_gray)
         self.user_finished_turn = True
         self.user_interrupted = False # Reset connection-specific flag (user finished, not interrupted)
-        # Access global manager state
-        if self.app.state.SpeechPipelineManager.is_valid_gen():
+        # Access session manager state
+        if self.session.pipeline.is_valid_gen():
             logger.info(f"{Colors.apply('🖥️🔊 TTS ALLOWED (before final)').blue}")
-            self.app.state.SpeechPipelineManager.running_generation.tts_quick_allowed_event.set()
+            self.session.pipeline.running_generation.tts_quick_allowed_event.set()
+            self.session.pipeline.inject_filler() # Covers a slow answer with a pre-synthesized "Sure,"
 
         # first block further incoming audio (Audio processor's state)
-        if not self.app.state.AudioInputProcessor.interrupted:
+        if not self.session.audio_input.interrupted:
             logger.info(f"{Colors.apply('🖥️🎙️ ⏸️ Microphone interrupted (end of turn)').cyan}")
-            self.app.state.AudioInputProcessor.interrupted = True
+            self.session.audio_input.interrupted = True
             self.interruption_time = time.time() # Set connection-specific flag
 
         logger.info(f"{Colors.apply('🖥️🔊 TTS STREAM RELEASED').blue}")
         self.tts_to_client = True # Set connection-specific flag
+        self.wake_tts_sender()
 
         # Send final user request (using the reliable final_transcription OR current partial if final isn't set yet)
         user_request_content = self.final_transcription if self.final_transcription else self.partial_transcription
@@ -713,20 +927,21 @@ class TranscriptionCallbacks:
             "content": user_request_content
         })
 
-        # Access global manager state
-        if self.app.state.SpeechPipelineManager.is_valid_gen():
+        # Access session manager state
+        if self.session.pipeline.is_valid_gen():
             # Send partial assistant answer (if available) to the client
             # Use connection-specific user_interrupted flag
-            if self.app.state.SpeechPipelineManager.running_generation.quick_answer and not self.user_interrupted:
-                self.assistant_answer = self.app.state.SpeechPipelineManager.running_generation.quick_answer
-                self.message_queue.put_nowait({
-                    "type": "partial_assistant_answer",
-                    "content": self.assistant_answer
-                })
+            generation = self.session.pipeline.running_generation
+            if generation.quick_answer and not self.user_interrupted:
+                self.assistant_answer_gen_id = generation.id
+                self.assistant_answer = generation.quick_answer
+                self._send_assistant_snapshot()
+
+        self.session.pipeline.promote_speculation(user_request_content)
 
         logger.info(f"🖥️🧠 Adding user request to history: '{user_request_content}'")
-        # Access global manager state
-        self.app.state.SpeechPipelineManager.history.append({"role": "user", "content": user_request_content})
+        # Access session manager state
+        self.session.pipeline.history.append({"role": "user", "content": user_request_content})
 
     def on_final(self, txt: str):
         """
@@ -751,8 +966,8 @@ class TranscriptionCallbacks:
             reason: A string describing why the abortion is triggered.
         """
         logger.info(f"{Colors.apply('🖥️🛑 Aborting generation:').blue} {reason}")
-        # Access global manager state
-        self.app.state.SpeechPipelineManager.abort_generation(reason=f"server.py abort_generations: {reason}")
+        # Access session manager state
+        self.session.pipeline.abort_generation(reason=f"server.py abort_generations: {reason}")
 
     def on_silence_active(self, silence_active: bool):
         """
@@ -766,27 +981,67 @@ class TranscriptionCallbacks:
         # logger.debug(f"🖥️🎙️ Silence active: {silence_active}") # Optional: Can be noisy
         self.silence_active = silence_active
 
-    def on_partial_assistant_text(self, txt: str):
+        trace = self.turn_trace
+        if "first_chunk_sent" not in trace.marks: # Answer already on its way, keep the turn's marks
+            if silence_active:
+                if self.session.audio_input.last_speech_frame_time:
+                    trace.mark("last_speech_frame", self.session.audio_input.last_speech_frame_time)
+                trace.mark("silence_start")
+            else:
+                # Speech resumed, the turn's end of speech is still ahead
+                trace.clear("last_speech_frame")
+                trace.clear("silence_start")
+
+    def on_partial_assistant_text(self, txt: str, gen_id: int, offset: int):
         """
-        Callback invoked when a partial text result from the assistant (LLM) is available.
+        Callback invoked when new assistant (LLM) text is available.
 
-        Updates the internal assistant answer state and sends the partial answer to the client,
-        unless the user has interrupted.
+        Appends the text to the internal assistant answer state and sends it to the client,
+        unless the user has interrupted. The client receives `partial_assistant_answer`
+        messages with `gen_id`, `offset` and `content`: `content` replaces the client's
+        answer text from `offset` on. Usually that is just the new text (a delta); at most
+        every `ASSISTANT_TEXT_SNAPSHOT_SECONDS` the whole answer is sent with offset 0
+        instead, so a client that missed a delta resynchronizes.
 
         Args:
-            txt: The partial assistant text.
+            txt: The new assistant text.
+            gen_id: Id of the generation the text belongs to.
+            offset: Position of `txt` within the generation's answer.
         """
-        logger.info(f"{Colors.apply('🖥️💬 PARTIAL ASSISTANT ANSWER: ').green}{txt}")
+        logger.debug(f"🖥️💬 Partial assistant answer [Gen {gen_id}] @{offset}: {txt}")
         # Use connection-specific user_interrupted flag
-        if not self.user_interrupted:
-            self.assistant_answer = txt
-            # Use connection-specific tts_to_client flag
-            if self.tts_to_client:
+        if self.user_interrupted:
+            return
+        if gen_id != self.assistant_answer_gen_id:
+            self.assistant_answer_gen_id = gen_id
+            self.assistant_answer = ""
+        if offset != self._assistant_answer_length:
+            self.assistant_answer = self.assistant_answer[:offset] # Text was replaced (e.g., quick answer resent)
+        self._assistant_answer_parts.append(txt)
+        self._assistant_answer_length += len(txt)
+        # Use connection-specific tts_to_client flag
+        if self.tts_to_client:
+            if offset == 0 or time.time() - self.last_assistant_snapshot_time >= ASSISTANT_TEXT_SNAPSHOT_SECONDS:
+                self._send_assistant_snapshot()
+            else:
                 self.message_queue.put_nowait({
                     "type": "partial_assistant_answer",
+                    "gen_id": gen_id,
+                    "offset": offset,
                     "content": txt
                 })
 
+    def _send_assistant_snapshot(self):
+        """Sends the whole partial assistant answer, replacing the client's text."""
+        self.last_assistant_snapshot_time = time.time()
+        logger.info(f"{Colors.apply('🖥️💬 PARTIAL ASSISTANT ANSWER: ').green}{self.assistant_answer}")
+        self.message_queue.put_nowait({
+            "type": "partial_assistant_answer",
+            "gen_id": self.assistant_answer_gen_id,
+            "offset": 0,
+            "content": self.assistant_answer
+        })
+
     def on_recording_start(self):
         """
         Callback invoked when the audio input processor starts recording user speech.
@@ -799,6 +1054,7 @@ class TranscriptionCallbacks:
         # Use connection-specific tts_client_playing flag
         if self.tts_client_playing:
             self.tts_to_client = False # Stop server sending TTS
+            self.wake_tts_sender()
             self.user_interrupted = True # Mark connection as user interrupted
             logger.info(f"{Colors.apply('🖥️❗ INTERRUPTING TTS due to recording start').blue}")
 
@@ -824,6 +1080,7 @@ class TranscriptionCallbacks:
                 "type": "tts_interruption",
                 "content": ""
             })
+            self.playback.reset()
 
             # Reset state *after* performing actions based on the old state
             # Be careful what exactly needs reset vs persists (like tts_client_playing)
@@ -842,9 +1099,9 @@ class TranscriptionCallbacks:
                     final answer is available. Defaults to False.
         """
         final_answer = ""
-        # Access global manager state
-        if self.app.state.SpeechPipelineManager.is_valid_gen():
-            final_answer = self.app.state.SpeechPipelineManager.running_generation.quick_answer + self.app.state.SpeechPipelineManager.running_generation.final_answer
+        # Access session manager state
+        if self.session.pipeline.is_valid_gen():
+            final_answer = self.session.pipeline.running_generation.quick_answer + self.session.pipeline.running_generation.final_answer
 
         if not final_answer: # Check if constructed answer is empty
             # If forced, try using the last known partial answer from this connection
@@ -871,7 +1128,9 @@ class TranscriptionCallbacks:
                     "type": "final_assistant_answer",
                     "content": cleaned_answer
                 })
-                app.state.SpeechPipelineManager.history.append({"role": "assistant", "content": cleaned_answer})
+                self.session.pipeline.history.append({"role": "assistant", "content": cleaned_answer})
+                if not forced:
+                    self.session.pipeline.remember_answer(cleaned_answer)
                 self.final_assistant_answer_sent = True
                 self.final_assistant_answer = cleaned_answer # Store the sent answer
             else:
@@ -891,45 +1150,56 @@ async def websocket_endpoint(ws: WebSocket):
     """
     Handles the main WebSocket connection for real-time voice chat.
 
-    Accepts a connection, sets up connection-specific state via `TranscriptionCallbacks`,
-    initializes audio/message queues, and creates asyncio tasks for handling
-    incoming data, audio processing, outgoing text messages, and outgoing TTS chunks.
-    Manages the lifecycle of these tasks and cleans up on disconnect.
+    Accepts a connection, acquires a `VoiceSession` (own pipeline, history and
+    upsampler, pooled audio input) from the `SessionManager`, sets up
+    connection-specific state via `TranscriptionCallbacks`, initializes
+    audio/message queues, and creates asyncio tasks for handling incoming data,
+    audio processing, outgoing text messages, and outgoing TTS chunks.
+    Manages the lifecycle of these tasks and releases the session on disconnect.
+    If all session slots are busy, the connection is closed with code 1013.
 
     Args:
         ws: The WebSocket connection instance provided by FastAPI.
     """
     await ws.accept()
-    logger.info("🖥️✅ Client connected via WebSocket.")
+    session_manager: SessionManager = app.state.SessionManager
+    session = await asyncio.to_thread(session_manager.acquire)
+    if session is None:
+        logger.warning(f"🖥️⚠️ All {session_manager.max_sessions} session slots busy, rejecting client.")
+        metrics.SESSIONS_REJECTED.inc()
+        await ws.close(code=1013, reason="Server busy, try again later")
+        return
+    logger.info(f"🖥️✅ Client connected via WebSocket (session {session.id}).")
 
     message_queue = asyncio.Queue()
     audio_chunks = asyncio.Queue()
 
     # Set up callback manager - THIS NOW HOLDS THE CONNECTION-SPECIFIC STATE
-    callbacks = TranscriptionCallbacks(app, message_queue)
+    callbacks = TranscriptionCallbacks(session, message_queue, app.state.LatencyStats)
 
-    # Assign callbacks to the AudioInputProcessor (global component)
+    # Assign callbacks to this session's AudioInputProcessor
     # These methods within callbacks will now operate on its *instance* state
-    app.state.AudioInputProcessor.realtime_callback = callbacks.on_partial
-    app.state.AudioInputProcessor.transcriber.potential_sentence_end = callbacks.on_potential_sentence
-    app.state.AudioInputProcessor.transcriber.on_tts_allowed_to_synthesize = callbacks.on_tts_allowed_to_synthesize
-    app.state.AudioInputProcessor.transcriber.potential_full_transcription_callback = callbacks.on_potential_final
-    app.state.AudioInputProcessor.transcriber.potential_full_transcription_abort_callback = callbacks.on_potential_abort
-    app.state.AudioInputProcessor.transcriber.full_transcription_callback = callbacks.on_final
-    app.state.AudioInputProcessor.transcriber.before_final_sentence = callbacks.on_before_final
-    app.state.AudioInputProcessor.recording_start_callback = callbacks.on_recording_start
-    app.state.AudioInputProcessor.silence_active_callback = callbacks.on_silence_active
-
-    # Assign callback to the SpeechPipelineManager (global component)
-    app.state.SpeechPipelineManager.on_partial_assistant_text = callbacks.on_partial_assistant_text
+    audio_input = session.audio_input
+    audio_input.realtime_callback = callbacks.on_partial
+    audio_input.transcriber.potential_sentence_end = callbacks.on_potential_sentence
+    audio_input.transcriber.on_tts_allowed_to_synthesize = callbacks.on_tts_allowed_to_synthesize
+    audio_input.transcriber.potential_full_transcription_callback = callbacks.on_potential_final
+    audio_input.transcriber.potential_full_transcription_abort_callback = callbacks.on_potential_abort
+    audio_input.transcriber.full_transcription_callback = callbacks.on_final
+    audio_input.transcriber.before_final_sentence = callbacks.on_before_final
+    audio_input.recording_start_callback = callbacks.on_recording_start
+    audio_input.silence_active_callback = callbacks.on_silence_active
+
+    # Assign callback to this session's SpeechPipelineManager
+    session.pipeline.on_partial_assistant_text = callbacks.on_partial_assistant_text
 
     # Create tasks for handling different responsibilities
     # Pass the 'callbacks' instance to tasks that need connection-specific state
     tasks = [
-        asyncio.create_task(process_incoming_data(ws, app, audio_chunks, callbacks)), # Pass callbacks
-        asyncio.create_task(app.state.AudioInputProcessor.process_chunk_queue(audio_chunks)),
+        asyncio.create_task(process_incoming_data(ws, session, audio_chunks, callbacks)), # Pass callbacks
+        asyncio.create_task(audio_input.process_chunk_queue(audio_chunks)),
         asyncio.create_task(send_text_messages(ws, message_queue)),
-        asyncio.create_task(send_tts_chunks(app, message_queue, callbacks)), # Pass callbacks
+        asyncio.create_task(send_tts_chunks(session, message_queue, callbacks)), # Pass callbacks
     ]
 
     try:
@@ -950,7 +1220,9 @@ async def websocket_endpoint(ws: WebSocket):
         # Ensure all tasks are awaited after cancellation
         # Use return_exceptions=True to prevent gather from stopping on first error during cleanup
         await asyncio.gather(*tasks, return_exceptions=True)
-        logger.info("🖥️❌ WebSocket session ended.")
+        await asyncio.to_thread(callbacks.close)
+        await session_manager.release(session)
+        logger.info(f"🖥️❌ WebSocket session {session.id} ended.")
 
 # --------------------------------------------------------------------
 # Entry point
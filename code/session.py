@@ -0,0 +1,171 @@
+# session.py
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from typing import List, Optional
+
+from audio_in import AudioInputProcessor
+from speech_pipeline_manager import SharedPipelineResources, SpeechPipelineManager
+from upsampler import StreamingUpsampler
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of concurrent voice sessions (each needs its own STT recorder slot)
+try:
+    MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 2))
+except ValueError:
+    logger.warning("🖥️⚠️ Invalid MAX_SESSIONS env var. Using default: 2")
+    MAX_SESSIONS = 2
+
+
+class VoiceSession:
+    """
+    Bundles all state belonging to a single WebSocket connection.
+
+    Each session owns its own `SpeechPipelineManager` (history, running generation,
+    worker threads), its own `StreamingUpsampler` state and an `AudioInputProcessor`
+    borrowed from the `SessionManager` pool. Heavy models (TTS engine, LLM client,
+    turn detection classifier) are shared through `SharedPipelineResources`.
+    """
+    def __init__(
+            self,
+            pipeline: SpeechPipelineManager,
+            audio_input: AudioInputProcessor,
+            slot_index: int,
+        ) -> None:
+        """
+        Initializes the VoiceSession.
+
+        Args:
+            pipeline: The per-session speech pipeline manager.
+            audio_input: The pooled audio input processor assigned to this session.
+            slot_index: Index of the audio input slot within the session pool.
+        """
+        self.id: str = uuid.uuid4().hex[:8]
+        self.pipeline = pipeline
+        self.audio_input = audio_input
+        self.slot_index = slot_index
+        self.upsampler = StreamingUpsampler()
+
+
+class SessionManager:
+    """
+    Creates and recycles per-connection `VoiceSession` objects.
+
+    The speech-to-text recorders cannot share one loaded Whisper model and must be
+    created on the running event loop, so a fixed number of `AudioInputProcessor`
+    slots is created at startup and handed out to connections. Every connection
+    gets a fresh `SpeechPipelineManager` built on the shared, already loaded models.
+    """
+    def __init__(
+            self,
+            resources: SharedPipelineResources,
+            language: str = "en",
+            max_sessions: int = MAX_SESSIONS,
+        ) -> None:
+        """
+        Initializes the SessionManager and pre-creates the audio input slots.
+
+        Must be called from within a running asyncio event loop, since
+        `AudioInputProcessor` starts its transcription task on creation.
+
+        Args:
+            resources: The shared, already loaded TTS and LLM resources.
+            language: Target language code for transcription (e.g., "en").
+            max_sessions: Number of concurrent sessions (audio input slots) to allow.
+        """
+        self.resources = resources
+        self.max_sessions = max(1, max_sessions)
+        self._lock = threading.Lock()
+        self._free_slots: List[int] = list(range(self.max_sessions))
+        self.sessions: dict[str, VoiceSession] = {}
+
+        logger.info(f"🖥️⚙️ Creating {self.max_sessions} audio input slot(s)")
+        self.audio_inputs: List[AudioInputProcessor] = [
+            AudioInputProcessor(
+                language,
+                is_orpheus=resources.tts_engine == "orpheus",
+                pipeline_latency=resources.full_output_pipeline_latency / 1000, # seconds
+            )
+            for _ in range(self.max_sessions)
+        ]
+        for audio_input in self.audio_inputs:
+            resources.latency.subscribe(audio_input.set_pipeline_latency) # Turn timing follows the measured latency
+
+    @property
+    def active_count(self) -> int:
+        """Number of sessions currently in use."""
+        return len(self.sessions)
+
+    def acquire(self) -> Optional[VoiceSession]:
+        """
+        Hands out a new session bound to a free audio input slot.
+
+        Returns:
+            A new `VoiceSession`, or None if all slots are in use.
+        """
+        with self._lock:
+            if not self._free_slots:
+                return None
+            slot_index = self._free_slots.pop(0)
+
+        try:
+            pipeline = SpeechPipelineManager(resources=self.resources)
+        except Exception:
+            with self._lock:
+                self._free_slots.append(slot_index)
+            raise
+
+        session = VoiceSession(pipeline, self.audio_inputs[slot_index], slot_index)
+        with self._lock:
+            self.sessions[session.id] = session
+        logger.info(f"🖥️➕ Session {session.id} acquired slot {slot_index} ({self.active_count}/{self.max_sessions} active)")
+        return session
+
+    async def release(self, session: VoiceSession) -> None:
+        """
+        Returns a session's audio input slot to the pool and stops its pipeline.
+
+        Detaches all connection callbacks from the pooled `AudioInputProcessor`,
+        resets its interruption, resampler and recognition state (aborting an utterance
+        in progress, see `TranscriptionProcessor.reset`) and shuts down the session's
+        `SpeechPipelineManager` worker threads. The slot is only handed out again
+        once nothing of this session's speech is left in it.
+
+        Args:
+            session: The session to release.
+        """
+        audio_input = session.audio_input
+        audio_input.realtime_callback = None
+        audio_input.recording_start_callback = None
+        audio_input.silence_active_callback = None
+        audio_input.interrupted = False
+        audio_input.last_partial_text = None
+        audio_input.decimator.reset()
+
+        transcriber = audio_input.transcriber
+        transcriber.potential_sentence_end = None
+        transcriber.on_tts_allowed_to_synthesize = None
+        transcriber.potential_full_transcription_callback = None
+        transcriber.potential_full_transcription_abort_callback = None
+        transcriber.full_transcription_callback = None
+        transcriber.before_final_sentence = None
+        if transcriber.turn_detection:
+            transcriber.turn_detection.update_settings(0.0)
+        audio_input.abort_generation()
+        await asyncio.to_thread(transcriber.reset) # Waits for the recorder to drop the current recording
+
+        session.pipeline.on_partial_assistant_text = None
+        await asyncio.to_thread(session.pipeline.shutdown)
+
+        with self._lock:
+            self.sessions.pop(session.id, None)
+            self._free_slots.append(session.slot_index)
+        logger.info(f"🖥️➖ Session {session.id} released slot {session.slot_index} ({self.active_count}/{self.max_sessions} active)")
+
+    def shutdown(self) -> None:
+        """Shuts down all pooled audio input processors."""
+        for audio_input in self.audio_inputs:
+            audio_input.shutdown()
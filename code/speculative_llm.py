@@ -0,0 +1,298 @@
+# speculative_llm.py
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Generator, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable via environment variables
+try:
+    SPECULATION_MAX_CANDIDATES = int(os.getenv("SPECULATION_MAX_CANDIDATES", 3)) # Concurrent LLM streams per session
+except ValueError:
+    logger.warning("🤖⚠️ Invalid SPECULATION_MAX_CANDIDATES env var. Using default: 3")
+    SPECULATION_MAX_CANDIDATES = 3
+
+
+def normalize_transcript(text: str) -> str:
+    """
+    Normalizes a transcript for matching candidates: lowercase, punctuation removed, whitespace collapsed.
+
+    Args:
+        text: The (partial) transcription.
+
+    Returns:
+        The normalized text.
+    """
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s']", " ", text.lower())).strip()
+
+
+def is_prefix_extension(old_text: str, new_text: str) -> bool:
+    """
+    Checks whether `new_text` only appends words to `old_text` (the user kept talking).
+
+    Args:
+        old_text: The transcript the running generation was started for.
+        new_text: The newer transcript.
+
+    Returns:
+        True if the normalized new text starts with the whole normalized old text
+        followed by at least one more word.
+    """
+    old_key, new_key = normalize_transcript(old_text), normalize_transcript(new_text)
+    return bool(old_key) and new_key.startswith(old_key + " ")
+
+
+class SpeculativeCandidate:
+    """
+    One LLM generation started for a candidate transcript, buffering its tokens.
+
+    A producer thread drains the LLM stream into `tokens`, independent of any
+    consumer, so the stream keeps running when the generation that read it is
+    aborted. `stream()` replays the buffered tokens and then follows the live
+    stream, so a candidate can be picked up again without losing tokens.
+    """
+    def __init__(self, key: str, text: str, history_key: int, request_id: str):
+        """
+        Initializes the SpeculativeCandidate.
+
+        Args:
+            key: Normalized transcript the candidate was started for.
+            text: The original transcript.
+            history_key: Fingerprint of the history the prompt was built from.
+            request_id: LLM request id of the underlying stream.
+        """
+        self.key = key
+        self.text = text
+        self.history_key = history_key
+        self.request_id = request_id
+        self.created = time.time()
+        self.tokens: List[str] = []
+        self.done = False
+        self.cancelled = False
+        self.promoted = False
+        self.error: Optional[Exception] = None
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def token_count(self) -> int:
+        return len(self.tokens)
+
+    def start(self, llm, history: List[Dict[str, str]]) -> None:
+        """Starts the producer thread streaming from `llm`."""
+        self._thread = threading.Thread(target=self._produce, args=(llm, history), name=f"Speculation-{self.request_id}", daemon=True)
+        self._thread.start()
+
+    def _produce(self, llm, history: List[Dict[str, str]]) -> None:
+        try:
+            for token in llm.generate(text=self.text, history=history, use_system_prompt=True, request_id=self.request_id):
+                if self.cancelled:
+                    break
+                with self._cond:
+                    self.tokens.append(token)
+                    self._cond.notify_all()
+        except Exception as e:
+            if not self.cancelled:
+                logger.error(f"🤖🔮💥 [{self.request_id}] Speculative generation failed: {e}")
+                self.error = e
+        finally:
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+
+    def cancel(self, llm) -> None:
+        """Stops the producer and closes the LLM stream."""
+        self.cancelled = True
+        if not self.done:
+            try:
+                llm.cancel_generation(self.request_id)
+            except Exception as e:
+                logger.warning(f"🤖🔮💥 [{self.request_id}] Error cancelling speculative stream: {e}")
+        with self._cond:
+            self._cond.notify_all()
+
+    def stream(self, should_stop: Optional[Callable[[], bool]] = None) -> Generator[str, None, None]:
+        """
+        Yields all tokens from the beginning, then live tokens until the stream ends.
+
+        Args:
+            should_stop: Optional callable polled while waiting; returning True ends the iteration.
+
+        Raises:
+            Exception: The producer's error, if the LLM stream failed before any remaining tokens.
+        """
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.tokens) and not self.done and not self.cancelled:
+                    if should_stop and should_stop():
+                        return
+                    self._cond.wait(timeout=0.05)
+                if index >= len(self.tokens):
+                    if self.error is not None:
+                        raise self.error
+                    return
+                token = self.tokens[index]
+            index += 1
+            yield token
+
+
+class SpeculativeLLMPool:
+    """
+    Bounded pool of concurrent candidate LLM generations, keyed by normalized transcript.
+
+    When STT refines a potential sentence, the generation for the old text is no
+    longer thrown away: its stream keeps running in the pool, and if the transcript
+    comes back to that text, its already generated tokens are reused. When the user
+    turn ends (`promote`), the candidate matching the final transcript is kept and
+    all others are cancelled. Tokens generated by candidates that were never used
+    are counted as wasted.
+    """
+    def __init__(self, llm, max_candidates: int = SPECULATION_MAX_CANDIDATES, request_prefix: str = "spec"):
+        """
+        Initializes the SpeculativeLLMPool.
+
+        Args:
+            llm: The (shared) `LLM` instance.
+            max_candidates: Maximum number of concurrent candidate streams (at least 1).
+            request_prefix: Prefix for candidate LLM request ids.
+        """
+        self.llm = llm
+        self.max_candidates = max(1, max_candidates)
+        self.request_prefix = request_prefix
+        self.backend = getattr(llm, "backend", "unknown")
+        self._lock = threading.Lock()
+        self._candidates: List[SpeculativeCandidate] = [] # Oldest first
+        self._counter = 0
+        self.wasted_tokens = 0
+        self.reused_tokens = 0
+
+    @staticmethod
+    def _history_key(history: List[Dict[str, str]], key: str) -> int:
+        """Fingerprints the prompt history, ignoring a trailing user message holding the transcript itself."""
+        if history and history[-1].get("role") == "user" and normalize_transcript(history[-1].get("content", "")) == key:
+            history = history[:-1] # Same prompt: LLM.generate only appends the text if the last message isn't a user turn
+        return hash(tuple((m.get("role"), m.get("content")) for m in history))
+
+    def acquire(self, text: str, history: List[Dict[str, str]]) -> SpeculativeCandidate:
+        """
+        Returns the running candidate for `text`, or starts a new one.
+
+        Reuses a candidate with the same normalized transcript and history. Otherwise
+        starts a new stream, first evicting the oldest candidate if the pool is full
+        (finished candidates are evicted before running ones).
+
+        Args:
+            text: The transcript to generate an answer for.
+            history: The history messages for the prompt.
+
+        Returns:
+            The candidate; read its tokens with `stream()`.
+        """
+        key = normalize_transcript(text)
+        history_key = self._history_key(history, key)
+        evicted: List[SpeculativeCandidate] = []
+        with self._lock:
+            for candidate in self._candidates:
+                if candidate.key == key and candidate.history_key == history_key and not candidate.cancelled and candidate.error is None:
+                    self._candidates.remove(candidate)
+                    self._candidates.append(candidate) # Most recently used last
+                    self.reused_tokens += candidate.token_count
+                    metrics.LLM_SPECULATIONS.labels(outcome="reused", backend=self.backend).inc()
+                    logger.info(f"🤖🔮♻️ [{candidate.request_id}] Reusing speculative generation for '{text[:40]}' ({candidate.token_count} tokens ready).")
+                    return candidate
+
+            while len(self._candidates) >= self.max_candidates:
+                finished = [c for c in self._candidates if c.done]
+                victim = finished[0] if finished else self._candidates[0]
+                self._candidates.remove(victim)
+                evicted.append(victim)
+
+            self._counter += 1
+            candidate = SpeculativeCandidate(key, text, history_key, f"{self.request_prefix}-{self._counter}")
+            self._candidates.append(candidate)
+        for victim in evicted:
+            self._discard(victim, "evicted")
+        candidate.start(self.llm, history)
+        metrics.LLM_SPECULATIONS.labels(outcome="started", backend=self.backend).inc()
+        logger.info(f"🤖🔮🚀 [{candidate.request_id}] Started speculative generation for '{text[:40]}' ({len(self._candidates)}/{self.max_candidates} candidates).")
+        return candidate
+
+    def promote(self, text: str, fallback_request_id: Optional[str] = None) -> Optional[SpeculativeCandidate]:
+        """
+        Keeps the candidate matching the final transcript and cancels all others.
+
+        Args:
+            text: The final transcript of the user turn.
+            fallback_request_id: Candidate to keep if none matches (e.g., the one being played).
+
+        Returns:
+            The matching candidate, or None if no candidate matches `text`.
+        """
+        key = normalize_transcript(text)
+        with self._lock:
+            match = next((c for c in reversed(self._candidates) if c.key == key and not c.cancelled), None)
+            keep = match or next((c for c in self._candidates if c.request_id == fallback_request_id), None)
+            losers = [c for c in self._candidates if c is not keep]
+            self._candidates = [keep] if keep else []
+            if keep:
+                keep.promoted = True
+        for loser in losers:
+            self._discard(loser, "cancelled")
+        if match:
+            metrics.LLM_SPECULATIONS.labels(outcome="promoted", backend=self.backend).inc()
+            logger.info(f"🤖🔮🏆 [{match.request_id}] Promoted speculative generation for final '{text[:40]}' ({match.token_count} tokens ready, {len(losers)} cancelled).")
+        return match
+
+    def release(self, request_id: Optional[str]) -> None:
+        """
+        Called when the generation reading `request_id` is aborted.
+
+        Unpromoted candidates keep running as speculation; a promoted one (the
+        answer to a finished user turn) is no longer needed and is cancelled.
+        """
+        with self._lock:
+            candidate = next((c for c in self._candidates if c.request_id == request_id), None)
+            if candidate is None or not candidate.promoted:
+                return
+            self._candidates.remove(candidate)
+        candidate.cancel(self.llm)
+        metrics.LLM_SPECULATIONS.labels(outcome="aborted", backend=self.backend).inc()
+
+    def discard(self, request_id: Optional[str], outcome: str = "superseded") -> None:
+        """
+        Cancels the candidate `request_id` right away, e.g. when a longer transcript replaces it.
+
+        Args:
+            request_id: The candidate's LLM request id.
+            outcome: Outcome label for metrics and logging.
+        """
+        with self._lock:
+            candidate = next((c for c in self._candidates if c.request_id == request_id), None)
+            if candidate is None:
+                return
+            self._candidates.remove(candidate)
+        self._discard(candidate, outcome)
+
+    def cancel_all(self) -> None:
+        """Cancels every candidate (e.g., on reset or shutdown)."""
+        with self._lock:
+            candidates, self._candidates = self._candidates, []
+        for candidate in candidates:
+            self._discard(candidate, "cancelled")
+
+    def _discard(self, candidate: SpeculativeCandidate, outcome: str) -> None:
+        """Cancels a candidate and accounts its tokens as wasted unless it was used."""
+        candidate.cancel(self.llm)
+        metrics.LLM_SPECULATIONS.labels(outcome=outcome, backend=self.backend).inc()
+        if candidate.promoted:
+            return
+        wasted = candidate.token_count
+        self.wasted_tokens += wasted
+        metrics.LLM_SPECULATIVE_TOKENS_WASTED.labels(backend=self.backend).inc(wasted)
+        logger.info(f"🤖🔮🗑️ [{candidate.request_id}] Speculation '{candidate.text[:40]}' {outcome}: {wasted} tokens wasted ({self.wasted_tokens} total this session).")
@@ -1,17 +1,28 @@
 # speech_pipeline_manager.py
-from typing import Optional, Callable
+from typing import Optional, Callable, Iterator
 import threading
 import logging
 import time
+import uuid
+import os
 from queue import Queue, Empty
 import sys
 
 # (Make sure real/mock imports are correct)
-from audio_module import AudioProcessor
+from audio_module import AudioProcessor, QUICK_ANSWER_STREAM_CHUNK_SIZE, FINAL_ANSWER_STREAM_CHUNK_SIZE
 from text_similarity import TextSimilarity
-from text_context import TextContext
 from llm_module import LLM
+from history_manager import ConversationHistory, load_token_counter
+from speculative_llm import SpeculativeLLMPool, is_prefix_extension
+from filler_bank import FillerBank
+from sentence_scheduler import TTS_ENGINE_POOL_SIZE, SentenceTTSScheduler, iter_segments
+from tts_cache import TTSCache
+from answer_cache import USE_ANSWER_CACHE, SemanticAnswerCache, stream_cached_answer
+from text_filter import filter_llm_stream
+from latency_calibration import PipelineLatencyCalibrator, USE_LATENCY_CALIBRATION
+from generation_state import CancellationToken, GenerationState, GenerationStateMachine
 from colors import Colors
+import metrics
 
 # (Logging setup)
 logger = logging.getLogger(__name__)
@@ -25,6 +36,41 @@ except FileNotFoundError:
     logger.warning("🗣️📄 system_prompt_salesman.txt not found. Using default system prompt.")
     system_prompt = "You are a helpful assistant."
 
+# Separate TTS engine instances for the quick and the final answer (more memory, no shared stream)
+DEDICATED_TTS_ENGINES = os.getenv("DEDICATED_TTS_ENGINES", "false").lower() in ("1", "true", "yes")
+TTS_MEMORY_HEADROOM = 1.25 # Free memory required per extra engine, as a multiple of what the first one used
+try:
+    TTS_LOOKAHEAD_SECONDS = float(os.getenv("TTS_LOOKAHEAD_SECONDS", 8.0)) # Audio synthesized ahead of playback; 0 disables the limit
+except ValueError:
+    logger.warning("🗣️⚠️ Invalid TTS_LOOKAHEAD_SECONDS env var. Using default: 8.0")
+    TTS_LOOKAHEAD_SECONDS = 8.0
+TTS_BYTES_PER_SECOND = 24000 * 2 # PCM16 mono at the engines' 24kHz
+try:
+    ABORT_SLO_MS = float(os.getenv("ABORT_SLO_MS", 300)) # Target time from abort request until all stages stopped
+except ValueError:
+    logger.warning("🗣️⚠️ Invalid ABORT_SLO_MS env var. Using default: 300")
+    ABORT_SLO_MS = 300.0
+
+
+def free_memory_bytes() -> Optional[int]:
+    """
+    Returns the free memory of the device TTS models load into.
+
+    CUDA device memory if a GPU is available, otherwise available system memory
+    (if psutil is installed). None if it cannot be determined.
+    """
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return torch.cuda.mem_get_info()[0]
+    except Exception:
+        pass
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except Exception:
+        return None
+
 
 USE_ORPHEUS_UNCENSORED = False
 
@@ -63,6 +109,53 @@ class PipelineRequest:
         self.data = data
         self.timestamp = time.time()
 
+class NotifyingQueue(Queue):
+    """
+    A thread-safe `Queue` that invokes a callback after every successful put.
+
+    Lets consumers living on an asyncio event loop (e.g., the server's TTS sender)
+    be woken up when TTS worker threads queue audio, instead of polling.
+    """
+    def __init__(self, on_put: Optional[Callable[[], None]] = None, maxsize: int = 0):
+        """
+        Initializes the NotifyingQueue.
+
+        Args:
+            on_put: Optional callback invoked (without arguments) after each item is added.
+            maxsize: Maximum queue size, as for `queue.Queue`. 0 means unbounded.
+        """
+        super().__init__(maxsize)
+        self.on_put = on_put
+        self.queued_bytes = 0 # Total length of the queued (bytes) items
+
+    def _put(self, item) -> None:
+        super()._put(item)
+        self.queued_bytes += len(item) if item else 0
+
+    def _get(self):
+        item = super()._get()
+        self.queued_bytes -= len(item) if item else 0
+        return item
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None) -> None:
+        """Puts an item into the queue and notifies the `on_put` callback."""
+        super().put(item, block, timeout)
+        if self.on_put:
+            self.on_put()
+
+    def put_front(self, items: list) -> None:
+        """Puts `items` (in order) ahead of everything already queued and notifies `on_put`."""
+        if not items:
+            return
+        with self.not_empty:
+            self.queue.extendleft(reversed(items))
+            self.queued_bytes += sum(len(item) for item in items)
+            self.unfinished_tasks += len(items)
+            self.not_empty.notify()
+        if self.on_put:
+            self.on_put()
+
+
 class RunningGeneration:
     """
     Holds the state and resources for a single, ongoing text-to-speech generation process.
@@ -71,18 +164,28 @@ class RunningGeneration:
     the status of LLM and TTS stages (quick and final), threading events for synchronization,
     queues for audio chunks, and text buffers for partial/complete answers.
     """
-    def __init__(self, id: int):
+    def __init__(self, id: int, on_audio_chunk: Optional[Callable[[], None]] = None):
         """
         Initializes a RunningGeneration state object.
 
         Args:
             id: A unique identifier for this generation attempt.
+            on_audio_chunk: Optional callback invoked whenever an audio chunk is queued.
         """
         self.id: int = id # Store the generation ID
         self.text: Optional[str] = None
         self.timestamp = time.time()
 
+        # Stage timestamps (time.time() seconds) for per-turn latency tracing
+        self.llm_first_token_time: Optional[float] = None
+        self.quick_answer_time: Optional[float] = None
+        self.tts_first_chunk_time: Optional[float] = None
+
         self.llm_generator = None
+        self.text_segments: Optional[Iterator[str]] = None # Quick answer, then final answer sentences (see `iter_segments`)
+        self.llm_request_id: Optional[str] = None # Used to cancel only this generation's LLM stream
+        self.llm_request_time: Optional[float] = None # When this generation's own LLM request started (None if reused or cached)
+        self.from_answer_cache: bool = False # Answer served by the semantic answer cache instead of the LLM
         self.llm_finished: bool = False
         self.llm_finished_event = threading.Event()
         self.llm_aborted: bool = False
@@ -90,16 +193,21 @@ class RunningGeneration:
         self.quick_answer: str = ""
         self.quick_answer_provided: bool = False
         self.quick_answer_first_chunk_ready: bool = False
+        self.filler_text: Optional[str] = None # Filler clip queued ahead of the answer audio, if any
         self.quick_answer_overhang: str = "" # This is the part of the text that was not used in the context
         self.tts_quick_started: bool = False
 
         self.tts_quick_allowed_event = threading.Event()
-        self.audio_chunks = Queue()
+        self.audio_chunks = NotifyingQueue(on_put=on_audio_chunk)
         self.audio_quick_finished: bool = False
+        self.audio_quick_finished_event = threading.Event() # Set with audio_quick_finished; releases the final answer's audio
         self.audio_quick_aborted: bool = False
         self.tts_quick_finished_event = threading.Event()
 
-        self.abortion_started: bool = False
+        # Cancelling the token stops every stage (LLM stream, quick and final TTS); `state` records the lifecycle with timestamps
+        self.cancel_token = CancellationToken()
+        self.state = GenerationStateMachine(id)
+        self.abortion_started: bool = False # Set when process_abort_generation takes over cleaning up this generation
 
         self.tts_final_finished_event = threading.Event()
         self.tts_final_started: bool = False
@@ -109,38 +217,41 @@ class RunningGeneration:
 
         self.completed: bool = False
 
+    @property
+    def awaiting_answer_audio(self) -> bool:
+        """True while a filler was played but the quick answer's audio is still to come."""
+        if not self.filler_text or self.quick_answer_first_chunk_ready or self.audio_quick_finished or self.llm_aborted:
+            return False
+        return not self.llm_finished or bool(self.quick_answer)
 
-class SpeechPipelineManager:
+
+class SharedPipelineResources:
     """
-    Orchestrates the text-to-speech pipeline, managing LLM and TTS workers.
+    Holds the heavy, process-wide components shared by every SpeechPipelineManager.
 
-    This class handles incoming text requests, manages the lifecycle of a generation
-    (including LLM inference, TTS synthesis for both quick and final parts),
-    facilitates aborting ongoing generations, manages conversation history,
-    and coordinates worker threads using queues and events.
+    Loads the TTS engine (`AudioProcessor`) and the LLM client once, prewarms them
+    and measures their latencies. Per-connection `SpeechPipelineManager` instances
+    then reuse these handles instead of loading their own model weights.
     """
     def __init__(
             self,
             tts_engine: str = "kokoro",
             llm_provider: str = "ollama",
-            # llm_model: str = "hf.co/bartowski/huihui-ai_Mistral-Small-24B-Instruct-2501-abliterated-GGUF:Q4_K_M",
             llm_model: str = "gemma2:2b",
             no_think: bool = False,
             orpheus_model: str = "orpheus-3b-0.1-ft-Q8_0-GGUF/orpheus-3b-0.1-ft-q8_0.gguf",
+            llm_base_url: Optional[str] = None,
         ):
         """
-        Initializes the SpeechPipelineManager.
-
-        Sets up configuration, instantiates dependencies (AudioProcessor, LLM, etc.),
-        loads system prompts, initializes state variables (queues, events, flags),
-        measures initial inference latencies, and starts the background worker threads.
+        Loads the shared TTS engine and LLM client and measures their latencies.
 
         Args:
-            tts_engine: The TTS engine to use (e.g., "kokoro", "orpheus").
+            tts_engine: The TTS engine to use (e.g., "kokoro", "orpheus", "mock").
             llm_provider: The LLM backend provider (e.g., "ollama").
             llm_model: The specific LLM model identifier.
-            no_think: If True, removes specific thinking tags from LLM output.
+            no_think: If True, asks the LLM to skip its thinking phase (think blocks are always stripped from its output).
             orpheus_model: Path or identifier for the Orpheus TTS model, if used.
+            llm_base_url: Optional base URL of the LLM backend (e.g., a mock Ollama server).
         """
         self.tts_engine = tts_engine
         self.llm_provider = llm_provider
@@ -152,28 +263,144 @@ class SpeechPipelineManager:
         if tts_engine == "orpheus":
             self.system_prompt += f"\n{orpheus_prompt_addon}"
 
-        # --- Instance Dependencies ---
+        # One index of the cache directory for all TTS engine instances
+        self.tts_cache = TTSCache()
+
+        free_before = free_memory_bytes()
         self.audio = AudioProcessor(
             engine=self.tts_engine,
-            orpheus_model=self.orpheus_model
+            orpheus_model=self.orpheus_model,
+            stream_chunk_size=QUICK_ANSWER_STREAM_CHUNK_SIZE if DEDICATED_TTS_ENGINES else None,
+            cache=self.tts_cache,
         )
-        self.audio.on_first_audio_chunk_synthesize = self.on_first_audio_chunk_synthesize
-        self.text_similarity = TextSimilarity(focus='end', n_words=5)
-        self.text_context = TextContext()
-        self.generation_counter: int = 0
-        self.abort_lock = threading.Lock()
+        free_after = free_memory_bytes()
+        self.engine_memory = free_before - free_after if free_before is not None and free_after is not None and free_before > free_after else None
+
+        # The final answer gets its own engine if configured and memory allows, else shares the quick one
+        final_audio = None
+        if DEDICATED_TTS_ENGINES:
+            final_audio = self._load_extra_audio_processor(FINAL_ANSWER_STREAM_CHUNK_SIZE)
+            if final_audio is None:
+                logger.warning("🗣️👄⚠️ Not enough free memory for a dedicated final-answer TTS engine. Falling back to a single engine.")
+                self.audio.fixed_stream_chunk_size = None # Switch the chunk size per call again
+        self.final_audio = final_audio or self.audio
+
+        # Extra engines (each loads its own weights) let neighbouring final-answer sentences synthesize in parallel
+        self.tts_pool = [self.final_audio]
+        for _ in range(TTS_ENGINE_POOL_SIZE - 1):
+            extra = self._load_extra_audio_processor(self.final_audio.fixed_stream_chunk_size)
+            if extra is None:
+                logger.warning(f"🗣️👄⚠️ Not enough free memory for more TTS engines. Using a pool of {len(self.tts_pool)}.")
+                break
+            self.tts_pool.append(extra)
         self.llm = LLM(
             backend=self.llm_provider, # Or your backend
             model=self.llm_model,
             system_prompt=self.system_prompt,
+            base_url=llm_base_url,
             no_think=no_think,
         )
         self.llm.prewarm()
-        self.llm_inference_time = self.llm.measure_inference_time()
+        self.count_tokens = load_token_counter() # Shared by all sessions' ConversationHistory
+        self.fillers = FillerBank(self.audio) # Played while a slow answer is on its way
+        self.answer_cache = SemanticAnswerCache(self.system_prompt) if USE_ANSWER_CACHE else None
+        self.llm_inference_time = self.llm.measure_inference_time() or 0.0
         logger.debug(f"🗣️🧠🕒 LLM inference time: {self.llm_inference_time:.2f}ms")
 
+        self.full_output_pipeline_latency = self.llm_inference_time + self.audio.tts_inference_time
+        logger.info(f"🗣️⏱️ Full output pipeline latency: {self.full_output_pipeline_latency:.2f}ms (LLM: {self.llm_inference_time:.2f}ms, TTS: {self.audio.tts_inference_time:.2f}ms)")
+        # Refined by real turns from all sessions; pushes updates to turn detection and the silence monitors
+        self.latency = PipelineLatencyCalibrator(self.full_output_pipeline_latency)
+
+    def _load_extra_audio_processor(self, stream_chunk_size: Optional[int]) -> Optional[AudioProcessor]:
+        """
+        Loads another TTS engine instance if the device has room for it.
+
+        Args:
+            stream_chunk_size: Fixed stream chunk size of the new instance, or None to switch per call.
+
+        Returns:
+            The new `AudioProcessor`, or None if the free memory is below `TTS_MEMORY_HEADROOM`
+            times what the first engine used. Loads without a check if memory can't be measured.
+        """
+        free = free_memory_bytes()
+        if self.engine_memory is not None and free is not None and free < self.engine_memory * TTS_MEMORY_HEADROOM:
+            logger.info(f"🗣️👄 Free memory {free / 2**30:.1f} GiB, an engine needs ~{self.engine_memory / 2**30:.1f} GiB.")
+            return None
+        return AudioProcessor(engine=self.tts_engine, orpheus_model=self.orpheus_model, stream_chunk_size=stream_chunk_size, cache=self.tts_cache)
+
+
+class SpeechPipelineManager:
+    """
+    Orchestrates the text-to-speech pipeline, managing LLM and TTS workers.
+
+    This class handles incoming text requests, manages the lifecycle of a generation
+    (including LLM inference, TTS synthesis for both quick and final parts),
+    facilitates aborting ongoing generations, manages conversation history,
+    and coordinates worker threads using queues and events.
+    """
+    def __init__(
+            self,
+            tts_engine: str = "kokoro",
+            llm_provider: str = "ollama",
+            # llm_model: str = "hf.co/bartowski/huihui-ai_Mistral-Small-24B-Instruct-2501-abliterated-GGUF:Q4_K_M",
+            llm_model: str = "gemma2:2b",
+            no_think: bool = False,
+            orpheus_model: str = "orpheus-3b-0.1-ft-Q8_0-GGUF/orpheus-3b-0.1-ft-q8_0.gguf",
+            resources: Optional[SharedPipelineResources] = None,
+        ):
+        """
+        Initializes the SpeechPipelineManager.
+
+        Sets up configuration, takes the shared dependencies (AudioProcessor, LLM)
+        from `resources` (loading them if none are given), initializes per-session
+        state variables (queues, events, flags, history) and starts the background
+        worker threads.
+
+        Args:
+            tts_engine: The TTS engine to use (e.g., "kokoro", "orpheus").
+            llm_provider: The LLM backend provider (e.g., "ollama").
+            llm_model: The specific LLM model identifier.
+            no_think: If True, asks the LLM to skip its thinking phase (think blocks are always stripped from its output).
+            orpheus_model: Path or identifier for the Orpheus TTS model, if used.
+            resources: Already loaded models shared between sessions. If None, a
+                       private `SharedPipelineResources` is created from the other arguments.
+        """
+        if resources is None:
+            resources = SharedPipelineResources(
+                tts_engine=tts_engine,
+                llm_provider=llm_provider,
+                llm_model=llm_model,
+                no_think=no_think,
+                orpheus_model=orpheus_model,
+            )
+        self.resources = resources
+        self.tts_engine = resources.tts_engine
+        self.llm_provider = resources.llm_provider
+        self.llm_model = resources.llm_model
+        self.no_think = resources.no_think
+        self.orpheus_model = resources.orpheus_model
+        self.system_prompt = resources.system_prompt
+        self.pipeline_id = uuid.uuid4().hex[:8] # Distinguishes this session's LLM requests
+
+        # --- Instance Dependencies ---
+        self.audio = resources.audio
+        self.llm = resources.llm
+        self.llm_inference_time = resources.llm_inference_time
+        self.text_similarity = TextSimilarity(focus='end', n_words=5)
+        self.generation_counter: int = 0
+        self.abort_lock = threading.Lock()
+
         # --- State ---
-        self.history = []
+        self.history = ConversationHistory(
+            self.llm,
+            system_prompt=self.system_prompt,
+            count_tokens=resources.count_tokens,
+            request_prefix=f"summary-{self.pipeline_id}",
+        )
+        self.speculation = SpeculativeLLMPool(self.llm, request_prefix=f"{self.llm.backend}-{self.pipeline_id}")
+        self.sentence_tts = SentenceTTSScheduler(resources.tts_pool, name=f"SentenceTTS-{self.pipeline_id}")
+        self.final_tts_shares_engine = self.audio in resources.tts_pool # False with dedicated quick/final engines
         self.requests_queue = Queue()
         self.running_generation: Optional[RunningGeneration] = None
 
@@ -181,12 +408,9 @@ class SpeechPipelineManager:
         self.shutdown_event = threading.Event()
         self.generator_ready_event = threading.Event()
         self.llm_answer_ready_event = threading.Event()
-        self.stop_everything_event = threading.Event()
-        self.stop_llm_request_event = threading.Event()
+        # Stop requests go through the generation's cancel_token; workers confirm with these
         self.stop_llm_finished_event = threading.Event()
-        self.stop_tts_quick_request_event = threading.Event()
         self.stop_tts_quick_finished_event = threading.Event()
-        self.stop_tts_final_request_event = threading.Event()
         self.stop_tts_final_finished_event = threading.Event()
         self.abort_completed_event = threading.Event()
         self.abort_block_event = threading.Event()
@@ -210,10 +434,10 @@ class SpeechPipelineManager:
         self.tts_quick_inference_thread.start()
         self.tts_final_inference_thread.start()
 
-        self.on_partial_assistant_text: Optional[Callable[[str], None]] = None
+        self.on_partial_assistant_text: Optional[Callable[[str, int, int], None]] = None # (new text, generation id, offset in the answer)
+        self.on_generation_state_change: Optional[Callable[[], None]] = None # Wakes consumers of running_generation (e.g., TTS sender)
+        self.client_buffered_seconds: Optional[Callable[[], float]] = None # Audio sent but not yet played by the client
 
-        self.full_output_pipeline_latency = self.llm_inference_time + self.audio.tts_inference_time
-        logger.info(f"🗣️⏱️ Full output pipeline latency: {self.full_output_pipeline_latency:.2f}ms (LLM: {self.llm_inference_time:.2f}ms, TTS: {self.audio.tts_inference_time:.2f}ms)")
 
         logger.info("🗣️🚀 SpeechPipelineManager initialized and workers started.")
 
@@ -234,7 +458,8 @@ class SpeechPipelineManager:
         Continuously monitors the queue. When a request arrives, it drains the queue
         to process only the most recent one, preventing processing of stale requests.
         It waits for any ongoing abort operation to complete (`abort_block_event`)
-        before processing the next request. Handles 'prepare' actions by calling
+        before processing the next request. Handles 'prepare' and 'prepare_cached'
+        (final transcript with a cached answer) actions by calling
         `process_prepare_generation`. Runs until `shutdown_event` is set.
         """
         logger.info("🗣️🚀 Request Processor: Starting...")
@@ -262,6 +487,10 @@ class SpeechPipelineManager:
                 if request.action == "prepare":
                     self.process_prepare_generation(request.data)
                     self.previous_request = request
+                elif request.action == "prepare_cached":
+                    txt, cached_answer = request.data
+                    self.process_prepare_generation(txt, cached_answer=cached_answer)
+                    self.previous_request = request
                 elif request.action == "finish":
                      # Note: 'finish' action currently has no specific handling logic here.
                      logger.info(f"🗣️🤷 Request Processor: Received 'finish' action (currently no-op).")
@@ -275,6 +504,19 @@ class SpeechPipelineManager:
                 logger.exception(f"🗣️💥 Request Processor: Error: {e}")
         logger.info("🗣️🏁 Request Processor: Shutting down.")
 
+    def _notify_generation_state_change(self):
+        """
+        Invokes `on_generation_state_change` (if set) after `running_generation` or its flags changed.
+
+        Called from worker threads, so the callback must be thread-safe and non-blocking.
+        """
+        callback = self.on_generation_state_change
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"🗣️💥 Error in on_generation_state_change callback: {e}")
+
     def on_first_audio_chunk_synthesize(self):
         """
         Callback method invoked by AudioProcessor when the first TTS audio chunk is ready.
@@ -284,60 +526,104 @@ class SpeechPipelineManager:
         """
         logger.info("🗣️🎶 First audio chunk synthesized. Setting TTS quick allowed event.")
         if self.running_generation:
+            if self.running_generation.tts_first_chunk_time is None:
+                self.running_generation.tts_first_chunk_time = time.time()
+                request_time = self.running_generation.llm_request_time
+                if USE_LATENCY_CALIBRATION and request_time is not None:
+                    self.resources.latency.observe((self.running_generation.tts_first_chunk_time - request_time) * 1000)
             self.running_generation.quick_answer_first_chunk_ready = True
+            self._notify_generation_state_change()
 
-    def preprocess_chunk(self, chunk: str) -> str:
-        """
-        Preprocesses a text chunk before sending it to the TTS engine.
+    def buffered_ahead_seconds(self, gen: RunningGeneration) -> float:
+        """Returns the seconds of `gen`'s audio not yet played: queued on the server plus buffered on the client."""
+        client_seconds = 0.0
+        callback = self.client_buffered_seconds
+        if callback:
+            try:
+                client_seconds = callback()
+            except Exception as e:
+                logger.warning(f"🗣️💥 Error in client_buffered_seconds callback: {e}")
+        return gen.audio_chunks.queued_bytes / TTS_BYTES_PER_SECOND + client_seconds
 
-        Replaces specific characters (em-dashes, quotes, ellipsis) with simpler equivalents
-        to potentially improve TTS pronunciation or compatibility.
+    def _wait_for_playback_room(self, gen: RunningGeneration, stop_event: threading.Event) -> bool:
+        """
+        Blocks while more than `TTS_LOOKAHEAD_SECONDS` of `gen`'s audio is waiting to be played.
 
-        Args:
-            chunk: The input text chunk.
+        Lets synthesis pause instead of racing ahead of playback, so less audio (and
+        GPU time) is thrown away on barge-in and the engine is free for other sessions.
 
         Returns:
-            The preprocessed text chunk.
+            True when there is room, False if `stop_event` was set or the generation is aborting.
         """
-        return chunk.replace("—", "-").replace("“", '"').replace("”", '"').replace("‘", "'").replace("’", "'").replace("…", "...")
-
-    def clean_quick_answer(self, text: str) -> str:
+        if TTS_LOOKAHEAD_SECONDS <= 0 or self.buffered_ahead_seconds(gen) <= TTS_LOOKAHEAD_SECONDS:
+            return True
+        start = time.time()
+        logger.debug(f"🗣️👄⏸️ [Gen {gen.id}] {TTS_LOOKAHEAD_SECONDS:.1f}s of audio ahead of playback, pausing synthesis.")
+        try:
+            while self.buffered_ahead_seconds(gen) > TTS_LOOKAHEAD_SECONDS:
+                if stop_event.is_set() or self.shutdown_event.is_set():
+                    return False
+                time.sleep(0.05)
+            return True
+        finally:
+            metrics.TTS_BACKPRESSURE_SECONDS.inc(time.time() - start)
+
+    def _answer_tokens(self, gen: RunningGeneration, start_time: float) -> Iterator[str]:
         """
-        Removes specific leading patterns (like '<think>', newlines, spaces) from text.
+        Yields the tokens of `gen`'s LLM stream, recording them on `gen` as they pass.
 
-        Intended for cleaning the initial output of the LLM, especially when `no_think`
-        is enabled, to remove processing tags before TTS.
+        Consumed through `gen.text_segments`, by the LLM worker up to the quick answer
+        and by the final TTS worker after it. Tokens before the quick answer accumulate
+        in `quick_answer`; later ones in `final_answer`, and are reported through
+        `on_partial_assistant_text`. Stops when the generation's `cancel_token` is
+        cancelled, marking the LLM (before the quick answer) or the final audio
+        (after it) as aborted.
 
         Args:
-            text: The input text.
-
-        Returns:
-            The text with specified leading patterns removed.
+            gen: The generation whose `llm_generator` is streamed.
+            start_time: When the LLM worker started streaming, for the TTFT log.
         """
-        patterns_to_remove = ["<think>", "</think>", "\n", " "]
-        previous_text = None
-        current_text = text
-        
-        while previous_text != current_text:
-            previous_text = current_text
-            
-            # Remove all patterns from the beginning of the string
-            for pattern in patterns_to_remove:
-                while current_text.startswith(pattern):
-                    current_text = current_text[len(pattern):]
-        
-        return current_text
+        token_count = 0
+        for chunk in gen.llm_generator:
+            # Check for stop *before* processing the chunk
+            if gen.cancel_token.is_set():
+                if gen.quick_answer_provided:
+                    logger.info(f"🗣️👄❌ [Gen {gen.id}] Final TTS Gen: Stop request detected during LLM iteration.")
+                    gen.audio_final_aborted = True
+                else:
+                    logger.info(f"🗣️🧠❌ [Gen {gen.id}] LLM Worker: Stop request detected during iteration.")
+                    gen.llm_aborted = True
+                return
+
+            token_count += 1
+            if token_count == 1:
+                gen.state.transition(GenerationState.LLM_STREAMING)
+                gen.llm_first_token_time = time.time()
+                logger.info(f"🗣️🧠⏱️ [Gen {gen.id}] LLM Worker: TTFT: {(time.time() - start_time):.4f}s")
+
+            if not gen.quick_answer_provided:
+                gen.quick_answer += chunk # Already filtered by `filter_llm_stream`
+            else:
+                offset = len(gen.quick_answer) + len(gen.final_answer)
+                gen.final_answer += chunk
+                if self.on_partial_assistant_text:
+                    try:
+                        self.on_partial_assistant_text(chunk, gen.id, offset)
+                    except Exception as cb_e:
+                        logger.warning(f"🗣️💥 Callback error in on_partial_assistant_text (final chunk): {cb_e}")
+            yield chunk
 
     def _llm_inference_worker(self):
         """
         Worker thread target that handles LLM inference for a generation.
 
         Waits for `generator_ready_event`. Once signaled, it iterates through the
-        LLM generator provided in `running_generation`. It accumulates the generated
-        text, optionally cleans it (`no_think`), checks for a natural sentence boundary
-        to define the `quick_answer` using `TextContext`. If a quick answer is found,
-        it signals `llm_answer_ready_event`. Handles stop requests (`stop_llm_request_event`)
-        and signals completion/abortion via `stop_llm_finished_event` and internal flags.
+        LLM generator provided in `running_generation`. It cuts the generated
+        (already filtered) text into segments with `iter_segments` and takes the first
+        one, ending at a natural sentence boundary, as the `quick_answer`. The remaining
+        segments are left to the final TTS worker. Once the quick answer is known,
+        it signals `llm_answer_ready_event`. Stops when the generation's `cancel_token` is
+        cancelled and signals completion/abortion via `stop_llm_finished_event` and internal flags.
         Runs until `shutdown_event` is set.
         """
         logger.info("🗣️🧠 LLM Worker: Starting...")
@@ -347,18 +633,16 @@ class SpeechPipelineManager:
             if not ready:
                 continue
 
-            # Check if aborted *while waiting* before clearing the ready event
-            if self.stop_llm_request_event.is_set():
+            self.generator_ready_event.clear()
+            current_gen = self.running_generation
+
+            # Check if aborted *while waiting* (the abort sets the ready event to wake us)
+            if current_gen and current_gen.cancel_token.is_set():
                 logger.info("🗣️🧠❌ LLM Worker: Abort detected while waiting for generator_ready_event.")
-                self.stop_llm_request_event.clear()
                 self.stop_llm_finished_event.set()
                 self.llm_generation_active = False
                 continue # Go back to waiting
 
-            self.generator_ready_event.clear()
-            self.stop_everything_event.clear() # Assuming a new generation clears global stop
-            current_gen = self.running_generation
-
             if not current_gen or not current_gen.llm_generator:
                 logger.warning("🗣️🧠❓ LLM Worker: No valid generation or generator found after event.")
                 self.llm_generation_active = False
@@ -370,53 +654,25 @@ class SpeechPipelineManager:
             # Set state for active generation
             self.llm_generation_active = True
             self.stop_llm_finished_event.clear()
-            start_time = time.time()
-            token_count = 0
+            # Quick answer and final answer sentences are cut from one segment stream, shared with the final TTS worker
+            current_gen.text_segments = iter_segments(self._answer_tokens(current_gen, time.time()))
 
             try:
-                for chunk in current_gen.llm_generator:
-                    # Check for stop *before* processing the chunk
-                    if self.stop_llm_request_event.is_set():
-                        logger.info(f"🗣️🧠❌ [Gen {gen_id}] LLM Worker: Stop request detected during iteration.")
-                        self.stop_llm_request_event.clear()
-                        current_gen.llm_aborted = True
-                        break # Exit the generator loop
-
-                    chunk = self.preprocess_chunk(chunk)
-                    token_count += 1
-                    current_gen.quick_answer += chunk
-                    if self.no_think:
-                        current_gen.quick_answer = self.clean_quick_answer(current_gen.quick_answer)
-
-                    if token_count == 1:
-                        logger.info(f"🗣️🧠⏱️ [Gen {gen_id}] LLM Worker: TTFT: {(time.time() - start_time):.4f}s")
-
-                    # Check for quick answer boundary only if not already provided
-                    if not current_gen.quick_answer_provided:
-                        context, overhang = self.text_context.get_context(current_gen.quick_answer)
-                        if context:
-                            logger.info(f"🗣️🧠✔️ [Gen {gen_id}] LLM Worker:  {Colors.apply('QUICK ANSWER FOUND:').magenta} {context}, overhang: {overhang}")
-                            current_gen.quick_answer = context
-                            if self.on_partial_assistant_text:
-                                self.on_partial_assistant_text(current_gen.quick_answer)
-                            current_gen.quick_answer_overhang = overhang
-                            current_gen.quick_answer_provided = True
-                            self.llm_answer_ready_event.set() # Signal TTS quick worker
-                            break
-                            # Do NOT break here, continue iterating to finish the full LLM response
-
-
-                # Loop finished naturally or broke due to stop request
+                quick_answer = next(current_gen.text_segments, None) # Blocks until the quick answer boundary or the end of the stream
                 logger.info(f"🗣️🧠🏁 [Gen {gen_id}] LLM Worker: Generator loop finished%s" % (" (Aborted)" if current_gen.llm_aborted else ""))
 
-                # If loop finished naturally and no quick answer was ever found (e.g., short response)
-                # Set the whole thing as the quick answer.
-                if not current_gen.llm_aborted and not current_gen.quick_answer_provided:
-                    logger.info(f"🗣️🧠✔️ [Gen {gen_id}] LLM Worker: No context boundary found, using full response as quick answer.")
-                    # quick_answer already contains the full text
-                    current_gen.quick_answer_provided = True # Mark as provided
+                if not current_gen.llm_aborted:
+                    quick_answer = quick_answer or ""
+                    overhang = current_gen.quick_answer[len(quick_answer):] # `quick_answer` holds all text streamed so far
+                    logger.info(f"🗣️🧠✔️ [Gen {gen_id}] LLM Worker:  {Colors.apply('QUICK ANSWER FOUND:').magenta} {quick_answer}, overhang: {overhang}")
+                    current_gen.quick_answer = quick_answer
+                    current_gen.quick_answer_overhang = overhang
+                    current_gen.quick_answer_provided = True
+                    current_gen.quick_answer_time = time.time()
+                    current_gen.state.transition(GenerationState.QUICK_ANSWER)
+                    self._notify_generation_state_change()
                     if self.on_partial_assistant_text:
-                        self.on_partial_assistant_text(current_gen.quick_answer)
+                        self.on_partial_assistant_text(current_gen.quick_answer, gen_id, 0)
                     self.llm_answer_ready_event.set() # Signal TTS quick worker
 
             except Exception as e:
@@ -428,10 +684,9 @@ class SpeechPipelineManager:
                 self.stop_llm_finished_event.set() # Signal that this worker's processing attempt is done
 
                 if current_gen.llm_aborted:
-                    # If LLM was aborted, ensure TTS (both quick and final) is also stopped
+                    # If LLM was aborted (or failed), ensure TTS (both quick and final) is also stopped
                     logger.info(f"🗣️🧠❌ [Gen {gen_id}] LLM Aborted, requesting TTS quick/final stop.")
-                    self.stop_tts_quick_request_event.set()
-                    self.stop_tts_final_request_event.set()
+                    current_gen.cancel_token.cancel("LLM stream aborted")
                     # Wake up TTS quick worker if it's waiting
                     self.llm_answer_ready_event.set()
 
@@ -448,7 +703,11 @@ class SpeechPipelineManager:
         If a generation is running and not already aborting:
         1. If `txt` is very similar (>= 0.95 similarity) to the running generation's
            input text, it ignores the new request and returns False.
-        2. If `txt` is different, it initiates an abort of the current generation
+        2. If `txt` extends the running generation's text (the user kept talking), the
+           generation is retired without waiting (see `_retire_generation`): its stream was
+           already replaced by the extended one in the speculation pool, so the new
+           generation can be installed at once while the old workers wind down.
+        3. If `txt` is different otherwise, it initiates an abort of the current generation
            by calling the public `abort_generation` method.
 
         If `wait_for_finish` is True, this method waits for the abortion process
@@ -512,6 +771,12 @@ class SpeechPipelineManager:
                         logger.info(f"🗣️🛑🙅 {current_gen_id_str} Text ('{txt[:30]}...') too similar ({similarity:.2f}) to current '{self.running_generation.text[:30] if self.running_generation.text else 'None'}...'. Ignoring.")
                         return False # No abort needed
 
+                    if is_prefix_extension(self.running_generation.text or "", txt):
+                        # The user kept talking: the new stream is already running (see process_prepare_generation)
+                        logger.info(f"🗣️🛑➕ {current_gen_id_str} New text extends '{self.running_generation.text[:30]}...'. Replacing generation.")
+                        self._retire_generation(self.running_generation, reason=f"check_abort prefix extension ({abort_reason})")
+                        return True
+
                     # Texts are different enough, initiate abort
                     logger.info(f"🗣️🛑🚀 {current_gen_id_str} Text ('{txt[:30]}...') different enough ({similarity:.2f}) from '{self.running_generation.text[:30] if self.running_generation.text else 'None'}...'. Requesting synchronous abort.")
                     start_time = time.time()
@@ -540,8 +805,8 @@ class SpeechPipelineManager:
         is valid and has a `quick_answer`. It then waits for the `tts_quick_allowed_event`
         (intended for potential rate limiting or timing control, currently seems unused).
         If allowed, it calls `audio.synthesize` with the `quick_answer`, feeding audio
-        chunks into the `audio_chunks` queue. Handles stop requests
-        (`stop_tts_quick_request_event`) and signals completion/abortion via
+        chunks into the `audio_chunks` queue. Stops when the generation's `cancel_token`
+        is cancelled and signals completion/abortion via
         `stop_tts_quick_finished_event` and internal flags. Runs until `shutdown_event` is set.
         """
         logger.info("🗣️👄🚀 Quick TTS Worker: Starting...")
@@ -550,27 +815,22 @@ class SpeechPipelineManager:
             if not ready:
                 continue
 
-            # Check if aborted *while waiting* before clearing the ready event
-            if self.stop_tts_quick_request_event.is_set():
-                logger.info("🗣️👄❌ Quick TTS Worker: Abort detected while waiting for llm_answer_ready_event.")
-                self.stop_tts_quick_request_event.clear()
+            self.llm_answer_ready_event.clear() # Clear the event now that we're processing
+            current_gen = self.running_generation
+
+            # Check if aborted *while waiting* (the abort sets the ready event to wake us)
+            if current_gen and (current_gen.audio_quick_aborted or current_gen.cancel_token.is_set()):
+                logger.info(f"🗣️👄❌ [Gen {current_gen.id}] Quick TTS Worker: Generation already marked as aborted. Skipping.")
                 self.stop_tts_quick_finished_event.set()
                 self.tts_quick_generation_active = False
                 continue # Go back to waiting
 
-            self.llm_answer_ready_event.clear() # Clear the event now that we're processing
-            current_gen = self.running_generation
-
-            if not current_gen or not current_gen.quick_answer:
+            # A wake-up meant for a superseded generation may find the next one still streaming its quick answer
+            if not current_gen or not current_gen.quick_answer_provided or not current_gen.quick_answer:
                 logger.warning("🗣️👄❓ Quick TTS Worker: No valid generation or quick answer found after event.")
                 self.tts_quick_generation_active = False
                 continue # Go back to waiting
 
-            # Double-check if this generation was aborted *just* before we got here
-            if current_gen.audio_quick_aborted or current_gen.abortion_started:
-                logger.info(f"🗣️👄❌ [Gen {current_gen.id}] Quick TTS Worker: Generation already marked as aborted. Skipping.")
-                continue
-
             gen_id = current_gen.id
             logger.info(f"🗣️👄🔄 [Gen {gen_id}] Quick TTS Worker: Processing TTS for quick answer...")
 
@@ -579,6 +839,7 @@ class SpeechPipelineManager:
             self.stop_tts_quick_finished_event.clear()
             current_gen.tts_quick_finished_event.clear() # Reset TTS finish marker for this attempt
             current_gen.tts_quick_started = True
+            current_gen.state.transition(GenerationState.QUICK_TTS)
 
             # --- tts_quick_allowed_event Wait Logic ---
             # This event seems intended for external control/timing, but isn't set anywhere
@@ -602,19 +863,25 @@ class SpeechPipelineManager:
 
             try:
                 # Check again for aborts right before synthesis call
-                if self.stop_tts_quick_request_event.is_set() or current_gen.abortion_started:
-                     logger.info(f"🗣️👄❌ [Gen {gen_id}] Quick TTS Worker: Aborting TTS synthesis due to stop request or abortion flag.")
+                if current_gen.cancel_token.is_set():
+                     logger.info(f"🗣️👄❌ [Gen {gen_id}] Quick TTS Worker: Aborting TTS synthesis due to stop request.")
+                     current_gen.audio_quick_aborted = True
+                elif not self._wait_for_playback_room(current_gen, current_gen.cancel_token):
+                     # The quick answer is at most one context long, so it is gated as a whole like a final answer sentence
+                     logger.info(f"🗣️👄❌ [Gen {gen_id}] Quick TTS Worker: Stopped while waiting for playback room.")
                      current_gen.audio_quick_aborted = True
                 else:
                     logger.info(f"🗣️👄🎶 [Gen {gen_id}] Quick TTS Worker: Synthesizing: '{current_gen.quick_answer[:50]}...'")
                     completed = self.audio.synthesize(
                         current_gen.quick_answer,
                         current_gen.audio_chunks,
-                        self.stop_tts_quick_request_event # Pass the event for the synthesizer to check
+                        current_gen.cancel_token, # Checked by the synthesizer
+                        generation_string=f"[Gen {gen_id}]",
+                        on_first_chunk=self.on_first_audio_chunk_synthesize,
                     )
 
                     if not completed:
-                        # Synthesis was stopped by the stop_tts_quick_request_event
+                        # Synthesis was stopped by the cancel_token
                         logger.info(f"🗣️👄❌ [Gen {gen_id}] Quick TTS Worker: Synthesis stopped via event.")
                         current_gen.audio_quick_aborted = True
                     else:
@@ -631,31 +898,36 @@ class SpeechPipelineManager:
                 logger.info(f"🗣️👄🏁 [Gen {gen_id}] Quick TTS Worker: Finished processing cycle.")
 
                 # Check if synthesis completed naturally or was stopped/aborted
-                if current_gen.audio_quick_aborted or self.stop_tts_quick_request_event.is_set():
+                if current_gen.audio_quick_aborted or current_gen.cancel_token.is_set():
                     logger.info(f"🗣️👄❌ [Gen {gen_id}] Quick TTS Marked as Aborted/Incomplete.")
-                    self.stop_tts_quick_request_event.clear() # Clear the request if it was set
                     current_gen.audio_quick_aborted = True # Ensure flag is set
+                    current_gen.cancel_token.cancel("quick answer audio incomplete") # Final audio must not play without the quick part
                 else:
                     logger.info(f"🗣️👄✅ [Gen {gen_id}] Quick TTS Finished Successfully.")
                     current_gen.tts_quick_finished_event.set() # Signal natural completion
 
                 current_gen.audio_quick_finished = True # Mark quick audio phase as done (even if aborted)
+                current_gen.audio_quick_finished_event.set()
+                self._notify_generation_state_change()
 
     def _tts_final_inference_worker(self):
         """
         Worker thread target that handles TTS synthesis for the 'final' part of the answer.
 
-        Continuously checks the `running_generation`. It waits until the 'quick' TTS
-        phase (`tts_quick_started` and `audio_quick_finished`) is complete and was not
-        aborted (`audio_quick_aborted`). It also requires that a `quick_answer` was
-        actually identified (`quick_answer_provided`).
-
-        If conditions are met, it sets flags (`tts_final_started`), defines an inner
-        generator (`get_generator`) that yields the `quick_answer_overhang` followed
-        by the remaining chunks from the `llm_generator`. It then calls
-        `audio.synthesize_generator` with this generator, feeding audio chunks into the
-        *same* `audio_chunks` queue used by the quick worker. Handles stop requests
-        (`stop_tts_final_request_event`) and signals completion/abortion via
+        Continuously checks the `running_generation`. It starts as soon as the 'quick'
+        TTS phase started (with dedicated final engines) or produced its first chunk
+        (when sharing the quick engine), unless that phase already finished aborted
+        (`audio_quick_aborted`). It also requires that a
+        `quick_answer` was actually identified (`quick_answer_provided`). Its audio is
+        synthesized concurrently but only released into `audio_chunks` once the quick
+        audio is complete (`audio_quick_finished_event`).
+
+        If conditions are met, it sets flags (`tts_final_started`), reports the
+        `quick_answer_overhang` as answer text and hands the remaining sentences of
+        `text_segments` (the overhang and the rest of the `llm_generator`) to the
+        `sentence_tts` scheduler, which synthesizes them with a look-ahead and feeds the audio chunks in order into the *same* `audio_chunks`
+        queue used by the quick worker. Stops when the generation's `cancel_token` is
+        cancelled and signals completion/abortion via
         `stop_tts_final_finished_event` and internal flags. Runs until `shutdown_event` is set.
         """
         logger.info("🗣️👄🚀 Final TTS Worker: Starting...")
@@ -667,7 +939,8 @@ class SpeechPipelineManager:
             if not current_gen: continue # No active generation
             if current_gen.tts_final_started: continue # Final TTS already running for this gen
             if not current_gen.tts_quick_started: continue # Quick TTS hasn't even started
-            if not current_gen.audio_quick_finished: continue # Quick TTS hasn't finished (successfully or aborted)
+            # On a shared engine, quick audio must be underway first, so the final sentences don't take the engine ahead of it
+            if self.final_tts_shares_engine and not (current_gen.quick_answer_first_chunk_ready or current_gen.audio_quick_finished): continue
 
             gen_id = current_gen.id # Get ID once prerequisites seem met
 
@@ -678,65 +951,42 @@ class SpeechPipelineManager:
             if not current_gen.quick_answer_provided:
                  logger.debug(f"🗣️👄🙅 [Gen {gen_id}] Final TTS Worker: Quick answer boundary was not found, skipping final TTS (quick TTS handled everything).")
                  continue
-            if current_gen.abortion_started:
+            if current_gen.cancel_token.is_set():
                  logger.debug(f"🗣️👄🙅 [Gen {gen_id}] Final TTS Worker: Generation is aborting, skipping final TTS.")
                  continue
 
             # --- Conditions met, start final TTS ---
             logger.info(f"🗣️👄🔄 [Gen {gen_id}] Final TTS Worker: Processing final TTS...")
 
-            def get_generator():
-                """Yields remaining text chunks for final TTS synthesis."""
-                # Yield overhang first
-                if current_gen.quick_answer_overhang:
-                    preprocessed_overhang = self.preprocess_chunk(current_gen.quick_answer_overhang)
-                    logger.debug(f"🗣️👄< [Gen {gen_id}] Final TTS Gen: Yielding overhang: '{preprocessed_overhang[:50]}...'")
-                    current_gen.final_answer += preprocessed_overhang # Add preprocessed version
-                    if self.on_partial_assistant_text:
-                         logger.debug(f"🗣️👄< [Gen {gen_id}] Final TTS Worker on_partial_assistant_text: Sending overhang.")
-                         try:
-                            self.on_partial_assistant_text(current_gen.quick_answer + current_gen.final_answer)
-                         except Exception as cb_e:
-                             logger.warning(f"🗣️💥 Callback error in on_partial_assistant_text (overhang): {cb_e}")
-                    yield preprocessed_overhang
-
-                # Yield remaining chunks from LLM generator
-                logger.debug(f"🗣️👄< [Gen {gen_id}] Final TTS Gen: Yielding remaining LLM chunks...")
-                try:
-                    for chunk in current_gen.llm_generator:
-                         # Check for stop *before* processing chunk
-                         if self.stop_tts_final_request_event.is_set():
-                             logger.info(f"🗣️👄❌ [Gen {gen_id}] Final TTS Gen: Stop request detected during LLM iteration.")
-                             current_gen.audio_final_aborted = True
-                             break # Stop yielding
-
-                         preprocessed_chunk = self.preprocess_chunk(chunk)
-                         current_gen.final_answer += preprocessed_chunk
-                         if self.on_partial_assistant_text:
-                             # logger.debug(f"🗣️👄< [Gen {gen_id}] Final TTS Worker on_partial_assistant_text: Sending final chunk: {preprocessed_chunk[:30]}")
-                            try:
-                                 self.on_partial_assistant_text(current_gen.quick_answer + current_gen.final_answer)
-                            except Exception as cb_e:
-                                 logger.warning(f"🗣️💥 Callback error in on_partial_assistant_text (final chunk): {cb_e}")
-
-                         yield preprocessed_chunk
-                    logger.debug(f"🗣️👄< [Gen {gen_id}] Final TTS Gen: Finished iterating LLM chunks.")
-                except Exception as gen_e:
-                     logger.exception(f"🗣️👄💥 [Gen {gen_id}] Final TTS Gen: Error iterating LLM generator: {gen_e}")
-                     current_gen.audio_final_aborted = True # Mark as aborted on error
+            # The overhang is already part of `text_segments`; it only still has to be reported as answer text
+            if current_gen.quick_answer_overhang:
+                overhang = current_gen.quick_answer_overhang
+                logger.debug(f"🗣️👄< [Gen {gen_id}] Final TTS Worker: Reporting overhang: '{overhang[:50]}...'")
+                offset = len(current_gen.quick_answer) + len(current_gen.final_answer)
+                current_gen.final_answer += overhang
+                if self.on_partial_assistant_text:
+                    try:
+                        self.on_partial_assistant_text(overhang, gen_id, offset)
+                    except Exception as cb_e:
+                        logger.warning(f"🗣️💥 Callback error in on_partial_assistant_text (overhang): {cb_e}")
 
             # Set state for active generation
             self.tts_final_generation_active = True
             self.stop_tts_final_finished_event.clear()
             current_gen.tts_final_started = True
+            current_gen.state.transition(GenerationState.FINAL_TTS)
             current_gen.tts_final_finished_event.clear() # Reset TTS finish marker
 
             try:
                 logger.info(f"🗣️👄🎶 [Gen {gen_id}] Final TTS Worker: Synthesizing remaining text...")
-                completed = self.audio.synthesize_generator(
-                    get_generator(),
+                completed = self.sentence_tts.run(
+                    current_gen.text_segments, # Remaining sentences; pulls the rest of the LLM stream
                     current_gen.audio_chunks,
-                    self.stop_tts_final_request_event # Pass the event for the synthesizer to check
+                    current_gen.cancel_token, # Checked by the synthesizer
+                    generation_string=f"[Gen {gen_id}]",
+                    on_first_chunk=self.on_first_audio_chunk_synthesize,
+                    release=current_gen.audio_quick_finished_event, # Buffered until the quick answer's audio is queued
+                    wait_for_room=lambda: self._wait_for_playback_room(current_gen, current_gen.cancel_token),
                 )
 
                 if not completed:
@@ -758,25 +1008,28 @@ class SpeechPipelineManager:
 
 
                 # Check if synthesis completed naturally or was stopped
-                if current_gen.audio_final_aborted or self.stop_tts_final_request_event.is_set():
+                if current_gen.audio_final_aborted or current_gen.cancel_token.is_set():
                     logger.info(f"🗣️👄❌ [Gen {gen_id}] Final TTS Marked as Aborted/Incomplete.")
-                    self.stop_tts_final_request_event.clear() # Clear the request if it was set
                     current_gen.audio_final_aborted = True # Ensure flag is set
                 else:
                     logger.info(f"🗣️👄✅ [Gen {gen_id}] Final TTS Finished Successfully.")
                     current_gen.tts_final_finished_event.set() # Signal natural completion
+                    if current_gen.state.transition(GenerationState.SYNTHESIZED):
+                        logger.info(f"🗣️🔀 [Gen {gen_id}] {current_gen.state.timeline()}")
 
                 current_gen.audio_final_finished = True # Mark final audio phase as done (even if aborted)
+                self._notify_generation_state_change()
 
 
     # --- Processing Methods ---
 
-    def process_prepare_generation(self, txt: str):
+    def process_prepare_generation(self, txt: str, cached_answer: Optional[str] = None):
         """
         Handles the 'prepare' action: initiates a new text-to-speech generation.
 
         1. Calls `check_abort` to potentially stop and clean up any existing generation
            if the new input `txt` is significantly different. Waits for the abort to finish.
+           With a `cached_answer`, any existing generation is aborted regardless of its text.
         2. Increments the `generation_counter`.
         3. Resets state flags and events relevant to starting a new generation.
         4. Creates a new `RunningGeneration` instance with the new ID and input text.
@@ -787,10 +1040,25 @@ class SpeechPipelineManager:
 
         Args:
             txt: The user input text for the new generation.
+            cached_answer: Answer from the semantic answer cache to stream instead of
+                           calling the LLM (see `promote_speculation`).
         """
+        # --- Start the extended prompt right away if the user only kept talking ---
+        running = self.running_generation
+        if cached_answer is None and running and not running.abortion_started and running.text and is_prefix_extension(running.text, txt):
+            logger.info(f"🗣️➕ Transcript extended ('{running.text[:30]}...' -> '{txt[:40]}...'), starting LLM before the abort.")
+            metrics.LLM_PREFIX_EXTENSIONS.inc()
+            # Prompt evaluation overlaps the abort; the backend reuses the KV cache of the shared prompt prefix
+            self.speculation.acquire(txt, self.history.messages())
+            self.speculation.discard(running.llm_request_id, "superseded")
+
         # --- Abort existing generation if necessary ---
         id_in_spec = self.generation_counter + 1 # Prospective ID for logging
-        aborted = self.check_abort(txt, wait_for_finish=True, abort_reason=f"process_prepare_generation for new id {id_in_spec}")
+        if cached_answer is not None:
+            # The running generation answers the same transcript, so check_abort would keep it
+            self.abort_generation(wait_for_completion=True, reason=f"answer cache hit for new id {id_in_spec}")
+        else:
+            self.check_abort(txt, wait_for_finish=True, abort_reason=f"process_prepare_generation for new id {id_in_spec}")
 
         # --- State is now guaranteed to be clean (running_generation is None) ---
         self.generation_counter += 1
@@ -803,54 +1071,118 @@ class SpeechPipelineManager:
         self.tts_final_generation_active = False
         self.llm_answer_ready_event.clear()
         self.generator_ready_event.clear()
-        self.stop_llm_request_event.clear()
         self.stop_llm_finished_event.clear()
-        self.stop_tts_quick_request_event.clear()
         self.stop_tts_quick_finished_event.clear()
-        self.stop_tts_final_request_event.clear()
         self.stop_tts_final_finished_event.clear()
         self.abort_completed_event.clear()
         self.abort_block_event.set() # Ensure block is released if check_abort didn't run/clear it
 
         # --- Create new generation object ---
-        self.running_generation = RunningGeneration(id=new_gen_id)
+        self.running_generation = RunningGeneration(id=new_gen_id, on_audio_chunk=self._notify_generation_state_change)
         self.running_generation.text = txt
 
         try:
             logger.info(f"🗣️🧠🚀 [Gen {new_gen_id}] Calling LLM generate...")
-            # TODO: Update history management if needed
-            # self.history.append({"role": "user", "content": txt}) # Example history update
-            self.running_generation.llm_generator = self.llm.generate(
-                text=txt,
-                history=self.history, # Pass current history
-                use_system_prompt=True,
-            )
+            generation = self.running_generation
+            if cached_answer:
+                generation.from_answer_cache = True
+                generation.llm_generator = filter_llm_stream(stream_cached_answer(cached_answer))
+            else:
+                # Reuses a still running stream for the same transcript instead of starting over
+                candidate = self.speculation.acquire(txt, self.history.messages()) # Summary + recent turns, within the token budget
+                generation.llm_request_id = candidate.request_id
+                if candidate.created >= generation.timestamp:
+                    generation.llm_request_time = candidate.created # Fresh stream, a fair latency sample
+                # Strips think blocks and normalizes punctuation once per token for both text and TTS
+                generation.llm_generator = filter_llm_stream(candidate.stream(should_stop=generation.cancel_token.is_set))
             logger.info(f"🗣️🧠✔️ [Gen {new_gen_id}] LLM generator created. Setting generator ready event.")
             self.generator_ready_event.set() # Signal LLM worker
+            self._notify_generation_state_change()
         except Exception as e:
             logger.exception(f"🗣️🧠💥 [Gen {new_gen_id}] Failed to create LLM generator: {e}")
             self.running_generation = None # Clean up if generator creation failed
 
 
-    def process_abort_generation(self):
+    def _retire_generation(self, gen: RunningGeneration, reason: str, worker_timeout: float = 5.0) -> None:
+        """
+        Cancels `gen` and detaches it from the pipeline without waiting for its workers.
+
+        Used when a generation is superseded by one that can start right away. The
+        cancelled token stops every stage of `gen`; each worker moves on to the
+        `running_generation` once it is done with `gen`, so the next generation is
+        served as soon as a worker is free. A background thread records the stop
+        (state, abort metrics) once no worker holds `gen` anymore.
+
+        Args:
+            gen: The generation to retire; must be the `running_generation`.
+            reason: Why the generation is retired, recorded on the cancellation token.
+            worker_timeout: How long the background thread waits for the workers.
+        """
+        with self.abort_lock:
+            if gen.abortion_started:
+                return
+            gen.abortion_started = True
+            gen.cancel_token.cancel(reason)
+            gen.state.transition(GenerationState.CANCELLING)
+            self.speculation.release(gen.llm_request_id)
+            if self.running_generation is gen:
+                self.running_generation = None
+        self._notify_generation_state_change()
+        threading.Thread(
+            target=self._finish_retired_generation,
+            args=(gen, time.time(), worker_timeout),
+            name="RetireGenerationThread",
+            daemon=True,
+        ).start()
+
+    def _finish_retired_generation(self, gen: RunningGeneration, start_time: float, worker_timeout: float) -> None:
+        """Waits until no worker holds the retired `gen`, then closes its stream and records the stop."""
+        def released() -> bool:
+            return ((gen.text_segments is None or gen.llm_finished)
+                    and (not gen.tts_quick_started or gen.audio_quick_finished)
+                    and (not gen.tts_final_started or gen.audio_final_finished))
+
+        deadline = start_time + worker_timeout
+        while not released() and time.time() < deadline:
+            time.sleep(0.005)
+        if not released():
+            logger.warning(f"🗣️🛑⏱️ [Gen {gen.id}] Timeout waiting for the workers of the retired generation.")
+            return
+        if gen.llm_generator and hasattr(gen.llm_generator, 'close'):
+            try:
+                gen.llm_generator.close()
+            except Exception as e:
+                logger.warning(f"🗣️🛑🧠💥 [Gen {gen.id}] Error closing LLM generator: {e}")
+        metrics.ABORTS.inc()
+        metrics.ABORT_DURATION.observe(time.time() - start_time)
+        gen.state.transition(GenerationState.CANCELLED)
+        logger.info(f"🗣️🔀 [Gen {gen.id}] {gen.state.timeline()}")
+
+    def process_abort_generation(self, worker_timeout: float = 5.0, reason: str = ""):
         """
         Handles the core logic of aborting the current generation.
 
         Synchronized using `abort_lock`. If a `running_generation` exists:
-        1. Sets the `abortion_started` flag on the generation.
+        1. Sets `abortion_started`, cancels the generation's `cancel_token` (stopping all
+           stages at once) and moves its state to CANCELLING.
         2. Blocks new requests by clearing `abort_block_event`.
-        3. Sets stop request events (`stop_llm_request_event`, `stop_tts_quick_request_event`,
-           `stop_tts_final_request_event`) for active worker threads.
+        3. Determines which workers are active (running or waiting to start).
         4. Wakes up workers that might be waiting on start events (`generator_ready_event`,
-           `llm_answer_ready_event`) so they can see the stop request.
-        5. Waits (with timeouts) for each worker to acknowledge the stop by setting their
-           respective `stop_..._finished_event`.
-        6. Calls external cancellation methods if available (e.g., `llm.cancel_generation`).
+           `llm_answer_ready_event`) so they can see the cancellation.
+        5. Waits for all workers to acknowledge the stop (their `stop_..._finished_event`)
+           in parallel, under a single `worker_timeout` deadline, recording each stage's
+           stop latency.
+        6. Releases the LLM stream to the speculation pool (cancelled if it was promoted).
         7. Attempts to close the LLM generator stream.
         8. Clears the `running_generation` reference.
         9. Clears stale start events (`generator_ready_event`, `llm_answer_ready_event`).
-        10. Signals completion by setting `abort_completed_event`.
-        11. Releases the block on new requests by setting `abort_block_event`.
+        10. Records the abort duration against `ABORT_SLO_MS` and moves the state to CANCELLED.
+        11. Signals completion by setting `abort_completed_event`.
+        12. Releases the block on new requests by setting `abort_block_event`.
+
+        Args:
+            worker_timeout: Maximum time in seconds to wait for all workers' stop confirmations.
+            reason: Why the generation is aborted, recorded on the cancellation token.
         """
         # This method assumes it's called within the public abort_generation or internally
         with self.abort_lock:
@@ -869,77 +1201,61 @@ class SpeechPipelineManager:
 
             # --- Start Abort Process ---
             logger.info(f"🗣️🛑🚀 {current_gen_id_str} Abortion process starting...")
+            abort_start_time = time.time()
             current_gen_obj.abortion_started = True # Mark immediately
+            current_gen_obj.cancel_token.cancel(reason) # Every stage checks the token
+            current_gen_obj.state.transition(GenerationState.CANCELLING)
+            self._notify_generation_state_change()
             self.abort_block_event.clear() # Block new requests *before* waiting
             self.abort_completed_event.clear() # Clear completion flag at start
-            self.stop_everything_event.set() # General signal (might be unused by workers)
             aborted_something = False
 
 
-            # --- Abort LLM ---
-            # Check if LLM is potentially active (running OR waiting to start)
-            # Need to check generator_ready_event too, as it might be waiting there.
-            is_llm_potentially_active = self.llm_generation_active or self.generator_ready_event.is_set()
-            if is_llm_potentially_active:
-                logger.info(f"🗣️🛑🧠❌ {current_gen_id_str} - Stopping LLM...")
-                self.stop_llm_request_event.set()
-                self.generator_ready_event.set() # Wake up LLM worker if it's waiting
-                stopped = self.stop_llm_finished_event.wait(timeout=5.0) # Wait for LLM worker
-                if stopped:
-                    logger.info(f"🗣️🛑🧠👍 {current_gen_id_str} LLM stopped confirmation received.")
-                    self.stop_llm_finished_event.clear() # Reset for next time
-                else:
-                    logger.warning(f"🗣️🛑🧠⏱️ {current_gen_id_str} Timeout waiting for LLM stop confirmation.")
-                # Attempt external cancellation if available
-                if hasattr(self.llm, 'cancel_generation'):
-                    logger.info(f"🗣️🛑🧠🔌 {current_gen_id_str} Calling external LLM cancel_generation.")
-                    try:
-                        self.llm.cancel_generation()
-                    except Exception as cancel_e:
-                         logger.warning(f"🗣️🛑🧠💥 {current_gen_id_str} Error during external LLM cancel: {cancel_e}")
-                self.llm_generation_active = False # Ensure flag is off
-                aborted_something = True
+            # --- Collect the active stages; the cancelled token already stopped them all ---
+            # Each entry: (name, stop finished event, wake-up event or None)
+            # A stage counts as active while running OR waiting on its start event.
+            stages = []
+            if self.llm_generation_active or self.generator_ready_event.is_set():
+                stages.append(("llm", self.stop_llm_finished_event, self.generator_ready_event))
             else:
                 logger.info(f"🗣️🛑🧠📴 {current_gen_id_str} LLM appears inactive, no stop needed.")
-            self.stop_llm_request_event.clear() # Ensure stop request is clear
-
-            # --- Abort Quick TTS ---
-            # Check if TTS Quick is potentially active (running OR waiting to start)
-            is_tts_quick_potentially_active = self.tts_quick_generation_active or self.llm_answer_ready_event.is_set()
-            if is_tts_quick_potentially_active:
-                logger.info(f"🗣️🛑👄❌ {current_gen_id_str} Stopping Quick TTS...")
-                self.stop_tts_quick_request_event.set()
-                self.llm_answer_ready_event.set() # Wake up TTS worker if it's waiting
-                stopped = self.stop_tts_quick_finished_event.wait(timeout=5.0) # Wait for TTS worker
-                if stopped:
-                    logger.info(f"🗣️🛑👄👍 {current_gen_id_str} Quick TTS stopped confirmation received.")
-                    self.stop_tts_quick_finished_event.clear() # Reset
-                else:
-                    logger.warning(f"🗣️🛑👄⏱️ {current_gen_id_str} Timeout waiting for Quick TTS stop confirmation.")
-                self.tts_quick_generation_active = False # Ensure flag is off
-                aborted_something = True
+            if self.tts_quick_generation_active or self.llm_answer_ready_event.is_set():
+                stages.append(("tts_quick", self.stop_tts_quick_finished_event, self.llm_answer_ready_event))
             else:
                 logger.info(f"🗣️🛑👄📴 {current_gen_id_str} Quick TTS appears inactive, no stop needed.")
-            self.stop_tts_quick_request_event.clear() # Ensure stop request is clear
-
-            # --- Abort Final TTS ---
-            # Check if TTS Final is potentially active (just running, doesn't wait on an event like others)
-            is_tts_final_potentially_active = self.tts_final_generation_active
-            if is_tts_final_potentially_active:
-                logger.info(f"🗣️🛑👄❌ {current_gen_id_str} Stopping Final TTS...")
-                self.stop_tts_final_request_event.set()
-                # No event to .set() here to wake it up, it polls state
-                stopped = self.stop_tts_final_finished_event.wait(timeout=5.0) # Wait for TTS worker
-                if stopped:
-                    logger.info(f"🗣️🛑👄👍 {current_gen_id_str} Final TTS stopped confirmation received.")
-                    self.stop_tts_final_finished_event.clear() # Reset
-                else:
-                    logger.warning(f"🗣️🛑👄⏱️ {current_gen_id_str} Timeout waiting for Final TTS stop confirmation.")
-                self.tts_final_generation_active = False # Ensure flag is off
-                aborted_something = True
+            if self.tts_final_generation_active:
+                stages.append(("tts_final", self.stop_tts_final_finished_event, None)) # Polls state, nothing to wake
             else:
                 logger.info(f"🗣️🛑👄📴 {current_gen_id_str} Final TTS appears inactive, no stop needed.")
-            self.stop_tts_final_request_event.clear() # Ensure stop request is clear
+
+            for name, _, wake_event in stages:
+                logger.info(f"🗣️🛑❌ {current_gen_id_str} Stopping {name}...")
+                if wake_event is not None:
+                    wake_event.set() # Wake up the worker if it's waiting to start
+
+            # --- Wait for all stop confirmations in parallel, under one deadline ---
+            pending = {name: finished_event for name, finished_event, _ in stages}
+            deadline = abort_start_time + worker_timeout
+            while pending and time.time() < deadline:
+                for name, finished_event in list(pending.items()):
+                    if finished_event.is_set():
+                        finished_event.clear() # Reset for next time
+                        del pending[name]
+                        stop_latency = time.time() - abort_start_time
+                        metrics.ABORT_STAGE_DURATION.labels(stage=name).observe(stop_latency)
+                        logger.info(f"🗣️🛑👍 {current_gen_id_str} {name} stopped after {stop_latency * 1000:.0f}ms.")
+                if pending:
+                    next(iter(pending.values())).wait(timeout=0.005) # Poll the stages every 5ms
+            for name in pending:
+                logger.warning(f"🗣️🛑⏱️ {current_gen_id_str} Timeout waiting for {name} stop confirmation.")
+
+            # Always, as the LLM worker stops reading after the quick answer while the stream keeps producing.
+            # Unpromoted streams keep running as speculation; a promoted answer is cancelled.
+            self.speculation.release(current_gen_obj.llm_request_id)
+            self.llm_generation_active = False # Ensure flags are off
+            self.tts_quick_generation_active = False
+            self.tts_final_generation_active = False
+            aborted_something = bool(stages)
 
             # --- Stop Audio Playback (if AudioProcessor handles it) ---
             # Assuming AudioProcessor might have playback control that needs stopping
@@ -970,6 +1286,7 @@ class SpeechPipelineManager:
                 logger.info(f"🗣️🛑🤷 {current_gen_id_str} Worker(s) aborted but running_generation was already None.")
             else:
                 logger.info(f"🗣️🛑🤷 {current_gen_id_str} Nothing seemed active to abort, running_generation is None.")
+            self._notify_generation_state_change()
 
 
             # --- Final Cleanup of Trigger Events ---
@@ -979,6 +1296,14 @@ class SpeechPipelineManager:
 
             # --- Signal Completion ---
             logger.info(f"🗣️🛑✅ {current_gen_id_str} Abort processing complete. Setting completion event and releasing block.")
+            abort_duration = time.time() - abort_start_time
+            metrics.ABORTS.inc()
+            metrics.ABORT_DURATION.observe(abort_duration)
+            if abort_duration * 1000 > ABORT_SLO_MS:
+                metrics.ABORT_SLO_VIOLATIONS.inc()
+                logger.warning(f"🗣️🛑🐢 {current_gen_id_str} Abort took {abort_duration * 1000:.0f}ms, above the {ABORT_SLO_MS:.0f}ms target.")
+            current_gen_obj.state.transition(GenerationState.CANCELLED)
+            logger.info(f"🗣️🔀 {current_gen_id_str} {current_gen_obj.state.timeline()}")
             self.abort_completed_event.set() # Signal that the abort process is fully done
             self.abort_block_event.set() # Release the block for the request processor
 
@@ -997,6 +1322,89 @@ class SpeechPipelineManager:
         logger.info(f"🗣️📥 Queueing 'prepare' request for: '{txt[:50]}...'")
         self.requests_queue.put(PipelineRequest("prepare", txt))
 
+    def promote_speculation(self, txt: str):
+        """
+        Settles the speculative LLM candidates when the user's turn ends.
+
+        Keeps the candidate matching the final transcript `txt` and cancels the others.
+        If the match is not the one the running generation reads, a 'prepare' is
+        queued so the generation switches to it (reusing its generated tokens). If
+        nothing matches, the running generation's candidate is kept.
+
+        The final transcript is also the one point where the semantic answer cache
+        is consulted (speculative prepares never embed). On a hit, and as long as
+        no answer audio was synthesized yet, a 'prepare_cached' is queued instead,
+        replacing the running generation with the cached answer.
+
+        Args:
+            txt: The final transcript of the user turn.
+        """
+        current = self.running_generation
+        current_request_id = current.llm_request_id if current and not current.cancel_token.is_set() else None
+        promoted = self.speculation.promote(txt, fallback_request_id=current_request_id)
+
+        answer_cache = self.resources.answer_cache
+        if answer_cache and (current is None or current.tts_first_chunk_time is None):
+            cached_answer = answer_cache.lookup(txt)
+            if cached_answer:
+                if promoted and promoted.request_id != current_request_id:
+                    self.speculation.discard(promoted.request_id, "answer_cached")
+                logger.info(f"🗣️🗃️ Final transcript has a cached answer, switching to it.")
+                self.requests_queue.put(PipelineRequest("prepare_cached", (txt, cached_answer)))
+                return
+
+        if promoted and promoted.request_id != current_request_id:
+            logger.info(f"🗣️🔮 Final transcript matches another speculative generation, switching to it.")
+            self.prepare_generation(txt)
+
+    def remember_answer(self, answer: str):
+        """
+        Stores the completed answer of the running generation in the semantic answer cache.
+
+        Answers that were themselves served from the cache or that were aborted are
+        not stored. Embedding runs on a background thread.
+
+        Args:
+            answer: The complete assistant answer as sent to the client.
+        """
+        answer_cache = self.resources.answer_cache
+        gen = self.running_generation
+        if not answer_cache or not gen or not gen.text or gen.from_answer_cache or gen.cancel_token.is_set():
+            return
+        threading.Thread(target=answer_cache.store, args=(gen.text, answer), name="AnswerCacheStoreThread", daemon=True).start()
+
+    def inject_filler(self) -> bool:
+        """
+        Queues a pre-synthesized filler clip if the answer audio is expected to take long.
+
+        Called when the user's turn ends. The expected wait is the measured LLM
+        inference time plus TTS time to first audio, counted from the start of the
+        running generation. If it still exceeds the filler bank's threshold and no
+        answer audio exists yet, a clip is put in front of `audio_chunks`, so the
+        quick answer's audio follows it. No filler is queued if it would push the
+        audio waiting for playback past `TTS_LOOKAHEAD_SECONDS`.
+
+        Returns:
+            True if a filler was queued.
+        """
+        gen = self.running_generation
+        if not gen or gen.cancel_token.is_set() or gen.filler_text or gen.tts_first_chunk_time is not None:
+            return False
+        expected_wait_ms = (gen.timestamp - time.time()) * 1000 + self.resources.latency.estimate_ms
+        fillers = self.resources.fillers
+        if not fillers.should_inject(expected_wait_ms):
+            return False
+        clip = fillers.pick()
+        if TTS_LOOKAHEAD_SECONDS > 0 and self.buffered_ahead_seconds(gen) + clip.duration_ms / 1000 > TTS_LOOKAHEAD_SECONDS:
+            logger.info(f"🗣️💬 [Gen {gen.id}] Skipping filler '{clip.text}', {TTS_LOOKAHEAD_SECONDS:.1f}s of audio already waiting for playback.")
+            return False
+        gen.filler_text = clip.text
+        gen.audio_chunks.put_front(clip.chunks)
+        metrics.TTS_FILLERS.labels(engine=self.tts_engine).inc()
+        logger.info(f"🗣️💬 [Gen {gen.id}] Answer audio expected in {expected_wait_ms:.0f}ms, playing filler '{clip.text}' ({clip.duration_ms:.0f}ms).")
+        self._notify_generation_state_change()
+        return True
+
     def finish_generation(self):
         """
         Public method to signal the end of user input or interaction.
@@ -1009,7 +1417,7 @@ class SpeechPipelineManager:
         logger.info(f"🗣️📥 Queueing 'finish' request")
         self.requests_queue.put(PipelineRequest("finish"))
 
-    def abort_generation(self, wait_for_completion: bool = False, timeout: float = 7.0, reason: str = ""):
+    def abort_generation(self, wait_for_completion: bool = False, timeout: float = 7.0, reason: str = "", worker_timeout: float = 5.0):
         """
         Public method to initiate the abortion of the current speech generation.
 
@@ -1022,6 +1430,7 @@ class SpeechPipelineManager:
                                  (signaled by `abort_completed_event`).
             timeout: Maximum time in seconds to wait if `wait_for_completion` is True.
             reason: A string describing why the abort was requested (for logging).
+            worker_timeout: Maximum time in seconds to wait for the workers to confirm the stop.
         """
         if self.shutdown_event.is_set():
             logger.warning("🗣️🔌 Shutdown in progress, ignoring abort request.")
@@ -1031,7 +1440,7 @@ class SpeechPipelineManager:
         logger.info(f"🗣️🛑🚀 Requesting 'abort' (wait={wait_for_completion}, reason='{reason}') for {gen_id_str}")
 
         # Call the internal synchronous processor
-        self.process_abort_generation()
+        self.process_abort_generation(worker_timeout=worker_timeout, reason=reason)
 
         # Optionally wait for completion
         if wait_for_completion:
@@ -1054,24 +1463,27 @@ class SpeechPipelineManager:
         """
         logger.info("🗣️🔄 Resetting pipeline state...")
         self.abort_generation(wait_for_completion=True, timeout=7.0, reason="reset") # Ensure clean slate
-        self.history = []
+        self.speculation.cancel_all()
+        self.history.clear()
         logger.info("🗣️🧹 History cleared. Reset complete.")
 
     def shutdown(self):
         """
         Initiates a graceful shutdown of the pipeline manager and worker threads.
 
-        1. Sets the `shutdown_event`.
-        2. Attempts a final abort of any running generation.
+        1. Aborts any running generation, so its TTS stops holding the shared engine.
+        2. Sets the `shutdown_event`.
         3. Signals all relevant events to unblock any waiting worker threads.
         4. Joins each worker thread with a timeout, logging warnings if they fail to exit.
         """
         logger.info("🗣️🔌 Initiating shutdown...")
-        self.shutdown_event.set()
 
-        # Try a final synchronous abort to ensure clean state before join
+        # Final synchronous abort before `shutdown_event` is set, as abort_generation ignores requests after it
         logger.info("🗣️🔌🛑 Attempting final abort before joining threads...")
         self.abort_generation(wait_for_completion=True, timeout=3.0, reason="shutdown")
+        self.shutdown_event.set()
+        self.speculation.cancel_all()
+        self.sentence_tts.shutdown()
 
         # Wake up threads that might be waiting on events so they can check shutdown_event
         logger.info("🗣️🔌🔔 Signaling events to wake up any waiting threads...")
@@ -30,6 +30,8 @@ let ignoreIncomingTTS = false;
 let chatHistory = [];
 let typingUser = "";
 let typingAssistant = "";
+let assistantText = "";     // Raw partial answer of assistantGenId, built from deltas
+let assistantGenId = null;
 
 // --- batching + fixed 8‑byte header setup ---
 const BATCH_SAMPLES = 2048;
@@ -79,6 +81,9 @@ function initAudioContext() {
   }
 }
 
+// Binary TTS frame header: uint32 generation id, uint32 sequence, uint32 sample rate (big-endian)
+const TTS_FRAME_HEADER_BYTES = 12;
+
 function base64ToInt16Array(b64) {
   const raw = atob(b64);
   const buf = new ArrayBuffer(raw.length);
@@ -160,6 +165,11 @@ async function setupTTSPlayback() {
         );
         socket.send(JSON.stringify({ type: 'tts_stop' }));
       }
+    } else if (type === 'ttsBufferLevel') {
+      if (isTTSPlaying && socket && socket.readyState === WebSocket.OPEN) {
+        const bufferedMs = Math.round(event.data.samples / audioContext.sampleRate * 1000);
+        socket.send(JSON.stringify({ type: 'tts_buffer', buffered_ms: bufferedMs }));
+      }
     }
   };
   ttsWorkletNode.connect(audioContext.destination);
@@ -207,7 +217,19 @@ function renderMessages() {
   messagesDiv.scrollTop = messagesDiv.scrollHeight;
 }
 
-function handleJSONMessage({ type, content }) {
+// partial_assistant_answer: content replaces the text from offset on (offset 0 = full snapshot)
+function applyAssistantText(genId, offset, content) {
+  if (genId !== assistantGenId) {
+    if (offset !== 0) return;  // Delta of an answer we never saw the start of; wait for a snapshot
+    assistantGenId = genId;
+    assistantText = "";
+  }
+  if (offset > assistantText.length) return;  // Missed a delta; the next snapshot resyncs
+  assistantText = assistantText.slice(0, offset) + (content ?? "");
+  typingAssistant = assistantText.trim() ? escapeHtml(assistantText) : "";
+}
+
+function handleJSONMessage({ type, content, gen_id, offset = 0 }) {
   if (type === "partial_user_request") {
     typingUser = content?.trim() ? escapeHtml(content) : "";
     renderMessages();
@@ -222,7 +244,7 @@ function handleJSONMessage({ type, content }) {
     return;
   }
   if (type === "partial_assistant_answer") {
-    typingAssistant = content?.trim() ? escapeHtml(content) : "";
+    applyAssistantText(gen_id, offset, content);
     renderMessages();
     return;
   }
@@ -230,7 +252,7 @@ function handleJSONMessage({ type, content }) {
     if (content?.trim()) {
       chatHistory.push({ role: "assistant", content, type: "final" });
     }
-    typingAssistant = "";
+    typingAssistant = assistantText = "";
     renderMessages();
     return;
   }
@@ -262,6 +284,23 @@ function handleJSONMessage({ type, content }) {
   }
 }
 
+function handleBinaryMessage(buffer) {
+  if (buffer.byteLength < TTS_FRAME_HEADER_BYTES) {
+    console.warn("Received binary frame too short for header.");
+    return;
+  }
+  if (ignoreIncomingTTS) return;
+  const header = new DataView(buffer, 0, TTS_FRAME_HEADER_BYTES);
+  const sampleRate = header.getUint32(8);
+  if (audioContext && sampleRate !== audioContext.sampleRate) {
+    console.warn(`TTS frame sample rate ${sampleRate} differs from playback rate ${audioContext.sampleRate}.`);
+  }
+  const int16Data = new Int16Array(buffer.slice(TTS_FRAME_HEADER_BYTES));
+  if (ttsWorkletNode) {
+    ttsWorkletNode.port.postMessage(int16Data);
+  }
+}
+
 function escapeHtml(str) {
   return (str ?? '')
     .replace(/&/g, "&amp;")
@@ -274,7 +313,7 @@ function escapeHtml(str) {
 
 document.getElementById("clearBtn").onclick = () => {
   chatHistory = [];
-  typingUser = typingAssistant = "";
+  typingUser = typingAssistant = assistantText = "";
   renderMessages();
   if (socket && socket.readyState === WebSocket.OPEN) {
     socket.send(JSON.stringify({ type: 'clear_history' }));
@@ -301,6 +340,7 @@ document.getElementById("startBtn").onclick = async () => {
 
   const wsProto = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
   socket = new WebSocket(`${wsProto}//${location.host}/ws`);
+  socket.binaryType = "arraybuffer";
 
   socket.onopen = async () => {
     statusDiv.textContent = "Connected. Activating mic and TTS…";
@@ -317,6 +357,8 @@ document.getElementById("startBtn").onclick = async () => {
       } catch (e) {
         console.error("Error parsing message:", e);
       }
+    } else if (evt.data instanceof ArrayBuffer) {
+      handleBinaryMessage(evt.data);
     }
   };
 
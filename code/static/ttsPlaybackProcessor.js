@@ -5,6 +5,7 @@ class TTSPlaybackProcessor extends AudioWorkletProcessor {
     this.readOffset = 0;
     this.samplesRemaining = 0;
     this.isPlaying = false;
+    this.blocksSinceReport = 0;
 
     // Listen for incoming messages
     this.port.onmessage = (event) => {
@@ -42,6 +43,12 @@ class TTSPlaybackProcessor extends AudioWorkletProcessor {
       this.port.postMessage({ type: 'ttsPlaybackStarted' });
     }
 
+    // Report the buffer level about every 100 ms, for server-side backpressure
+    if (++this.blocksSinceReport * outputChannel.length >= sampleRate / 10) {
+      this.blocksSinceReport = 0;
+      this.port.postMessage({ type: 'ttsBufferLevel', samples: this.samplesRemaining });
+    }
+
     let outIdx = 0;
     while (outIdx < outputChannel.length && this.bufferQueue.length > 0) {
       const currentBuffer = this.bufferQueue[0];
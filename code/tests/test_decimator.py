@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+
+from decimator import StreamingDecimator
+
+
+def make_signal(num_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_samples) / 48000
+    tone = 8000 * np.sin(2 * np.pi * 440 * t) + 4000 * np.sin(2 * np.pi * 9000 * t)
+    return np.clip(tone + rng.normal(0, 1500, num_samples), -32768, 32767).astype(np.int16)
+
+
+def decimate(signal, chunk_sizes):
+    decimator = StreamingDecimator()
+    out, start, sizes = [], 0, iter(chunk_sizes)
+    while start < len(signal):
+        size = next(sizes)
+        out.append(decimator.process(signal[start:start + size]))
+        start += size
+    return np.concatenate(out)
+
+
+def chunk_pattern(*sizes):
+    while True:
+        yield from sizes
+
+
+@pytest.mark.parametrize("sizes", [(2048,), (1,), (7, 2, 3), (1000, 5, 3001), (4096,)])
+def test_matches_resample_poly(sizes):
+    signal = make_signal(12000)
+    streamed = decimate(signal, chunk_pattern(*sizes))
+    reference = resample_poly(signal / 32768.0, 1, 3) * 32768.0
+
+    assert len(streamed) == len(reference) - StreamingDecimator._DELAY
+    assert np.max(np.abs(streamed - reference[:len(streamed)])) <= 2
+
+
+def test_result_does_not_depend_on_chunking():
+    signal = make_signal(9000, seed=1)
+    expected = decimate(signal, chunk_pattern(2048))
+    for sizes in [(1,), (2,), (3,), (5, 11), (2047, 1), (333, 4000)]:
+        np.testing.assert_array_equal(decimate(signal, chunk_pattern(*sizes)), expected)
+
+
+def test_silence_after_signal_is_filtered_until_history_decays():
+    signal = np.concatenate([make_signal(3000), np.zeros(3000, dtype=np.int16)])
+    streamed = decimate(signal, chunk_pattern(500))
+    reference = resample_poly(signal / 32768.0, 1, 3) * 32768.0
+    assert np.max(np.abs(streamed - reference[:len(streamed)])) <= 2
+    assert not streamed[-100:].any()
+
+
+def test_reset_starts_a_fresh_stream():
+    signal = make_signal(6000, seed=2)
+    decimator = StreamingDecimator()
+    first = decimator.process(signal)
+    decimator.process(make_signal(1234, seed=3))
+    decimator.reset()
+    np.testing.assert_array_equal(decimator.process(signal), first)
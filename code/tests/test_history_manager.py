@@ -0,0 +1,107 @@
+import threading
+
+from history_manager import ConversationHistory
+
+
+def count_words(text):
+    return len(text.split())
+
+
+class FakeLLM:
+    def __init__(self, summary="they talked", release=None):
+        self.summary = summary
+        self.release = release
+        self.calls = []
+
+    def generate(self, text, history, use_system_prompt, request_id):
+        self.calls.append({"text": text, "history": history, "use_system_prompt": use_system_prompt, "request_id": request_id})
+        if self.release:
+            self.release.wait(5)
+        yield from self.summary.split(" ")[:1]
+        yield from (" " + word for word in self.summary.split(" ")[1:])
+
+
+def message(role, words):
+    return {"role": role, "content": " ".join(["w"] * words)}
+
+
+def make_history(llm=None, **kwargs):
+    kwargs.setdefault("token_budget", 20)
+    kwargs.setdefault("keep_messages", 2)
+    return ConversationHistory(llm or FakeLLM(), count_tokens=count_words, **kwargs)
+
+
+def wait_for_compaction(history):
+    thread = history._compaction_thread
+    if thread:
+        thread.join(5)
+        assert not thread.is_alive()
+
+
+def test_messages_keep_most_recent_that_fit_budget():
+    history = make_history(system_prompt="one two three four", token_budget=20)
+    for words in [5, 5, 5, 5]:
+        history.append(message("user", words)) # User messages do not start compaction
+
+    assert history.messages() == [message("user", 5)] * 3 # 4 + 3 * 5 <= 20
+    assert history.prompt_tokens() == 24
+
+
+def test_last_message_is_always_included():
+    history = make_history(token_budget=10)
+    history.append(message("user", 3))
+    history.append(message("user", 50))
+    assert history.messages() == [message("user", 50)]
+
+
+def test_no_compaction_below_threshold():
+    llm = FakeLLM()
+    history = make_history(llm, token_budget=100)
+    history.append(message("user", 10))
+    history.append(message("assistant", 10))
+    assert history.compact_async() is False
+    assert llm.calls == []
+
+
+def test_compaction_folds_old_messages_into_summary():
+    llm = FakeLLM(summary="user asked twice")
+    history = make_history(llm, token_budget=20, keep_messages=2, request_prefix="sess")
+    for role in ["user", "assistant", "user"]:
+        history.append(message(role, 4))
+    history.append({"role": "assistant", "content": "last answer here"})
+    wait_for_compaction(history)
+
+    assert llm.calls[0]["request_id"] == "sess-1"
+    assert llm.calls[0]["use_system_prompt"] is False
+    assert llm.calls[0]["text"] == "User: w w w w\nAssistant: w w w w"
+    assert history.summary == "user asked twice"
+    assert len(history) == 2
+    assert history.messages() == [
+        {"role": "system", "content": "Summary of the earlier conversation: user asked twice"},
+        message("user", 4),
+        {"role": "assistant", "content": "last answer here"},
+    ]
+
+
+def test_clear_discards_running_compaction():
+    release = threading.Event()
+    history = make_history(FakeLLM(release=release), token_budget=10, keep_messages=1)
+    history.append(message("user", 5))
+    history.append(message("assistant", 5))
+    thread = history._compaction_thread
+    history.clear()
+    release.set()
+    thread.join(5)
+
+    assert history.summary == ""
+    assert history.messages() == []
+
+
+def test_failed_summary_keeps_messages():
+    history = make_history(FakeLLM(summary=""), token_budget=10, keep_messages=1)
+    history.append(message("user", 5))
+    history.append(message("assistant", 5))
+    wait_for_compaction(history)
+
+    assert history.summary == ""
+    assert len(history) == 2
@@ -0,0 +1,62 @@
+import pytest
+
+from latency_calibration import MIN_PERCENTILE_SAMPLES, PipelineLatencyCalibrator
+
+
+def test_follows_ewma_before_percentile_applies():
+    calibrator = PipelineLatencyCalibrator(initial_ms=1000, alpha=0.5, percentile=100)
+    calibrator.observe(500)
+    assert calibrator.estimate_ms == pytest.approx(750)
+    calibrator.observe(500)
+    assert calibrator.estimate_ms == pytest.approx(625)
+
+
+def test_percentile_floors_estimate_once_enough_samples():
+    calibrator = PipelineLatencyCalibrator(initial_ms=100, alpha=0.1, percentile=75)
+    samples = [100, 100, 100, 900, 900]
+    for sample in samples[:MIN_PERCENTILE_SAMPLES - 1]:
+        calibrator.observe(sample)
+    assert calibrator.estimate_ms < 900 * 0.75
+
+    calibrator.observe(samples[-1])
+    assert calibrator.estimate_ms == pytest.approx(900) # 75th percentile of the window
+
+
+def test_estimate_is_capped_at_max_ms():
+    calibrator = PipelineLatencyCalibrator(initial_ms=5000, alpha=1.0, max_ms=2000)
+    assert calibrator.estimate_ms == 2000
+    calibrator.observe(10000)
+    assert calibrator.estimate_ms == 2000
+
+
+def test_non_positive_latencies_are_ignored():
+    calibrator = PipelineLatencyCalibrator(initial_ms=400, alpha=1.0)
+    calibrator.observe(0)
+    calibrator.observe(-50)
+    assert calibrator.estimate_ms == 400
+
+
+def test_subscribers_receive_seconds_on_noticeable_change():
+    calibrator = PipelineLatencyCalibrator(initial_ms=400, alpha=1.0, percentile=0)
+    received = []
+    calibrator.subscribe(received.append)
+    assert received == [pytest.approx(0.4)]
+
+    calibrator.observe(405) # Below MIN_PUBLISHED_CHANGE_MS
+    assert len(received) == 1
+    calibrator.observe(450)
+    assert received[-1] == pytest.approx(0.45)
+
+
+def test_failing_subscriber_does_not_block_others():
+    calibrator = PipelineLatencyCalibrator(initial_ms=400, alpha=1.0)
+    received = []
+
+    def failing(seconds):
+        if received:
+            raise RuntimeError("boom")
+
+    calibrator.subscribe(failing)
+    calibrator.subscribe(received.append)
+    calibrator.observe(800)
+    assert received[-1] == pytest.approx(0.8)
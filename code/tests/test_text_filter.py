@@ -0,0 +1,58 @@
+import pytest
+
+from text_filter import StreamingTextFilter, filter_llm_stream
+
+
+def filter_chunks(chunks):
+    text_filter = StreamingTextFilter()
+    out = "".join(text_filter.feed(chunk) for chunk in chunks)
+    return out + (text_filter.flush() or "")
+
+
+def every_split(text):
+    """Yields `text` split into two and three pieces at every position."""
+    for i in range(len(text) + 1):
+        yield [text[:i], text[i:]]
+        for j in range(i, len(text) + 1):
+            yield [text[:i], text[i:j], text[j:]]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Hello world.", "Hello world."),
+    ("<think>plan the answer</think>Sure, here it is.", "Sure, here it is."),
+    ("  \n<think>a</think>  Hi<think>b</think> there</think>!", "Hi there!"),
+    ("It’s “quoted” — and…", "It's \"quoted\" - and..."),
+    ("a < b <thin and <think", "a < b <thin and <think"),
+    ("Done.<think>never closed", "Done."),
+])
+def test_filters_whole_text(text, expected):
+    assert filter_chunks([text]) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "<think>plan the answer</think>Sure, here it is.",
+    "  \n<think>a</think>  Hi<think>b</think> there</think>!",
+    "a < b <thin and <think>x</think> c",
+])
+def test_result_does_not_depend_on_chunking(text):
+    expected = filter_chunks([text])
+    for chunks in every_split(text):
+        assert filter_chunks(chunks) == expected, chunks
+
+
+def test_single_character_tokens():
+    text = "<think>hidden</think> Visible <think>also hidden</think>text."
+    assert filter_chunks(list(text)) == "Visible text."
+
+
+def test_filter_llm_stream_skips_empty_tokens_and_closes_source():
+    closed = []
+
+    def source():
+        try:
+            yield from ["<think>", "x", "</think>", " Hi", "!"]
+        finally:
+            closed.append(True)
+
+    assert list(filter_llm_stream(source())) == ["Hi", "!"]
+    assert closed == [True]
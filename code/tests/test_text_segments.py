@@ -0,0 +1,93 @@
+import pytest
+
+from sentence_scheduler import SentenceSplitter, iter_segments
+from text_context import IncrementalTextContext, TextContext
+
+
+def splits(text):
+    """Yields `text` as one chunk, as single characters and split in two at every position."""
+    yield [text]
+    yield list(text)
+    for i in range(len(text) + 1):
+        yield [text[:i], text[i:]]
+
+
+def find_context(chunks):
+    context = IncrementalTextContext()
+    for i, chunk in enumerate(chunks):
+        found, remaining = context.feed(chunk)
+        if found is not None:
+            return found, remaining + "".join(chunks[i + 1:])
+    return None
+
+
+def split_sentences(chunks):
+    splitter = SentenceSplitter()
+    sentences = [sentence for chunk in chunks for sentence in splitter.feed(chunk)]
+    return sentences + [rest for rest in [splitter.flush()] if rest]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Sure, I can help with that right now. The first step", ("Sure, I can help with that right now.", " The first step")),
+    ("Dr. Smith will see you now. Please wait", ("Dr. Smith will see you now.", " Please wait")),
+    ("Use tools e.g. a hammer or saw. Then", ("Use tools e.g. a hammer or saw.", " Then")),
+    ("The value is 3.5 percent today. And", ("The value is 3.5 percent today.", " And")),
+    ("Write the letter e. Then write f", ("Write the letter e.", " Then write f")),
+])
+def test_context_does_not_depend_on_chunking(text, expected):
+    for chunks in splits(text):
+        assert find_context(chunks) == expected, chunks
+
+
+def test_context_period_waits_for_next_character():
+    context = IncrementalTextContext()
+    assert context.feed("Please call Dr.") == (None, None)
+    assert context.feed(" Smith about it.") == (None, None)
+    assert context.feed(" Thanks") == ("Please call Dr. Smith about it.", " Thanks")
+    assert context.feed(" more.") == (None, None)
+
+
+def test_context_gives_up_after_max_len():
+    context = IncrementalTextContext(max_len=20)
+    assert context.feed("a" * 30 + ". Done") == (None, None)
+    assert context.done
+
+
+def test_context_agrees_with_text_context_without_abbreviations():
+    text = "Well then, here we go again. And more"
+    assert find_context([text]) == TextContext().get_context(text)
+
+
+@pytest.mark.parametrize("text", [
+    "Hello there, friend. How are you today? I am fine!  Thanks.",
+    "Ask Dr. Smith or Mrs. Jones. They know e.g. the hours. Ok.",
+    "Oh. Great. This is a longer sentence... Really? \"Yes.\" Fine",
+])
+def test_sentences_do_not_depend_on_chunking(text):
+    expected = split_sentences([text])
+    for chunks in splits(text):
+        assert split_sentences(chunks) == expected, chunks
+
+
+def test_sentences_keep_abbreviations_and_merge_short_ones():
+    assert split_sentences(["Oh. Great. Ask Dr. Smith about it. Bye now friend"]) == [
+        "Oh. Great. Ask Dr. Smith about it.",
+        "Bye now friend",
+    ]
+
+
+def test_iter_segments_yields_quick_answer_then_sentences():
+    text = "Sure, I can help with that right now. The first step is easy. Then we are done."
+    for chunks in splits(text):
+        assert list(iter_segments(chunks)) == [
+            "Sure, I can help with that right now.",
+            "The first step is easy.",
+            "Then we are done.",
+        ], chunks
+
+
+def test_iter_segments_without_context_splits_everything():
+    text = "a" * 130 + ". Another sentence here."
+    assert list(iter_segments([text])) == ["a" * 130 + ".", "Another sentence here."]
+    assert list(iter_segments(["Short"])) == ["Short"]
+    assert list(iter_segments([])) == []
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+
+from upsampler import StreamingUpsampler
+
+
+def make_signal(num_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_samples) / 24000
+    tone = 8000 * np.sin(2 * np.pi * 440 * t) + 4000 * np.sin(2 * np.pi * 5000 * t)
+    return np.clip(tone + rng.normal(0, 1500, num_samples), -32768, 32767).astype(np.int16)
+
+
+def upsample(signal, chunk_size, upsampler=None):
+    upsampler = upsampler or StreamingUpsampler()
+    out = [upsampler.get_pcm_chunk(signal[i:i + chunk_size].tobytes()) for i in range(0, len(signal), chunk_size)]
+    out.append(upsampler.flush_pcm_chunk())
+    return np.frombuffer(b"".join(out), dtype=np.int16)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 480, 4096, 10000])
+def test_matches_resample_poly(chunk_size):
+    signal = make_signal(10000)
+    streamed = upsample(signal, chunk_size)
+    reference = resample_poly(signal / 32768.0, 2, 1) * 32768.0
+
+    assert len(streamed) == 2 * len(signal)
+    assert np.max(np.abs(streamed - reference)) <= 2
+
+
+def test_result_does_not_depend_on_chunking():
+    signal = make_signal(7001, seed=1)
+    expected = upsample(signal, 1024)
+    for chunk_size in [1, 2, 5, 999, 7001]:
+        np.testing.assert_array_equal(upsample(signal, chunk_size), expected)
+
+
+def test_flush_resets_for_the_next_stream():
+    upsampler = StreamingUpsampler()
+    first = upsample(make_signal(3000, seed=2), 500, upsampler)
+    assert upsampler.flush_pcm_chunk() is None
+    np.testing.assert_array_equal(upsample(make_signal(3000, seed=2), 500, upsampler), first)
+
+
+def test_empty_chunk_returns_empty_bytes():
+    upsampler = StreamingUpsampler()
+    assert upsampler.get_pcm_chunk(b"") == b""
+    assert upsampler.flush_pcm_chunk() is None
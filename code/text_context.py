@@ -1,9 +1,23 @@
 import logging
-from typing import Optional, Set, Tuple, Dict, Union # Added for type hinting
+import os
+from typing import Iterable, Optional, Set, Tuple, Dict, Union # Added for type hinting
 
 logger = logging.getLogger(__name__)
 from colors import Colors # Assuming this is needed externally
 
+DEFAULT_SPLIT_TOKENS: Set[str] = {".", "!", "?", ",", ";", ":", "\n", "-", "。", "、"}
+# A period ending one of these whole words (case-insensitive, comma separated) does not end a context or sentence
+DEFAULT_ABBREVIATIONS: Set[str] = {
+    a.strip().lower()
+    for a in os.getenv("TEXT_ABBREVIATIONS", "Mr.,Mrs.,Ms.,Dr.,Prof.,Sr.,Jr.,St.,vs.,e.g.,i.e.,approx.").split(",")
+    if a.strip()
+}
+
+
+def is_abbreviation(word: str, abbreviations: Set[str]) -> bool:
+    """Returns True if the whole `word` (ending in a period, possibly after an opening bracket or quote) is in `abbreviations`."""
+    return word.lstrip("(\"'[").lower() in abbreviations
+
 class TextContext:
     """
     Extracts meaningful text segments (contexts) from a given string.
@@ -25,8 +39,7 @@ class TextContext:
         """
         if split_tokens is None:
             # Using a more explicit variable name internally for clarity
-            default_splits: Set[str] = {".", "!", "?", ",", ";", ":", "\n", "-", "。", "、"}
-            self.split_tokens: Set[str] = default_splits
+            self.split_tokens: Set[str] = set(DEFAULT_SPLIT_TOKENS)
         else:
             self.split_tokens: Set[str] = set(split_tokens)
 
@@ -70,4 +83,91 @@ class TextContext:
                     return context_str, remaining_str
 
         # No suitable context found within the max_len limit
-        return None, None
\ No newline at end of file
+        return None, None
+
+
+class IncrementalTextContext:
+    """
+    Finds the first context (see `TextContext.get_context`) in text arriving in pieces.
+
+    Keeps its scan position and alphanumeric count between calls, so each
+    character is examined once no matter how many tokens it arrives in.
+    Additionally, a period is not treated as a context end if it ends a known
+    abbreviation ("Dr.", "e.g.") or is directly followed by a letter or digit
+    (inside "e.g.", "3.5"). A period is therefore only decided once the next
+    character has arrived. Use one instance per text stream.
+    """
+    def __init__(
+            self,
+            split_tokens: Optional[Set[str]] = None,
+            min_len: int = 6,
+            max_len: int = 120,
+            min_alnum_count: int = 10,
+            abbreviations: Optional[Iterable[str]] = None,
+        ) -> None:
+        """
+        Initializes the IncrementalTextContext.
+
+        Args:
+            split_tokens: Potential end-of-context markers. Defaults to `DEFAULT_SPLIT_TOKENS`.
+            min_len: The minimum allowable overall length of the context.
+            max_len: The maximum allowable overall length of the context; scanning stops after this many characters.
+            min_alnum_count: The minimum number of alphanumeric characters in the context.
+            abbreviations: Words whose final period does not end a context. Defaults to `DEFAULT_ABBREVIATIONS`.
+        """
+        self.split_tokens: Set[str] = set(DEFAULT_SPLIT_TOKENS if split_tokens is None else split_tokens)
+        self.min_len = min_len
+        self.max_len = max_len
+        self.min_alnum_count = min_alnum_count
+        self.abbreviations: Set[str] = {a.lower() for a in (DEFAULT_ABBREVIATIONS if abbreviations is None else abbreviations)}
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets all text fed so far."""
+        self.text = ""
+        self.done = False # A context was found or max_len was exceeded without one
+        self._pos = 0
+        self._alnum_count = 0
+        self._word_start = 0
+
+    def feed(self, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Adds the next piece of text and checks it for the end of the first context.
+
+        Args:
+            text: The next piece of the text (e.g., an LLM token).
+
+        Returns:
+            A tuple of the context and the remaining text after it once the context
+            is complete, else (None, None). After a context was returned, or once
+            `max_len` characters were scanned without one, always (None, None).
+        """
+        if self.done:
+            return None, None
+        self.text += text
+        end = min(len(self.text), self.max_len)
+        while self._pos < end:
+            char = self.text[self._pos]
+            if char == "." and self._pos + 1 == len(self.text):
+                break # Whether the period ends its word shows with the next character
+            self._pos += 1
+            if char.isalnum():
+                self._alnum_count += 1
+            elif char.isspace():
+                self._word_start = self._pos
+
+            if (char in self.split_tokens
+                    and self._pos >= self.min_len
+                    and self._alnum_count >= self.min_alnum_count
+                    and not (char == "." and self._period_inside_word())):
+                self.done = True
+                context_str, remaining_str = self.text[:self._pos], self.text[self._pos:]
+                logger.info(f"🧠 {Colors.MAGENTA}Context found after char no: {self._pos}, context: {context_str}")
+                return context_str, remaining_str
+        if self._pos >= self.max_len:
+            self.done = True
+        return None, None
+
+    def _period_inside_word(self) -> bool:
+        """Returns True if the period just scanned continues its word or ends an abbreviation."""
+        return self.text[self._pos].isalnum() or is_abbreviation(self.text[self._word_start:self._pos], self.abbreviations)
@@ -0,0 +1,111 @@
+# text_filter.py
+import re
+from typing import Iterator, Optional
+
+# Characters replaced with simpler equivalents for TTS pronunciation and compatibility
+PUNCTUATION_TABLE = str.maketrans({
+    "—": "-",
+    "“": '"',
+    "”": '"',
+    "‘": "'",
+    "’": "'",
+    "…": "...",
+})
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+_THINK_TAG = re.compile(r"</?think>")
+
+
+def _partial_tag_length(text: str, tags) -> int:
+    """Returns the length of the longest suffix of `text` that is a proper prefix of one of `tags`."""
+    for length in range(min(len(text), max(len(t) for t in tags) - 1), 0, -1):
+        suffix = text[-length:]
+        if any(t.startswith(suffix) for t in tags):
+            return length
+    return 0
+
+
+class StreamingTextFilter:
+    """
+    Cleans streamed LLM tokens for display and TTS, one token at a time.
+
+    Removes `<think>...</think>` blocks (and stray tags) even when a tag is split
+    across tokens, drops whitespace before the first visible text and normalizes
+    punctuation with a single translate table. Each token is scanned once; at most
+    a partial tag (a few characters) is held back until the next token shows
+    whether it really is a tag.
+    """
+    def __init__(self):
+        """Initializes the StreamingTextFilter outside of a think block."""
+        self._in_think = False
+        self._pending = "" # Possible start of a tag, held back from the previous token
+        self._started = False # Whether visible text was emitted yet
+
+    def feed(self, token: str) -> str:
+        """
+        Filters the next token.
+
+        Args:
+            token: The next chunk of LLM output.
+
+        Returns:
+            The visible, normalized text of the token (may be empty).
+        """
+        text = self._pending + token.translate(PUNCTUATION_TABLE)
+        self._pending = ""
+        out = []
+        pos = 0
+        while pos < len(text):
+            if self._in_think:
+                end = text.find(THINK_CLOSE, pos)
+                if end < 0:
+                    self._pending = text[len(text) - _partial_tag_length(text[pos:], (THINK_CLOSE,)):]
+                    break
+                pos = end + len(THINK_CLOSE)
+                self._in_think = False
+            else:
+                match = _THINK_TAG.search(text, pos)
+                if match is None:
+                    rest = text[pos:]
+                    held = _partial_tag_length(rest, (THINK_OPEN, THINK_CLOSE))
+                    out.append(rest[:len(rest) - held])
+                    self._pending = rest[len(rest) - held:]
+                    break
+                out.append(text[pos:match.start()])
+                pos = match.end()
+                self._in_think = match.group(0) == THINK_OPEN # A stray closing tag is just dropped
+        return self._visible("".join(out))
+
+    def flush(self) -> Optional[str]:
+        """Returns text held back at the end of the stream, or None. Unterminated think blocks are dropped."""
+        rest, self._pending = ("" if self._in_think else self._pending), ""
+        return self._visible(rest) or None
+
+    def _visible(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+
+def filter_llm_stream(stream: Iterator[str]) -> Iterator[str]:
+    """
+    Yields the visible text of an LLM token stream, filtered by a `StreamingTextFilter`.
+
+    Tokens that filter to nothing (e.g., inside a think block) are skipped.
+    Closing the returned generator closes `stream`.
+    """
+    text_filter = StreamingTextFilter()
+    try:
+        for token in stream:
+            text = text_filter.feed(token)
+            if text:
+                yield text
+        rest = text_filter.flush()
+        if rest:
+            yield rest
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
@@ -166,6 +166,7 @@ class TranscriptionProcessor:
         self.shutdown_performed: bool = False
         self.silence_time: float = 0.0
         self.silence_active: bool = False
+        self.hot: bool = False # Silence long enough that the final transcription is likely imminent
         self.last_audio_copy: Optional[np.ndarray] = None
 
         self.on_tts_allowed_to_synthesize: Optional[Callable] = None # Note: Seems unused
@@ -253,7 +254,6 @@ class TranscriptionProcessor:
         and potential full transcription ("hot") state changes.
         """
         def monitor():
-            hot = False
             # Initialize silence_time using the abstracted getter
             self.silence_time = self._get_recorder_param("speech_end_silence_start", 0.0)
 
@@ -305,26 +305,26 @@ class TranscriptionProcessor:
 
                     # 3. Handle "Hot" state (potential full transcription)
                     hot_condition_met = time_since_silence > start_hot_condition_time
-                    if hot_condition_met and not hot:
-                        hot = True
+                    if hot_condition_met and not self.hot:
+                        self.hot = True
                         print(f"{Colors.MAGENTA}HOT{Colors.RESET}")
                         if self.potential_full_transcription_callback:
                             self.potential_full_transcription_callback(self.realtime_text)
-                    elif not hot_condition_met and hot:
+                    elif not hot_condition_met and self.hot:
                         # Transitioning from Hot to Cold while still in silence period (e.g., silence_waiting_time changed)
                         if self._is_recorder_recording(): # Check if still recording before aborting
                             print(f"{Colors.CYAN}COLD (during silence){Colors.RESET}")
                             if self.potential_full_transcription_abort_callback:
                                 self.potential_full_transcription_abort_callback()
-                        hot = False
+                        self.hot = False
 
-                elif hot: # Exited silence period (speech_end_silence_start is 0 or None)
+                elif self.hot: # Exited silence period (speech_end_silence_start is 0 or None)
                     # If we were hot, but silence ended (e.g., new speech started), transition to cold
                     if self._is_recorder_recording(): # Check if recording actually restarted
                          print(f"{Colors.CYAN}COLD (silence ended){Colors.RESET}")
                          if self.potential_full_transcription_abort_callback:
                              self.potential_full_transcription_abort_callback()
-                    hot = False
+                    self.hot = False
 
                 time.sleep(0.001) # Short sleep to prevent busy-waiting dominating CPU
 
@@ -405,6 +405,58 @@ class TranscriptionProcessor:
         self.potential_sentences_yielded.clear()
         logger.info("👂⏹️ Potential sentence yield cache cleared (generation aborted).")
 
+    def reset(self) -> None:
+        """
+        Discards the utterance in progress and all recognition state.
+
+        Aborts an active recording or pending transcription (the recorder's `text`
+        call then returns without a result), drops buffered audio frames and clears
+        the realtime text, the potential sentence caches, turn detection and the
+        silence monitor's state. Used when this processor is handed to a new user,
+        so nothing of the previous user's speech can reach them. Blocks until the
+        recorder has acknowledged the abort.
+        """
+        if self.recorder:
+            try:
+                if hasattr(self.recorder, 'abort'):
+                    self.recorder.abort()
+                if hasattr(self.recorder, 'clear_audio_queue'):
+                    self.recorder.clear_audio_queue()
+                for frames_attr in ("frames", "last_frames"):
+                    frames = getattr(self.recorder, frames_attr, None)
+                    if frames:
+                        frames.clear()
+            except Exception as e:
+                logger.error(f"👂💥 Error while resetting the recorder: {e}", exc_info=True)
+
+        self.realtime_text = None
+        self.final_transcription = None
+        self.stripped_partial_user_text = ""
+        self.sentence_end_cache.clear()
+        self.potential_sentences_yielded.clear()
+        self.last_audio_copy = None
+        self.silence_time = 0.0
+        self.silence_active = False
+        self.hot = False
+        if USE_TURN_DETECTION and hasattr(self, 'turn_detection'):
+            self.turn_detection.reset()
+        logger.info("👂🔄 Recognition state reset.")
+
+    def set_pipeline_latency(self, pipeline_latency: float) -> None:
+        """
+        Updates the estimated downstream pipeline latency while running.
+
+        The silence monitor and turn detection read it on every evaluation, so the
+        new value applies to the next potential sentence end and waiting time.
+
+        Args:
+            pipeline_latency: Estimated latency of the downstream processing pipeline in seconds.
+        """
+        self.pipeline_latency = pipeline_latency
+        if USE_TURN_DETECTION:
+            self.turn_detection.pipeline_latency = pipeline_latency
+        logger.debug(f"👂⏱️ Pipeline latency set to {pipeline_latency:.3f}s.")
+
     def perform_final(self, audio_bytes: Optional[bytes] = None) -> None:
         """
         Manually triggers the final transcription process using the last known
@@ -0,0 +1,172 @@
+# tts_cache.py
+import hashlib
+import logging
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Generator, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable via environment variables
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+try:
+    TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", 256)) # 0 disables the cache
+except ValueError:
+    logger.warning("👄🗃️⚠️ Invalid TTS_CACHE_MAX_MB env var. Using default: 256")
+    TTS_CACHE_MAX_MB = 256.0
+
+CHUNK_BYTES = 4096 # Size of the chunks a hit is streamed in (TTS stream playout chunk size)
+FILE_SUFFIX = ".pcm"
+
+
+def normalize_tts_text(text: str) -> str:
+    """
+    Normalizes text for cache keys: trims and collapses whitespace.
+
+    Case and punctuation are kept, as they change the synthesized prosody.
+    """
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TTSCache:
+    """
+    Content-addressed, size-bounded LRU cache of synthesized audio on disk.
+
+    Each entry is one raw PCM16 file named by the SHA-1 of engine, voice, speed
+    and normalized text. Use one instance per directory (shared by all
+    `AudioProcessor`s), so the index stays consistent and `max_bytes` bounds
+    the directory as a whole. Hits are memory-mapped and streamed in chunks, so a
+    cached sentence is served without the TTS engine (and without waiting for
+    the shared TTS stream). Recency is kept in memory and persisted through the
+    file modification time, so the LRU order survives restarts. When the total
+    size exceeds `max_bytes`, least recently used files are deleted.
+    """
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = int(TTS_CACHE_MAX_MB * 1024 * 1024)):
+        """
+        Initializes the TTSCache and indexes the entries already on disk.
+
+        Args:
+            directory: Directory holding the cache files.
+            max_bytes: Maximum total size of the cached audio. 0 or less disables the cache.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict() # key -> size, least recently used first
+        self._total_bytes = 0
+
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(FILE_SUFFIX):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name[:-len(FILE_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+        logger.info(f"👄🗃️ TTS cache '{self.directory}': {len(self._entries)} entries, {self._total_bytes / 1048576:.1f}/{self.max_bytes / 1048576:.0f} MB.")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(text: str, engine: str, voice: str = "", speed: float = 1.0) -> str:
+        """Returns the cache key of `text` synthesized by `engine` with `voice` and `speed`."""
+        return hashlib.sha1(f"{engine}|{voice}|{speed}|{normalize_tts_text(text)}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + FILE_SUFFIX)
+
+    def get(self, text: str, engine: str, voice: str = "", speed: float = 1.0) -> Optional[Generator[bytes, None, None]]:
+        """
+        Looks up the audio for `text`.
+
+        Args:
+            text: The text to synthesize.
+            engine: The TTS engine name.
+            voice: The engine's voice.
+            speed: The engine's speaking speed.
+
+        Returns:
+            A generator yielding the cached PCM16 audio in chunks, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        key = self.key(text, engine, voice, speed)
+        with self._lock:
+            hit = key in self._entries
+            if hit:
+                self._entries.move_to_end(key)
+        metrics.TTS_CACHE_LOOKUPS.labels(result="hit" if hit else "miss", engine=engine).inc()
+        if not hit:
+            return None
+        try:
+            os.utime(self._path(key)) # Persist recency for the next start
+            f = open(self._path(key), "rb")
+        except OSError as e:
+            logger.warning(f"👄🗃️⚠️ Cached audio for '{text[:40]}' unreadable ({e}); dropping entry.")
+            self._remove(key)
+            return None
+        return self._stream(f)
+
+    @staticmethod
+    def _stream(f) -> Generator[bytes, None, None]:
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for start in range(0, len(data), CHUNK_BYTES):
+                yield data[start:start + CHUNK_BYTES]
+
+    def put(self, text: str, pcm: bytes, engine: str, voice: str = "", speed: float = 1.0) -> None:
+        """
+        Stores the complete audio of `text`, evicting least recently used entries if needed.
+
+        Args:
+            text: The synthesized text.
+            pcm: Its complete PCM16 audio.
+            engine: The TTS engine name.
+            voice: The engine's voice.
+            speed: The engine's speaking speed.
+        """
+        if not self.enabled or not pcm or len(pcm) > self.max_bytes:
+            return
+        key = self.key(text, engine, voice, speed)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp_path, path) # Readers never see a partial file
+        except OSError as e:
+            logger.warning(f"👄🗃️⚠️ Could not cache audio for '{text[:40]}': {e}")
+            return
+        with self._lock:
+            self._total_bytes += len(pcm) - self._entries.pop(key, 0)
+            self._entries[key] = len(pcm)
+        self._evict(engine)
+        logger.debug(f"👄🗃️ Cached {len(pcm) / 48000:.2f}s of audio for '{text[:40]}'.")
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self, engine: str = "") -> None:
+        """Deletes least recently used entries until the cache fits `max_bytes`."""
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._entries:
+                    return
+                key = next(iter(self._entries))
+            self._remove(key)
+            metrics.TTS_CACHE_EVICTIONS.labels(engine=engine).inc() # Engine whose insert caused the eviction
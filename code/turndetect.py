@@ -166,6 +166,54 @@ def interpolate_detection(prob: float) -> float:
     logger.warning(f"🎤⚠️ Probability {p} fell outside defined anchor points {anchor_points}. Returning fallback value.")
     return 4.0
 
+_classifier_cache: dict[tuple[str, str], tuple] = {}
+_classifier_cache_lock = threading.Lock()
+
+def load_classifier(model_dir: str, device: torch.device, max_length: int = 128) -> tuple:
+    """
+    Loads (once per process) the sentence completion tokenizer and model.
+
+    The first call for a given model directory and device loads the weights,
+    moves them to the device and runs a warmup prediction. Later calls return
+    the same objects, so every session's TurnDetection shares one copy of the
+    weights. Inference is read-only, so sharing is safe across threads.
+
+    Args:
+        model_dir: Hugging Face model id or local path of the classifier.
+        device: The torch device to place the model on.
+        max_length: Sequence length used for the warmup prediction.
+
+    Returns:
+        A `(tokenizer, classification_model)` tuple.
+    """
+    key = (model_dir, str(device))
+    with _classifier_cache_lock:
+        if key in _classifier_cache:
+            logger.info(f"🎤♻️ Reusing loaded classification model for {model_dir} on {device}")
+            return _classifier_cache[key]
+
+        tokenizer = transformers.DistilBertTokenizerFast.from_pretrained(model_dir)
+        classification_model = transformers.DistilBertForSequenceClassification.from_pretrained(model_dir)
+        classification_model.to(device)
+        classification_model.eval() # Set model to evaluation mode
+
+        # Warmup the classification model for faster initial predictions
+        logger.info("🎤🔥 Warming up the classification model...")
+        with torch.no_grad():
+            inputs = tokenizer(
+                "This is a warmup sentence.",
+                return_tensors="pt",
+                truncation=True,
+                padding="max_length",
+                max_length=max_length
+            )
+            inputs = {key: value.to(device) for key, value in inputs.items()}
+            _ = classification_model(**inputs) # Run one prediction
+        logger.info("🎤✅ Classification model warmed up.")
+
+        _classifier_cache[key] = (tokenizer, classification_model)
+        return _classifier_cache[key]
+
 class TurnDetection:
     """
     Manages turn detection logic based on text input and sentence completion model.
@@ -215,11 +263,9 @@ class TurnDetection:
 
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         logger.info(f"🎤🔌 Using device: {self.device}")
-        self.tokenizer = transformers.DistilBertTokenizerFast.from_pretrained(model_dir)
-        self.classification_model = transformers.DistilBertForSequenceClassification.from_pretrained(model_dir)
-        self.classification_model.to(self.device)
-        self.classification_model.eval() # Set model to evaluation mode
         self.max_length: int = 128 # Max sequence length for the model
+        # Tokenizer and weights are shared by every TurnDetection instance in the process
+        self.tokenizer, self.classification_model = load_classifier(model_dir, self.device, self.max_length)
         self.pipeline_latency: float = pipeline_latency
         self.pipeline_latency_overhead: float = pipeline_latency_overhead
 
@@ -227,21 +273,6 @@ class TurnDetection:
         self._completion_probability_cache: collections.OrderedDict[str, float] = collections.OrderedDict()
         self._completion_probability_cache_max_size: int = 256 # Max size for the LRU cache
 
-        # Warmup the classification model for faster initial predictions
-        logger.info("🎤🔥 Warming up the classification model...")
-        with torch.no_grad():
-            warmup_text = "This is a warmup sentence."
-            inputs = self.tokenizer(
-                warmup_text,
-                return_tensors="pt",
-                truncation=True,
-                padding="max_length",
-                max_length=self.max_length
-            )
-            inputs = {key: value.to(self.device) for key, value in inputs.items()}
-            _ = self.classification_model(**inputs) # Run one prediction
-        logger.info("🎤✅ Classification model warmed up.")
-
         # Default dynamic pause settings (initialized for speed_factor=0.0)
         self.detection_speed: float = 0.5
         self.ellipsis_pause: float = 2.3
@@ -0,0 +1,91 @@
+import numpy as np
+from scipy.signal import firwin
+from typing import Optional
+
+
+class StreamingUpsampler:
+    """
+    Streaming 2x polyphase upsampler (24kHz -> 48kHz) that keeps its FIR state between calls.
+
+    Uses the same anti-imaging filter as `scipy.signal.resample_poly(x, 2, 1)`
+    (Kaiser-windowed sinc, beta 5.0, 41 taps), split into its two polyphase
+    branches. Each input sample is filtered exactly once: the last input samples
+    of a chunk are kept as filter history for the next chunk, so the output is
+    sample-exact continuous across chunk boundaries. The filter's group delay is
+    compensated, so the concatenated output of all `get_pcm_chunk` calls plus
+    `flush_pcm_chunk` has exactly twice as many samples as the input.
+
+    Not thread-safe; use one instance per output stream (per session).
+    """
+    UP = 2
+    _HALF_LEN = 10 * UP # Same filter half length as resample_poly
+    _TAPS = firwin(2 * _HALF_LEN + 1, 1.0 / UP, window=("kaiser", 5.0)).astype(np.float32) * UP
+    # Polyphase branches, padded to equal length: y[2m + p] = sum_j _PHASES[p][j] * x[m - j]
+    _PHASES = (_TAPS[0::2], np.append(_TAPS[1::2], np.float32(0.0)))
+    _HISTORY = len(_PHASES[0]) - 1 # Previous input samples each output depends on
+    _DELAY = _HALF_LEN # Group delay in output samples
+
+    def __init__(self):
+        """
+        Initializes the StreamingUpsampler with an empty (silent) filter history.
+        """
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears the filter state, e.g. before a new, unrelated audio stream starts."""
+        self._history = np.zeros(self._HISTORY, dtype=np.float32)
+        self._pending_delay = self._DELAY # Leading output samples still to drop (filter warm-up)
+        self._has_input = False
+
+    def _process(self, audio_float: np.ndarray) -> np.ndarray:
+        """Filters `audio_float` (continuing from the stored history) and returns 2x as many samples."""
+        extended = np.concatenate((self._history, audio_float))
+        out = np.empty(self.UP * len(audio_float), dtype=np.float32)
+        for phase, taps in enumerate(self._PHASES):
+            out[phase::self.UP] = np.convolve(extended, taps, mode="valid")
+        self._history = extended[-self._HISTORY:]
+
+        if self._pending_delay:
+            dropped = min(self._pending_delay, len(out))
+            out = out[dropped:]
+            self._pending_delay -= dropped
+        return out
+
+    @staticmethod
+    def _to_pcm(audio_float: np.ndarray) -> bytes:
+        return np.clip(audio_float * 32768.0, -32768, 32767).astype(np.int16).tobytes()
+
+    def get_pcm_chunk(self, chunk: bytes) -> bytes:
+        """
+        Upsamples one chunk of 24kHz PCM16 audio and returns the 48kHz PCM16 output available so far.
+
+        The output lags the input by the filter delay (10 input samples); the
+        remainder is returned by `flush_pcm_chunk`.
+
+        Args:
+            chunk: Raw audio data bytes (PCM 16-bit signed integer format expected).
+
+        Returns:
+            Raw 48kHz PCM16 bytes, or empty bytes if the input chunk is empty.
+        """
+        audio_int16 = np.frombuffer(chunk, dtype=np.int16)
+        if audio_int16.size == 0:
+            return b""
+        self._has_input = True
+        return self._to_pcm(self._process(audio_int16.astype(np.float32) / 32768.0))
+
+    def flush_pcm_chunk(self) -> Optional[bytes]:
+        """
+        Returns the audio still held back by the filter delay and resets the state.
+
+        Call once after the last `get_pcm_chunk` of a stream.
+
+        Returns:
+            Raw 48kHz PCM16 bytes of the tail, or None if no audio was processed
+            since the last flush or reset.
+        """
+        if not self._has_input:
+            return None
+        tail = self._process(np.zeros(self._DELAY // self.UP, dtype=np.float32))
+        self.reset()
+        return self._to_pcm(tail)